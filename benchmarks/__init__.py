@@ -0,0 +1,9 @@
+"""
+MiCADO Submitter Benchmarks
+---------------------------
+Performance benchmarks, run from the root of the repository, e.g.
+
+    python -m benchmarks.translate --output results.json
+    python -m benchmarks.adt_generator --services 500 -o large.yaml
+    python -m benchmarks.startup --budget 1.0
+"""
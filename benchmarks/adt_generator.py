@@ -0,0 +1,278 @@
+"""
+MiCADO Synthetic ADT Generator
+------------------------------
+Generates large, valid MiCADO ADTs for scale testing, built on the types
+in tests/templates/micado_types.yaml
+
+Every service is a Kubernetes Deployment, or a Pod with sidecars, hosted
+on one of the virtual machines, mounting shared volumes and ConfigMaps.
+Scaling policies cover every virtual machine and a share of the services.
+
+The types are imported by a relative path, so write the ADT to a
+scratch directory holding a copy of tests/templates, not into the tree:
+
+    cp -r tests/templates /tmp/adts
+    python -m benchmarks.adt_generator --services 500 --hosts 20 \\
+        --sidecars 1 --volumes 2 --fan-out 5 -o /tmp/adts/large.yaml
+"""
+import argparse
+import math
+import random
+import sys
+
+from submitter import utils
+
+CONTAINER = "tosca.nodes.MiCADO.Container.Application.Docker"
+DEPLOYMENT = "tosca.nodes.MiCADO.Container.Application.Docker.Deployment"
+POD = "tosca.nodes.MiCADO.Container.Application.Pod.Deployment"
+CONFIG = "tosca.nodes.MiCADO.Container.Config.ConfigMap"
+VOLUMES = (
+    "tosca.nodes.MiCADO.Container.Volume.EmptyDir",
+    "tosca.nodes.MiCADO.Container.Volume.HostPath",
+)
+HOSTS = {
+    "terraform": ("tosca.nodes.MiCADO.EC2.Compute.Terra", "Terraform"),
+    "occopus": ("tosca.nodes.MiCADO.EC2.Compute.Occo", "Occopus"),
+}
+SCALING = "tosca.policies.Scaling.MiCADO"
+MONITORING = "tosca.policies.Monitoring.MiCADO"
+
+IMAGES = ("nginx", "redis", "busybox", "httpd", "memcached", "rabbitmq")
+
+CPU_QUERY = "avg(rate(container_cpu_usage_seconds_total{{pod=~'{}-.*'}}[60s]))*100"
+VM_SCALING_RULE = """\
+if len(m_nodes) <= m_node_count and m_time_since_node_count_changed > 60:
+  m_node_count += 1
+"""
+CONTAINER_SCALING_RULE = """\
+if CPU > 80:
+  m_container_count += 1
+elif CPU < 20:
+  m_container_count -= 1
+"""
+
+
+def generate(
+    services=10,
+    hosts=1,
+    sidecars=0,
+    volumes=0,
+    configs=0,
+    fan_out=1,
+    policy_density=0.5,
+    orchestrator="terraform",
+    imports=("micado_types.yaml",),
+    seed=0,
+):
+    """Generates a MiCADO ADT
+
+    Args:
+        services (int, optional): Number of services. Defaults to 10.
+        hosts (int, optional): Number of virtual machines. Defaults to 1.
+        sidecars (int, optional): Sidecar containers per service, which
+            turns each service into a Pod. Defaults to 0.
+        volumes (int, optional): Volumes mounted by each service.
+            Defaults to 0.
+        configs (int, optional): ConfigMaps mounted by each service.
+            Defaults to 0.
+        fan_out (int, optional): Services sharing each volume and
+            ConfigMap. Defaults to 1.
+        policy_density (float, optional): Share of the services with a
+            scaling policy. Defaults to 0.5.
+        orchestrator (str, optional): terraform or occopus, for the
+            virtual machines. Defaults to "terraform".
+        imports (tuple, optional): Type definitions to import.
+            Defaults to ("micado_types.yaml",).
+        seed (int, optional): Seed for the random choices. Defaults to 0.
+
+    Returns:
+        dict: The ADT
+    """
+    if services < 1 or hosts < 1:
+        raise ValueError("An ADT needs at least one service and one host")
+    if orchestrator not in HOSTS:
+        raise ValueError("Orchestrator must be one of {}".format(list(HOSTS)))
+
+    rand = random.Random(seed)
+    fan_out = max(1, min(fan_out, services))
+    nodes, policies = {}, []
+
+    host_names = _hosts(nodes, policies, hosts, orchestrator)
+    volume_names = _shared(nodes, "volume", volumes, services, fan_out, rand)
+    config_names = _shared(nodes, "config", configs, services, fan_out, rand)
+
+    for index in range(services):
+        name = "service-{}".format(index)
+        mounts = [
+            names[(slot * services + index) // fan_out % len(names)]
+            for names, count in ((volume_names, volumes), (config_names, configs))
+            for slot in range(count)
+        ]
+        host = host_names[index % len(host_names)]
+        _service(nodes, name, host, mounts, sidecars, rand)
+
+        if rand.random() < policy_density:
+            policies.append(
+                {
+                    "scale-{}".format(name): {
+                        "type": SCALING,
+                        "targets": [name],
+                        "properties": {
+                            "min_instances": "1",
+                            "max_instances": str(rand.randint(2, 10)),
+                            "queries": {"CPU": CPU_QUERY.format(name)},
+                            "scaling_rule": CONTAINER_SCALING_RULE,
+                        },
+                    }
+                }
+            )
+
+    policies.append(
+        {
+            "monitoring": {
+                "type": MONITORING,
+                "properties": {
+                    "enable_container_metrics": False,
+                    "enable_node_metrics": False,
+                },
+            }
+        }
+    )
+
+    return {
+        "tosca_definitions_version": "tosca_simple_yaml_1_3",
+        "imports": list(imports),
+        "repositories": {"docker_hub": "https://hub.docker.com/"},
+        "description": "Synthetic ADT with {} services on {} hosts".format(
+            services, hosts
+        ),
+        "topology_template": {"node_templates": nodes, "policies": policies},
+    }
+
+
+def _hosts(nodes, policies, count, orchestrator):
+    node_type, interface = HOSTS[orchestrator]
+    names = []
+    for index in range(count):
+        name = "host-{}".format(index)
+        nodes[name] = {
+            "type": node_type,
+            "properties": {
+                "region_name": "eu-west-2",
+                "image_id": "ami-0000000000000000{}".format(index % 10),
+                "instance_type": "t2.small",
+                "endpoint": "https://ec2.eu-west-2.amazonaws.com",
+            },
+            "interfaces": {interface: {"create": None}},
+        }
+        policies.append(
+            {
+                "scale-{}".format(name): {
+                    "type": SCALING,
+                    "targets": [name],
+                    "properties": {
+                        "min_instances": "1",
+                        "max_instances": "3",
+                        "scaling_rule": VM_SCALING_RULE,
+                    },
+                }
+            }
+        )
+        names.append(name)
+    return names
+
+
+def _shared(nodes, kind, per_service, services, fan_out, rand):
+    """Adds the volumes or ConfigMaps shared by the services"""
+    names = []
+    for index in range(math.ceil(per_service * services / fan_out)):
+        name = "{}-{}".format(kind, index)
+        if kind == "config":
+            nodes[name] = {
+                "type": CONFIG,
+                "properties": {"data": {"index": str(index)}},
+            }
+        else:
+            node_type = rand.choice(VOLUMES)
+            nodes[name] = {"type": node_type}
+            if node_type.endswith("HostPath"):
+                nodes[name]["properties"] = {"path": "/tmp/{}".format(name)}
+        names.append(name)
+    return names
+
+
+def _service(nodes, name, host, mounts, sidecars, rand):
+    """Adds a Deployment, or a Pod with its sidecar containers"""
+    requirements = [{"volume": mount} for mount in mounts]
+    container = {
+        "properties": {
+            "image": rand.choice(IMAGES),
+            "ports": [{"port": 8080 + rand.randint(0, 100)}],
+        },
+    }
+    if not sidecars:
+        container["type"] = DEPLOYMENT
+        container["requirements"] = [{"host": host}] + requirements
+        nodes[name] = container
+        return
+
+    containers = ["{}-app".format(name)]
+    container["type"] = CONTAINER
+    container["requirements"] = requirements
+    nodes[containers[0]] = container
+    for index in range(sidecars):
+        containers.append("{}-sidecar-{}".format(name, index))
+        nodes[containers[-1]] = {
+            "type": CONTAINER,
+            "properties": {"image": rand.choice(IMAGES)},
+        }
+
+    nodes[name] = {
+        "type": POD,
+        "requirements": [{"container": c} for c in containers] + [{"host": host}],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic MiCADO ADT for scale testing"
+    )
+    parser.add_argument("-o", "--output", help="ADT file to write, or stdout")
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--hosts", type=int, default=1)
+    parser.add_argument("--sidecars", type=int, default=0)
+    parser.add_argument("--volumes", type=int, default=0)
+    parser.add_argument("--configs", type=int, default=0)
+    parser.add_argument("--fan-out", type=int, default=1)
+    parser.add_argument("--policy-density", type=float, default=0.5)
+    parser.add_argument("--orchestrator", choices=list(HOSTS), default="terraform")
+    parser.add_argument(
+        "--import",
+        dest="imports",
+        action="append",
+        help="type definitions to import, micado_types.yaml by default",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    adt = generate(
+        services=args.services,
+        hosts=args.hosts,
+        sidecars=args.sidecars,
+        volumes=args.volumes,
+        configs=args.configs,
+        fan_out=args.fan_out,
+        policy_density=args.policy_density,
+        orchestrator=args.orchestrator,
+        imports=args.imports or ("micado_types.yaml",),
+        seed=args.seed,
+    )
+    if args.output:
+        utils.dump_order_yaml(adt, args.output)
+    else:
+        sys.stdout.write(utils.dump_order_yaml(adt))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
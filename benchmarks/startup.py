@@ -0,0 +1,114 @@
+"""
+MiCADO Submitter Startup Benchmark
+----------------------------------
+Times the import of the API, which is what a gunicorn worker pays when it
+boots or restarts, using the -X importtime report of a fresh interpreter
+
+Fails if the import takes longer than the budget, or if it pulls in one
+of the heavy packages that should only load on first use:
+
+    python -m benchmarks.startup --budget 1.0
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+MODULE = "submitter.api"
+BUDGET = 1.0
+
+# Packages that should only be imported once the engine is needed
+DEFERRED = (
+    "kubernetes",
+    "kubernetes_validate",
+    "micadoparser",
+    "toscaparser",
+    "ansible_runner",
+    "jinja2.sandbox",
+)
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(report):
+    """Parses the stderr of python -X importtime
+
+    Returns:
+        dict: Maps module names to their (self, cumulative) times in seconds
+    """
+    modules = {}
+    for line in report.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, _, name = match.groups()
+            modules[name] = (int(own) / 1e6, int(cumulative) / 1e6)
+    return modules
+
+
+def import_profile(module=MODULE):
+    """Imports the module in a fresh interpreter and profiles the import"""
+    code = "import logging.config; import {}".format(module)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    if process.returncode:
+        raise RuntimeError(
+            "Could not import {}: {}".format(module, process.stderr[-2000:])
+        )
+    return parse_importtime(process.stderr)
+
+
+def run(module=MODULE, repeat=5):
+    """Profiles the import several times, keeping the median total
+
+    Returns:
+        dict: The median total, the slowest modules of the median run and
+            the deferred packages that were imported anyway
+    """
+    profiles = sorted(
+        (import_profile(module) for _ in range(repeat)),
+        key=lambda profile: profile[module][1],
+    )
+    profile = profiles[len(profiles) // 2]
+    slowest = sorted(profile.items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        "module": module,
+        "total": statistics.median(p[module][1] for p in profiles),
+        "slowest": [(name, own) for name, (own, _) in slowest[:15]],
+        "deferred": sorted(name for name in profile if name in DEFERRED),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API import time")
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--budget", type=float, default=BUDGET, help="in seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    result = run(args.module, args.repeat)
+    print(
+        "import {}: {:.3f}s (budget {:.3f}s)".format(
+            result["module"], result["total"], args.budget
+        )
+    )
+    for name, own in result["slowest"]:
+        print("  {:>8.1f}ms  {}".format(own * 1000, name))
+
+    failed = False
+    if result["deferred"]:
+        print("FAIL imported at startup: {}".format(", ".join(result["deferred"])))
+        failed = True
+    if result["total"] > args.budget:
+        print("FAIL over budget by {:.3f}s".format(result["total"] - args.budget))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
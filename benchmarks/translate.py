@@ -0,0 +1,333 @@
+"""
+MiCADO Submitter Translation Benchmark
+--------------------------------------
+Times the validate and translate pipeline of the engine on the ADTs in
+tests/templates, on scaled-up copies of them and on ADTs generated by
+benchmarks.adt_generator, per phase and per adaptor
+
+Each case runs in two modes: "validate", where adaptors translate without
+writing anything, and "dry-run", where they also write their output files.
+Wall time and CPU time are the median of the repeats. Peak Python memory
+comes from one more run under tracemalloc, which would skew the timings.
+Results can be compared against a stored baseline:
+
+    python -m benchmarks.translate --output results.json
+    python -m benchmarks.translate --save-baseline benchmarks/baseline.json
+    python -m benchmarks.translate --baseline benchmarks/baseline.json
+"""
+import argparse
+import copy
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ruamel.yaml import YAML
+
+from benchmarks import adt_generator
+from submitter import submitter_engine, utils
+from submitter.cache import LRUCache
+
+TEMPLATES = Path("tests/templates")
+MODES = {"validate": True, "dry-run": False}
+
+# Absolute slack per metric, so tiny phases don't flag on noise
+MIN_DELTA = {"wall": 0.05, "cpu": 0.05, "peak_kib": 1024}
+
+
+def measure(fn, *args, trace_memory=False, **kwargs):
+    """Runs fn and measures its wall time, CPU time and peak memory
+
+    Returns:
+        tuple: The return value of fn and a dict of measurements
+    """
+    if trace_memory:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+    return result, {"wall": wall, "cpu": cpu, "peak_kib": peak}
+
+
+def scale_adt(path, factor, out_dir):
+    """Writes a copy of an ADT with every standalone container repeated
+
+    Copies of the Deployment nodes share the hosts and volumes of the
+    originals, so the result stays a valid ADT that translates to
+    factor times as many workloads.
+
+    Returns:
+        Path: Path of the scaled ADT
+    """
+    yaml = YAML()
+    with open(path) as file:
+        adt = yaml.load(file)
+
+    nodes = adt["topology_template"]["node_templates"]
+    for name, node in list(nodes.items()):
+        if not node["type"].endswith(".Deployment"):
+            continue
+        for index in range(1, factor):
+            nodes["{}-{}".format(name, index)] = copy.deepcopy(node)
+
+    scaled = Path(out_dir) / "{}-x{}.yaml".format(Path(path).stem, factor)
+    with open(scaled, "w") as file:
+        yaml.dump(adt, file)
+    return scaled
+
+
+def run_case(engine, path, validate, trace_memory=False, app_id="benchmark"):
+    """Benchmarks one ADT in one mode
+
+    Returns:
+        dict: Measurements for parse, instantiate, translate (per adaptor
+            and in total) and the whole _validate pipeline
+    """
+    result = {}
+    template, result["parse"] = measure(
+        submitter_engine.parser.set_template,
+        str(path),
+        {},
+        trace_memory=trace_memory,
+    )
+    adaptors, result["instantiate"] = measure(
+        engine._instantiate_adaptors,
+        app_id,
+        True,
+        validate,
+        template,
+        trace_memory=trace_memory,
+    )
+
+    result["translate"] = {}
+    for step in engine.object_config.step_config["translate"]:
+        _, result["translate"][step] = measure(
+            adaptors[step].translate, trace_memory=trace_memory
+        )
+    steps = result["translate"].values()
+    result["translate_total"] = {
+        "wall": sum(m["wall"] for m in steps),
+        "cpu": sum(m["cpu"] for m in steps),
+        "peak_kib": max(m["peak_kib"] for m in steps) if trace_memory else None,
+    }
+    engine._cleanup(app_id, adaptors)
+
+    (_, adaptors), result["pipeline"] = measure(
+        engine._validate,
+        str(path),
+        True,
+        validate,
+        app_id,
+        {},
+        trace_memory=trace_memory,
+    )
+    engine._cleanup(app_id, adaptors)
+    engine._remove_app_dirs(app_id)
+    return result
+
+
+def run(cases, repeat=3):
+    """Runs every case in every mode, keeping the median of the repeats
+
+    Args:
+        cases (dict): Maps case names to ADT paths
+        repeat (int, optional): Runs per case and mode. Defaults to 3.
+
+    Returns:
+        dict: Results, keyed by case then mode
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="submitter-bench-") as volume:
+        engine = _benchmark_engine(volume)
+        for name, path in cases.items():
+            for mode, validate in MODES.items():
+                runs = [run_case(engine, path, validate) for _ in range(repeat)]
+                result = _median(runs)
+                memory = flatten(
+                    run_case(engine, path, validate, trace_memory=True)
+                )
+                for key, value in flatten(result).items():
+                    if key.endswith("/peak_kib"):
+                        _set(result, key, memory[key])
+                results.setdefault(name, {})[mode] = result
+                logging.getLogger("benchmarks").warning(
+                    "{} ({}): {:.3f}s".format(
+                        name, mode, results[name][mode]["pipeline"]["wall"]
+                    )
+                )
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Finds the measurements that regressed against the baseline
+
+    A measurement regresses if it grew by more than tolerance (a fraction)
+    and by more than the MIN_DELTA of its metric.
+
+    Returns:
+        list: Descriptions of the regressions, empty if there are none
+    """
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    for key, value in sorted(current.items()):
+        old = previous.get(key)
+        if old is None or value is None:
+            continue
+        metric = key.rsplit("/", 1)[-1]
+        if value > old * (1 + tolerance) and value - old > MIN_DELTA[metric]:
+            regressions.append(
+                "{}: {:.4g} -> {:.4g} (+{:.0%})".format(
+                    key, old, value, (value - old) / old if old else 1
+                )
+            )
+    return regressions
+
+
+def flatten(results, prefix=""):
+    """Flattens nested results into {"case/mode/phase/metric": value}"""
+    flat = {}
+    for key, value in results.items():
+        path = "{}/{}".format(prefix, key) if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def default_cases(scales, work_dir, generated=()):
+    """The ADTs in tests/templates, scaled-up copies of each, and synthetic
+    ADTs of the given numbers of services"""
+    shutil.copytree(TEMPLATES, work_dir, dirs_exist_ok=True)
+    cases = {}
+    for path in sorted(Path(work_dir).glob("*.yaml")):
+        if "topology_template" not in path.read_text():
+            continue
+        cases[path.stem] = path
+        for factor in scales:
+            cases["{}-x{}".format(path.stem, factor)] = scale_adt(
+                path, factor, work_dir
+            )
+    for services in generated:
+        path = Path(work_dir) / "generated-{}.yaml".format(services)
+        adt = adt_generator.generate(
+            services=services,
+            hosts=max(1, services // 10),
+            sidecars=1,
+            volumes=1,
+            configs=1,
+            fan_out=5,
+        )
+        utils.dump_order_yaml(adt, str(path))
+        cases[path.stem] = path
+    return cases
+
+
+def _benchmark_engine(volume):
+    """An engine that parses every time, writes only to volume and keeps no state"""
+    engine = submitter_engine.SubmitterEngine(load_state=False)
+    engine.template_cache = LRUCache(maxsize=0)
+    for config in engine.object_config.adaptor_config.values():
+        if config and "volume" in config:
+            config["volume"] = volume + "/"
+    return engine
+
+
+def _set(results, path, value):
+    """Sets a value in nested results by its flattened path"""
+    *parents, last = path.split("/")
+    for key in parents:
+        results = results[key]
+    results[last] = value
+
+
+def _median(runs):
+    """Takes the median of every measurement over several runs"""
+    first = runs[0]
+    if first is None:
+        return None
+    if not isinstance(first, dict):
+        return statistics.median(runs)
+    return {key: _median([run[key] for run in runs]) for key in first}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the validate and translate pipeline"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="write the results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--scale",
+        type=lambda value: [int(x) for x in value.split(",") if x],
+        default=[10],
+        help="comma separated scale factors for the scaled-up ADTs",
+    )
+    parser.add_argument(
+        "--generate",
+        type=lambda value: [int(x) for x in value.split(",") if x],
+        default=[],
+        help="comma separated service counts for generated ADTs",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(name)s %(levelname)s %(message)s",
+    )
+    if not args.verbose:
+        logging.getLogger("submitter").setLevel(logging.CRITICAL)
+        logging.getLogger("adaptor").setLevel(logging.CRITICAL)
+        logging.getLogger("adaptors").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "date": datetime.now(timezone.utc).isoformat(),
+                "repeat": args.repeat,
+            },
+            "results": run(
+                default_cases(args.scale, work_dir, args.generate), args.repeat
+            ),
+        }
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(
+            results["results"], baseline["results"], args.tolerance
+        )
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            return 1
+        print("No regressions against {}".format(args.baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,40 @@
 from abc import ABC, abstractmethod
 
+from submitter import events, retry
+
 class Adaptor(ABC):
 
+    # Names of the adaptors whose steps must finish before this one starts
+    depends_on = ()
+
+    # TOSCA interface of the nodes this adaptor orchestrates, so updates
+    # to other nodes can skip it (see also ``types`` in adaptor_config)
+    lifecycle = None
+
     @abstractmethod
     def __init__(self):
         super(Adaptor, self).__init__()
 
+    def __setattr__(self, name, value):
+        """Publish changes to the status of adaptors working on an app"""
+        changed = name == "status" and getattr(self, "status", None) != value
+        super(Adaptor, self).__setattr__(name, value)
+        app_id = self.__dict__.get("_app_id")
+        if changed and app_id:
+            events.BUS.publish(
+                events.ADAPTOR_STATUS,
+                app_id,
+                adaptor=type(self).__name__,
+                status=value,
+            )
+
+    def retry_policy(self, **changes):
+        """The retry policy of the adaptor, set by ``retry`` in its config"""
+        config = getattr(self, "config", None) or {}
+        return retry.RetryPolicy.from_config(
+            type(self).__name__, config.get("retry"), **changes
+        )
+
     @abstractmethod
     def translate(self):
         pass
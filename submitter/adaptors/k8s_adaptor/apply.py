@@ -0,0 +1,424 @@
+"""
+MiCADO Submitter Engine Kubernetes Apply
+----------------------------------------
+Applies and deletes manifests through the Kubernetes API, with
+server-side apply over one pooled connection, instead of forking kubectl
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from submitter.abstracts.exceptions import AdaptorCritical
+from submitter.retry import RetryPolicy
+
+logger = logging.getLogger("adaptors.k8s_adaptor")
+
+FIELD_MANAGER = "micado-submitter"
+POOL_SIZE = 8
+
+# Applied before, and deleted after, the objects that may live in them
+FIRST_KINDS = ("Namespace", "CustomResourceDefinition")
+
+# Kinds pruned by kubectl apply --prune by default
+PRUNE_KINDS = (
+    ("v1", "ConfigMap"),
+    ("v1", "Endpoints"),
+    ("v1", "Namespace"),
+    ("v1", "PersistentVolumeClaim"),
+    ("v1", "PersistentVolume"),
+    ("v1", "Pod"),
+    ("v1", "ReplicationController"),
+    ("v1", "Secret"),
+    ("v1", "Service"),
+    ("batch/v1", "Job"),
+    ("batch/v1", "CronJob"),
+    ("networking.k8s.io/v1", "Ingress"),
+    ("apps/v1", "DaemonSet"),
+    ("apps/v1", "Deployment"),
+    ("apps/v1", "ReplicaSet"),
+    ("apps/v1", "StatefulSet"),
+)
+
+LAST_APPLIED = "kubectl.kubernetes.io/last-applied-configuration"
+
+APPLIED, DELETED, PRUNED, NOT_FOUND, FAILED = (
+    "applied",
+    "deleted",
+    "pruned",
+    "not found",
+    "failed",
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def shared_client(pool_size=POOL_SIZE):
+    """Returns the API client shared by the process, from kubeconfig
+
+    Its connection pool holds pool_size connections, so that many
+    objects can be applied at once over kept-alive connections.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from kubernetes import client, config
+
+            configuration = client.Configuration()
+            config.load_kube_config(client_configuration=configuration)
+            configuration.connection_pool_maxsize = pool_size
+            _client = client.ApiClient(configuration)
+        return _client
+
+
+class ApplyResult:
+    """What happened to one object
+
+    Attributes:
+        kind (str): Kind of the object
+        name (str): Name of the object
+        namespace (str): Namespace of the object, None if cluster-wide
+        action (str): One of applied, deleted, pruned, not found or failed
+        error (str): Why the object failed, None if it did not
+    """
+
+    __slots__ = ("kind", "name", "namespace", "action", "error")
+
+    def __init__(self, kind, name, namespace, action, error=None):
+        self.kind = kind
+        self.name = name
+        self.namespace = namespace
+        self.action = action
+        self.error = error
+
+    @classmethod
+    def of(cls, manifest, action, error=None):
+        metadata = manifest.get("metadata") or {}
+        return cls(
+            manifest.get("kind"),
+            metadata.get("name"),
+            metadata.get("namespace"),
+            action,
+            error,
+        )
+
+    @property
+    def failed(self):
+        return self.action == FAILED
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __str__(self):
+        name = "/".join(filter(None, (self.namespace, self.name)))
+        text = "{} {}: {}".format(self.kind, name, self.action)
+        return "{} ({})".format(text, self.error) if self.error else text
+
+
+class ApplyError(AdaptorCritical):
+    """Some objects could not be applied or deleted
+
+    Attributes:
+        results (list): ApplyResult of every object
+    """
+
+    def __init__(self, operation, results):
+        self.results = results
+        failed = [str(result) for result in results if result.failed]
+        super().__init__(
+            "Could not {} {} of {} objects: {}".format(
+                operation, len(failed), len(results), "; ".join(failed)
+            )
+        )
+
+
+class ApplyEngine:
+    """Applies and deletes manifests with the Kubernetes API
+
+    Objects are sent with server-side apply, so the API server merges
+    them with what is running and records who owns which field, and no
+    copy of the manifest is stored in an annotation. Namespaces and CRDs
+    go first, then the other objects in parallel, over the connection
+    pool of the API client. API discovery is done once per engine.
+
+    Args:
+        api_client (kubernetes.client.ApiClient, optional): Client to use.
+            Defaults to the client shared by the process.
+        field_manager (str, optional): Owner of the applied fields.
+            Defaults to FIELD_MANAGER.
+        workers (int, optional): Objects sent at once. Defaults to
+            POOL_SIZE.
+        namespace (str, optional): Namespace of namespaced objects that
+            do not give one. Defaults to "default".
+        cache_file (str, optional): Where to cache API discovery.
+            Defaults to a file in the temporary directory.
+    """
+
+    def __init__(
+        self,
+        api_client=None,
+        field_manager=FIELD_MANAGER,
+        workers=POOL_SIZE,
+        namespace="default",
+        cache_file=None,
+    ):
+        from kubernetes.dynamic import DynamicClient
+
+        self.api_client = api_client or shared_client()
+        self.field_manager = field_manager
+        self.workers = workers
+        self.namespace = namespace
+        self.dynamic = DynamicClient(self.api_client, cache_file=cache_file)
+        # Discovery refreshes its cache when a kind is not found, which is
+        # not safe while other threads read it
+        self._discovery_lock = threading.Lock()
+
+    def apply(self, manifests):
+        """Creates or updates the objects of the manifests
+
+        Raises:
+            ApplyError: If any object could not be applied, naming it
+
+        Returns:
+            list: ApplyResult of every object, in manifest order
+        """
+        return self._in_waves("apply", manifests, self._apply_one)
+
+    def delete(self, manifests, timeout=90):
+        """Deletes the objects of the manifests, and waits up to timeout
+        seconds for them to be gone. Missing objects are not an error.
+
+        Raises:
+            ApplyError: If any object could not be deleted, naming it
+
+        Returns:
+            list: ApplyResult of every object, in manifest order
+        """
+        results = self._in_waves(
+            "delete", manifests, self._delete_one, reverse=True
+        )
+        if timeout:
+            self._wait_until_gone(
+                [m for m, r in zip(manifests, results) if r.action == DELETED],
+                timeout,
+            )
+        return results
+
+    def prune(self, manifests, label_selector, kinds=PRUNE_KINDS, namespaces=None):
+        """Deletes the objects with the label that are not in manifests,
+        like kubectl apply --prune -l --prune-allowlist
+
+        Only objects applied by this engine, or by kubectl, are pruned,
+        so objects created by controllers (ReplicaSets, Pods...) stay.
+
+        Args:
+            kinds (list, optional): (apiVersion, kind) pairs to look for
+                objects in. Defaults to the kinds kubectl prunes.
+            namespaces (list, optional): Namespaces to look for namespaced
+                objects in. Defaults to None, for every namespace.
+
+        Returns:
+            list: ApplyResult of every pruned object
+        """
+        keep = {self._key(manifest) for manifest in manifests}
+        searches = []
+        for api_version, kind in kinds:
+            try:
+                resource = self._resource({"apiVersion": api_version, "kind": kind})
+            except Exception as error:
+                logger.debug("Cannot find {} to prune: {}".format(kind, error))
+                continue
+            if resource.namespaced and namespaces is not None:
+                searches.extend((resource, namespace) for namespace in namespaces)
+            else:
+                searches.append((resource, None))
+
+        def search(args):
+            resource, namespace = args
+            try:
+                found = self.dynamic.get(
+                    resource, namespace=namespace, label_selector=label_selector
+                )
+            except Exception as error:
+                logger.debug("Cannot list {} to prune: {}".format(resource.kind, error))
+                return []
+            items = found.to_dict().get("items") or []
+            for item in items:
+                item.setdefault("apiVersion", resource.group_version)
+                item.setdefault("kind", resource.kind)
+            return items
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            found = [item for items in executor.map(search, searches) for item in items]
+        stale = {
+            self._key(item): item
+            for item in found
+            if self._key(item) not in keep and self._owns(item)
+        }
+
+        results = self._in_waves(
+            "prune", list(stale.values()), self._delete_one, reverse=True
+        )
+        for result in results:
+            result.action = PRUNED if result.action == DELETED else result.action
+        return results
+
+    def scope(self, *manifest_lists):
+        """The kinds and namespaces of the objects in the manifests
+
+        Pruning across just these is faster than across every kind
+        kubectl prunes, and cannot touch kinds that were never deployed.
+        A kind sent as several apiVersions is looked for in the first.
+
+        Returns:
+            tuple: (apiVersion, kind) pairs and namespaces, sorted
+        """
+        kinds, namespaces = {}, set()
+        for manifest in (m for manifests in manifest_lists for m in manifests):
+            kinds.setdefault(manifest["kind"], manifest["apiVersion"])
+            namespace = self._key(manifest)[1]
+            if namespace:
+                namespaces.add(namespace)
+        return (
+            sorted((api_version, kind) for kind, api_version in kinds.items()),
+            sorted(namespaces),
+        )
+
+    def delete_nodes(self, label_selector):
+        """Deletes the cluster nodes with the label"""
+        from kubernetes.client import CoreV1Api
+
+        CoreV1Api(self.api_client).delete_collection_node(
+            label_selector=label_selector
+        )
+
+    def _apply_one(self, manifest):
+        resource = self._resource(manifest)
+        namespace = self._namespace(resource, manifest)
+        self.dynamic.server_side_apply(
+            resource,
+            body=_plain(manifest),
+            namespace=namespace,
+            field_manager=self.field_manager,
+            force_conflicts=True,
+        )
+        return APPLIED
+
+    def _delete_one(self, manifest):
+        from kubernetes.dynamic.exceptions import NotFoundError
+
+        resource = self._resource(manifest)
+        try:
+            self.dynamic.delete(
+                resource,
+                name=manifest["metadata"]["name"],
+                namespace=self._namespace(resource, manifest),
+                propagation_policy="Background",
+            )
+        except NotFoundError:
+            return NOT_FOUND
+        return DELETED
+
+    def _in_waves(self, operation, manifests, step, reverse=False):
+        """Runs step on every manifest, FIRST_KINDS in a wave of their own"""
+        first = [i for i, m in enumerate(manifests) if m.get("kind") in FIRST_KINDS]
+        rest = sorted(set(range(len(manifests))) - set(first))
+        waves = [rest, first] if reverse else [first, rest]
+
+        results = [None] * len(manifests)
+
+        def run(index):
+            manifest = manifests[index]
+            try:
+                results[index] = ApplyResult.of(manifest, step(manifest))
+            except Exception as error:
+                results[index] = ApplyResult.of(manifest, FAILED, _reason(error))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for wave in waves:
+                list(executor.map(run, wave))
+
+        for result in results:
+            log = logger.error if result.failed else logger.debug
+            log("{}: {}".format(operation, result))
+        if any(result.failed for result in results):
+            raise ApplyError(operation, results)
+        return results
+
+    def _wait_until_gone(self, manifests, timeout):
+        from kubernetes.dynamic.exceptions import NotFoundError
+
+        manifests = list(manifests)
+
+        def remaining():
+            left = []
+            for manifest in manifests:
+                resource = self._resource(manifest)
+                try:
+                    self.dynamic.get(
+                        resource,
+                        name=manifest["metadata"]["name"],
+                        namespace=self._namespace(resource, manifest),
+                    )
+                except NotFoundError:
+                    continue
+                left.append(manifest)
+            manifests[:] = left
+            return left
+
+        policy = RetryPolicy(
+            "k8s-delete", attempts=None, deadline=timeout, base_delay=0.5, max_delay=5
+        )
+        if policy.call(remaining, retry_on=(), retry_if_result=bool):
+            logger.warning(
+                "Timed out waiting for {} objects to be deleted".format(len(manifests))
+            )
+
+    def _resource(self, manifest):
+        with self._discovery_lock:
+            return self.dynamic.resources.get(
+                api_version=manifest["apiVersion"], kind=manifest["kind"]
+            )
+
+    def _namespace(self, resource, manifest):
+        if not resource.namespaced:
+            return None
+        return (manifest.get("metadata") or {}).get("namespace") or self.namespace
+
+    def _key(self, manifest):
+        """What identifies an object, whichever group or version it was
+        sent as: kind, namespace and name"""
+        metadata = manifest.get("metadata") or {}
+        try:
+            namespace = self._namespace(self._resource(manifest), manifest)
+        except Exception:
+            namespace = metadata.get("namespace")
+        return (manifest.get("kind"), namespace, metadata.get("name"))
+
+    def _owns(self, item):
+        """True if the object was applied by this engine or by kubectl"""
+        metadata = item.get("metadata") or {}
+        if LAST_APPLIED in (metadata.get("annotations") or {}):
+            return True
+        return any(
+            field.get("manager") == self.field_manager
+            and field.get("operation") == "Apply"
+            for field in metadata.get("managedFields") or []
+        )
+
+
+def _plain(manifest):
+    """The manifest as plain JSON types, ruamel maps and all"""
+    return json.loads(json.dumps(manifest))
+
+
+def _reason(error):
+    """The message of an API error, or the error itself"""
+    body = getattr(error, "body", None)
+    if body:
+        try:
+            return json.loads(body)["message"]
+        except (ValueError, KeyError, TypeError):
+            pass
+    return str(error)
@@ -0,0 +1,63 @@
+"""
+MiCADO Submitter Engine Kubernetes Diff
+---------------------------------------
+Compares two deployments of manifests object by object, to apply only
+what changed between them
+"""
+import json
+
+
+def manifest_key(manifest):
+    """What identifies an object: apiVersion, kind, namespace and name"""
+    metadata = manifest.get("metadata") or {}
+    return (
+        manifest.get("apiVersion"),
+        manifest.get("kind"),
+        metadata.get("namespace"),
+        metadata.get("name"),
+    )
+
+
+def normalise(manifest):
+    """The manifest as plain JSON types, so that ruamel maps, key order
+    and YAML quoting do not count as changes"""
+    return json.loads(json.dumps(manifest, sort_keys=True))
+
+
+class ManifestDiff:
+    """The objects to create, patch and delete to go from one list of
+    manifests to another
+
+    Attributes:
+        created (list): New manifests of objects not in the old list
+        changed (list): New manifests of objects that differ from the old
+        removed (list): Old manifests of objects not in the new list
+        unchanged (list): New manifests of objects that are the same
+    """
+
+    def __init__(self, old, new):
+        old = {manifest_key(m): normalise(m) for m in old}
+        new = {manifest_key(m): normalise(m) for m in new}
+
+        self.created = [m for key, m in new.items() if key not in old]
+        self.changed = [m for key, m in new.items() if old.get(key, m) != m]
+        self.unchanged = [m for key, m in new.items() if old.get(key) == m]
+
+        # An object moved to another apiVersion is patched, not deleted
+        moved = {key[1:] for key in new}
+        self.removed = [
+            m for key, m in old.items() if key not in new and key[1:] not in moved
+        ]
+
+    @property
+    def to_apply(self):
+        """Manifests to send to the API server"""
+        return self.created + self.changed
+
+    def __bool__(self):
+        return bool(self.created or self.changed or self.removed)
+
+    def __str__(self):
+        return "{} to create, {} to patch, {} to delete, {} unchanged".format(
+            len(self.created), len(self.changed), len(self.removed), len(self.unchanged)
+        )
@@ -1,23 +1,16 @@
 import os
-import subprocess
 import logging
-import filecmp
-import copy
 import base64
 import json
-import kubernetes_validate
-from kubernetes_validate.utils import (
-    SchemaNotFoundError,
-    VersionNotSupportedError,
-    InvalidSchemaError,
-    ValidationError,
-)
 
 from toscaparser.tosca_template import ToscaTemplate
 
 from submitter import utils
 from submitter.abstracts import base_adaptor
 from submitter.abstracts.exceptions import AdaptorCritical, TranslateError
+from .apply import ApplyEngine, ApplyError
+from .diff import ManifestDiff
+from .validation import INVALID, ManifestValidator
 from .zorp import ZorpManifests
 from .manifest import get_manifest_type
 from .tosca import Prefix, NodeType, Interface, NetworkProxy
@@ -32,6 +25,15 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
     and the subsequent execution, update and undeployment of the translation.
     """
 
+    # SecurityPolicyManager creates the Kubernetes secrets of the app
+    depends_on = (
+        "SecurityPolicyManagerAdaptor",
+        "TerraformAdaptor",
+        "OccopusAdaptor",
+        "AnsibleAdaptor",
+    )
+    lifecycle = Interface.KUBERNETES
+
     def __init__(
         self, adaptor_id, config, dryrun, validate=False, template=None
     ):
@@ -66,6 +68,7 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
         self.ingress_conf = []
         self.ingress_secrets = {}
         self.validate = validate
+        self._apply_engine = None
         logger.info("Kubernetes Adaptor is ready.")
         self.status = "Initialised"
 
@@ -100,26 +103,28 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
             self.status = "Skipped Translation"
             return
 
-        unvalidated_kinds = self.config.get("unvalidated_kinds", [])
         k8s_version = self.config.get("k8s_version", "1.18.0")
-        for manifest in self.manifests:
-            if manifest["kind"] in unvalidated_kinds:
+        validator = ManifestValidator(
+            k8s_version,
+            skip_kinds=self.config.get("unvalidated_kinds", []),
+            workers=self.config.get("validation_workers", 1),
+            min_parallel=self.config.get("validation_min_parallel"),
+        )
+        for manifest, outcome in zip(
+            self.manifests, validator.check(self.manifests)
+        ):
+            if outcome is None:
                 continue
-            try:
-                kubernetes_validate.validate(manifest, k8s_version, strict=True)
-            except ValidationError as err:
-                message = f"Invalid K8s Manifest: {err.message}\n\n{manifest}"
-                logger.error(message)
-                raise AdaptorCritical(message) from None
-            except (InvalidSchemaError, SchemaNotFoundError):
+            problem, error = outcome
+            if problem == INVALID:
+                message = f"Invalid K8s Manifest: {error}\n\n{manifest}"
+            else:
                 message = (
                     f"Schema for {manifest['apiVersion']}/{manifest['kind']} "
                     f"not found in Kubernetes v{k8s_version}"
                 )
-                logger.error(message)
-                raise AdaptorCritical(message) from None
-            except VersionNotSupportedError:
-                pass
+            logger.error(message)
+            raise AdaptorCritical(message)
 
         if not write_files:
             pass
@@ -133,7 +138,6 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
 
     def _translate_node_templates(self, node):
         _name_check_node(node)
-        node = copy.deepcopy(node)
         manifests = []
 
         if not utils.check_lifecycle(node, Interface.KUBERNETES):
@@ -275,31 +279,12 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
         if self._skip_check():
             return
 
+        manifests = utils.get_list_yaml(self.manifest_path)
+        engine = self._get_apply_engine()
+        logger.debug(f"Applying {len(manifests)} objects")
+        engine.apply(manifests)
         if update:
-            operation = [
-                "kubectl",
-                "apply",
-                "--prune",
-                "-l",
-                f"app.kubernetes.io/instance={self.short_id}",
-                "-f",
-                self.manifest_path,
-            ]
-        else:
-            operation = [
-                "kubectl",
-                "create",
-                "-f",
-                self.manifest_path,
-                "--save-config",
-            ]
-        try:
-            logger.debug(f"Executing {operation}")
-            subprocess.run(operation, stderr=subprocess.PIPE, check=True)
-
-        except subprocess.CalledProcessError as e:
-            logger.error(f"kubectl: {e.stderr}")
-            raise AdaptorCritical(f"kubectl: {e.stderr}")
+            self._prune(engine, manifests)
 
         #logger.info("Kube objects deployed, trying to get outputs...")
         #self._get_outputs()
@@ -323,19 +308,54 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
         elif not self.manifests:
             logger.info("No nodes to orchestrate with Kubernetes. Skipping...")
             self.status = "Skipped Update"
-        elif os.path.exists(self.manifest_path) and filecmp.cmp(
-            self.manifest_path, self.manifest_tmp_path
-        ):
-            logger.debug(f"No update - removing {self.manifest_tmp_path}")
-            os.remove(self.manifest_tmp_path)
-            logger.info("Nothing to update")
-            self.status = "Updated (nothing to update)"
-        else:
+        elif not os.path.exists(self.manifest_path):
             logger.debug("Updating Kubernetes workloads")
             os.rename(self.manifest_tmp_path, self.manifest_path)
             self.execute(True)
             logger.info("Update complete")
             self.status = "Updated"
+        else:
+            deployed = utils.get_list_yaml(self.manifest_path)
+            manifests = utils.get_list_yaml(self.manifest_tmp_path)
+            changes = ManifestDiff(deployed, manifests)
+            if not changes:
+                logger.debug(f"No update - removing {self.manifest_tmp_path}")
+                os.remove(self.manifest_tmp_path)
+                logger.info("Nothing to update")
+                self.status = "Updated (nothing to update)"
+                return
+
+            logger.debug(f"Updating Kubernetes workloads: {changes}")
+            if self._skip_check():
+                os.rename(self.manifest_tmp_path, self.manifest_path)
+                return
+            self._apply_changes(changes, manifests, deployed)
+            # Only now, so that a failed update is diffed again on retry
+            os.rename(self.manifest_tmp_path, self.manifest_path)
+            logger.info("Update complete")
+            self.status = "Updated"
+
+    def _apply_changes(self, changes, manifests, deployed):
+        """Applies the created and changed objects, deletes the removed"""
+        engine = self._get_apply_engine()
+        if changes.to_apply:
+            engine.apply(changes.to_apply)
+        if changes.removed:
+            engine.delete(changes.removed, timeout=None)
+        self._prune(engine, manifests, deployed)
+
+    def _prune(self, engine, manifests, deployed=()):
+        """Prunes objects of the app that are not in manifests, only
+        across the kinds and namespaces of the new and deployed manifests"""
+        kinds, namespaces = engine.scope(manifests, deployed)
+        logger.debug(f"Pruning {len(kinds)} kinds in {namespaces}")
+        pruned = engine.prune(
+            manifests,
+            f"app.kubernetes.io/instance={self.short_id}",
+            kinds=kinds,
+            namespaces=namespaces,
+        )
+        logger.debug(f"Pruned {len(pruned)} objects")
 
     def undeploy(self, kill_nodes=True):
         """ Undeploy """
@@ -346,36 +366,21 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
         if self._skip_check():
             return
 
+        engine = self._get_apply_engine()
         if kill_nodes:
             # Delete nodes from the cluster
-            operation = [
-                "kubectl",
-                "delete",
-                "no",
-                "-l",
-                "micado.eu/node_type",
-            ]
             try:
-                logger.debug(f"Undeploy {operation}")
-                subprocess.run(operation, stderr=subprocess.PIPE, check=True)
-            except subprocess.CalledProcessError:
-                logger.debug("Got error deleting nodes")
+                logger.debug("Undeploy nodes labelled micado.eu/node_type")
+                engine.delete_nodes("micado.eu/node_type")
+            except Exception as e:
+                logger.debug(f"Got error deleting nodes: {e}")
                 error = True
 
         # Delete resources in the manifest
-        operation = [
-            "kubectl",
-            "delete",
-            "-f",
-            self.manifest_path,
-            "--timeout",
-            "90s",
-        ]
         try:
-            logger.debug(f"Undeploy {operation}")
-            subprocess.run(operation, stderr=subprocess.PIPE, check=True)
-        except subprocess.CalledProcessError:
-            logger.debug("Had some trouble removing Kubernetes workloads...")
+            engine.delete(utils.get_list_yaml(self.manifest_path), timeout=90)
+        except (ApplyError, OSError) as e:
+            logger.debug(f"Had some trouble removing Kubernetes workloads: {e}")
             error = True
 
         if error:
@@ -412,12 +417,22 @@ class KubernetesAdaptor(base_adaptor.Adaptor):
             else:
                 logger.warning(f"{node.name} is not a Docker container!")
 
+    def _get_apply_engine(self):
+        """ The engine applying manifests, connected on first use """
+        if self._apply_engine is None:
+            try:
+                self._apply_engine = ApplyEngine()
+            except Exception as e:
+                logger.error(f"Cannot reach Kubernetes: {e}")
+                raise AdaptorCritical(f"Cannot reach Kubernetes: {e}")
+        return self._apply_engine
+
     def _config_file_exists(self):
         """ Check if config file was generated during translation """
         return os.path.exists(self.manifest_path)
 
     def _skip_check(self):
-        if not self._config_file_exists:
+        if not self._config_file_exists():
             logger.info(f"No config generated, skipping {self.status} step...")
             self.status = "Skipped"
             return True
@@ -80,7 +80,7 @@ def get_node_info(node, repositories=None):
     """Check the node name for errors (underscores)
 
     Returns:
-        toscaparser.nodetemplate.NodeTemplate: a deepcopy of a NodeTemplate
+        NodeInfo: the node's data, which the caller may change
     """
     if not repositories:
         repositories = []
@@ -88,7 +88,7 @@ def get_node_info(node, repositories=None):
     return NodeInfo(
         name=node.name,
         type=node.type,
-        properties={x: y.value for x, y in node.get_properties().items()},
+        properties=utils.get_property_values(node),
         inputs=utils.get_lifecycle(node, Interface.KUBERNETES).get(
             "create", {}
         ),
@@ -127,7 +127,9 @@ def _get_matching_requirement(name, requirements):
             continue
         if not inner_dict["node"] == name:
             continue
-        return inner_dict.get("relationship", {}).get("properties", {})
+        return utils.copy_data(
+            inner_dict.get("relationship", {}).get("properties", {})
+        )
     return {}
 
 
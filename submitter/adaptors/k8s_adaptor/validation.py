@@ -0,0 +1,217 @@
+"""
+MiCADO Submitter Engine Kubernetes Validation
+---------------------------------------------
+Validates manifests against the schemas bundled with kubernetes_validate,
+compiling each schema once, remembering results by manifest, and
+optionally spreading the work over processes
+"""
+import collections
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import jsonschema
+import kubernetes_validate
+from kubernetes_validate.utils import (
+    InvalidSchemaError,
+    SchemaNotFoundError,
+    VersionNotSupportedError,
+    all_versions,
+    latest_version,
+    major_minor,
+)
+
+logger = logging.getLogger("adaptors.k8s_adaptor")
+
+SCHEMA_DIR = os.path.join(
+    os.path.dirname(kubernetes_validate.__file__), "kubernetes-json-schema"
+)
+MEMO_SIZE = 4096
+# Fewer manifests than this are not worth sending to other processes,
+# unless configured otherwise (validation_min_parallel in key_config.yml)
+MIN_PARALLEL = 100
+
+# Problems found with a manifest
+INVALID, NO_SCHEMA = "invalid", "no schema"
+
+_memo = collections.OrderedDict()
+_memo_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ManifestValidator:
+    """Validates manifests for a version of Kubernetes
+
+    Each schema is loaded, and its references resolved, once per process
+    for a kind and version, instead of for every manifest. Results are
+    remembered by a hash of the manifest, so manifests that did not
+    change since the last translation are not validated again.
+
+    Args:
+        k8s_version (str): Version of Kubernetes to validate for
+        strict (bool, optional): Reject fields unknown to the schema.
+            Defaults to True.
+        skip_kinds (list, optional): Kinds not to validate. Defaults to ().
+        workers (int, optional): Processes to validate in, 1 to validate
+            in this one. Defaults to 1.
+        min_parallel (int, optional): Fewest manifests to validate in
+            parallel. Defaults to MIN_PARALLEL.
+    """
+
+    def __init__(
+        self, k8s_version, strict=True, skip_kinds=(), workers=1, min_parallel=None
+    ):
+        self.k8s_version = k8s_version
+        self.strict = strict
+        self.skip_kinds = set(skip_kinds)
+        self.workers = workers
+        self.min_parallel = min_parallel
+
+    def check(self, manifests):
+        """Validates the manifests
+
+        Returns:
+            list: For every manifest, None if it is valid (or there is no
+                schema for this version of Kubernetes), else a tuple of
+                the problem, INVALID or NO_SCHEMA, and the error message
+        """
+        outcomes = [None] * len(manifests)
+        pending = {}
+        for index, manifest in enumerate(manifests):
+            if manifest["kind"] in self.skip_kinds:
+                continue
+            key = self._memo_key(manifest)
+            with _memo_lock:
+                if key in _memo:
+                    _memo.move_to_end(key)
+                    outcomes[index] = _memo[key]
+                    continue
+            pending.setdefault(key, []).append(index)
+
+        keys = list(pending)
+        plain = [_plain(manifests[pending[key][0]]) for key in keys]
+        args = [self.k8s_version] * len(keys), [self.strict] * len(keys)
+        min_parallel = self.min_parallel or MIN_PARALLEL
+        if self.workers > 1 and len(keys) >= min_parallel:
+            logger.debug(f"Validating {len(keys)} manifests in parallel")
+            chunksize = max(1, len(keys) // (self.workers * 4))
+            results = _get_executor(self.workers).map(
+                check_manifest, plain, *args, chunksize=chunksize
+            )
+        else:
+            results = map(check_manifest, plain, *args)
+
+        for key, outcome in zip(keys, results):
+            _remember(key, outcome)
+            for index in pending[key]:
+                outcomes[index] = outcome
+        return outcomes
+
+    def _memo_key(self, manifest):
+        data = json.dumps(manifest, sort_keys=True, default=str)
+        data = f"{self.k8s_version}:{self.strict}:{data}"
+        return hashlib.sha256(data.encode()).hexdigest()
+
+
+def check_manifest(manifest, k8s_version, strict=True):
+    """Validates one manifest, see ManifestValidator.check"""
+    try:
+        validator, lock = get_validator(
+            manifest["kind"], manifest["apiVersion"], k8s_version, strict
+        )
+    except VersionNotSupportedError:
+        return None
+    except (SchemaNotFoundError, InvalidSchemaError) as error:
+        return NO_SCHEMA, error.message
+
+    with lock:
+        error = jsonschema.exceptions.best_match(validator.iter_errors(manifest))
+    if error is None:
+        return None
+    return INVALID, error.message
+
+
+@lru_cache(maxsize=None)
+def get_validator(kind, api_version, k8s_version, strict=True):
+    """The compiled schema for a kind and version, with a lock to use it
+
+    Mirrors how kubernetes_validate.validate finds the schema file, but
+    keeps the validator, so that the schema is not parsed, checked and
+    resolved again for every manifest. The resolver it holds is not
+    thread-safe, hence the lock.
+
+    Raises:
+        VersionNotSupportedError: If there are no schemas for the version
+        SchemaNotFoundError: If there is no schema for the kind
+        InvalidSchemaError: If the schema cannot be parsed
+    """
+    version = _schema_version(k8s_version)
+    # e.g. rbac.authorization.k8s.io/v1 -> rbac-v1
+    group_version = re.sub(r"^([^./]*)(?:\.[^/]*)?/", r"\1-", api_version)
+    schema_dir = os.path.join(
+        SCHEMA_DIR, f"v{version}-local" + ("-strict" if strict else "")
+    )
+    schema_file = os.path.join(schema_dir, f"{kind.lower()}-{group_version}.json")
+    try:
+        with open(schema_file) as file:
+            schema = json.load(file)
+    except OSError:
+        if not os.path.isdir(schema_dir):
+            raise VersionNotSupportedError(version=k8s_version) from None
+        raise SchemaNotFoundError(
+            version=major_minor(k8s_version), kind=kind, api_version=api_version
+        ) from None
+    except ValueError:
+        raise InvalidSchemaError(f"Couldn't parse schema {schema_file}") from None
+
+    resolver = jsonschema.RefResolver(
+        base_uri="file://" + os.path.abspath(schema_dir) + "/", referrer=schema
+    )
+    cls = jsonschema.validators.validator_for(schema)
+    return cls(schema, resolver=resolver), threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _schema_version(k8s_version):
+    """The newest bundled schema version not newer than k8s_version"""
+    k8s_version = k8s_version.lstrip("v")
+    if major_minor(k8s_version) > latest_version():
+        raise VersionNotSupportedError(version=major_minor(k8s_version))
+    return [
+        version
+        for version in all_versions()
+        if major_minor(version) <= major_minor(k8s_version)
+    ][-1]
+
+
+def _remember(key, outcome):
+    with _memo_lock:
+        _memo[key] = outcome
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+
+
+def _get_executor(workers):
+    """The process pool shared by validators, kept between translations
+    so that the workers keep their compiled schemas"""
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor._max_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _plain(manifest):
+    """The manifest as plain JSON types, ruamel maps and all"""
+    return json.loads(json.dumps(manifest, default=str))
@@ -1,17 +1,14 @@
 import filecmp
 import os
 import base64
-import copy
 import logging
-import time
 
 import jinja2
-import requests
 from toscaparser.tosca_template import ToscaTemplate
 
 from submitter.abstracts import base_adaptor as abco
 from submitter.abstracts.exceptions import AdaptorCritical
-from submitter import utils
+from submitter import retry, utils
 
 logger = logging.getLogger("adaptor."+__name__)
 
@@ -19,6 +16,8 @@ RUNCMD_PLACEHOLDER = "echo micado runcmd placeholder"
 
 class OccopusAdaptor(abco.Adaptor):
 
+    lifecycle = "Occopus"
+
     def __init__(self, adaptor_id, config, dryrun, validate=False, template=None):
         super().__init__()
         """
@@ -32,7 +31,10 @@ class OccopusAdaptor(abco.Adaptor):
         self.validate = validate
         self.node_prefix = "node_def:"
         self.node_name = ""
+        self.app_dir = self.config.get("app_dir", "")
         self.worker_infra_name = "micado_worker_infra"
+        if self.app_dir:
+            self.worker_infra_name += "_" + self.app_dir.strip("/")
         self.min_instances = 1
         self.max_instances = 1
         self.ID = adaptor_id
@@ -54,8 +56,8 @@ class OccopusAdaptor(abco.Adaptor):
 
         self.occopus_address = "occopus:5000"
         self.auth_data_file = "/var/lib/micado/occopus/auth/auth_data.yaml"
-        self.occo_node_path = "/var/lib/micado/occopus/submitter/{}.yaml".format(self.ID)
-        self.occo_infra_path = "/var/lib/micado/occopus/submitter/{}-infra.yaml".format(self.ID)
+        self.occo_node_path = "/var/lib/micado/occopus/submitter/{}{}.yaml".format(self.app_dir, self.ID)
+        self.occo_infra_path = "/var/lib/micado/occopus/submitter/{}{}-infra.yaml".format(self.app_dir, self.ID)
         logger.info("Occopus Adaptor initialised")
 
     def translate(self, tmp=False, to_dict=False):
@@ -75,7 +77,6 @@ class OccopusAdaptor(abco.Adaptor):
 
         for node in self.template.nodetemplates:
 
-            node = copy.deepcopy(node)
             occo_interface = utils.get_lifecycle(node, "Occopus")
             if not occo_interface:
                 continue
@@ -166,10 +167,12 @@ class OccopusAdaptor(abco.Adaptor):
         )
 
         logger.debug("Occopus attach...")
-        occo_api_call = requests.post(
+        occo_api_call = retry.http_request(
+            self.retry_policy(),
+            "post",
             "http://{0}/infrastructures/{1}/attach".format(
                 self.occopus_address, self.worker_infra_name
-            )
+            ),
         )
         if occo_api_call.status_code != 200:
             raise AdaptorCritical("Cannot submit infra to Occopus API!")
@@ -191,7 +194,13 @@ class OccopusAdaptor(abco.Adaptor):
             logger.info("DRY-RUN: deleting infrastructure...")
             self.status = "DRY-RUN Delete"
         else:
-            requests.delete("http://{0}/infrastructures/{1}".format(self.occopus_address, self.worker_infra_name))
+            retry.http_request(
+                self.retry_policy(),
+                "delete",
+                "http://{0}/infrastructures/{1}".format(
+                    self.occopus_address, self.worker_infra_name
+                ),
+            )
             # self.occopus.exec_run("occopus-destroy --auth_data_path {0} -i {1}"
             # .format(self.auth_data_file, self.worker_infra_name))
         self.status = "undeployed"
@@ -251,8 +260,13 @@ class OccopusAdaptor(abco.Adaptor):
             os.rename(self.node_path_tmp, self.node_path)
             os.rename(self.infra_def_path_output_tmp, self.infra_def_path_output)
             # Detach from the infra and rebuild
-            detach = requests.post("http://{0}/infrastructures/{1}/detach"
-                                        .format(self.occopus_address, self.worker_infra_name))
+            detach = retry.http_request(
+                self.retry_policy(),
+                "post",
+                "http://{0}/infrastructures/{1}/detach".format(
+                    self.occopus_address, self.worker_infra_name
+                ),
+            )
             if detach.status_code != 200:
                 raise AdaptorCritical("Cannot detach infra from Occopus API!")
             self.execute()
@@ -391,25 +405,32 @@ class OccopusAdaptor(abco.Adaptor):
 
     def wait_for_volume_update(self, changes):
         """ Wait for update changes to be reflected in the volume """
-        wait_timer = 100
         logger.debug("Waiting for authentication data to update...")
-        while wait_timer > 0:
-            # Read the file in the submitter's auth volume
-            try:
-                auth_data = utils.get_yaml_data(self.auth_data_submitter)
-            except FileNotFoundError:
-                logger.error("Credential file missing...")
-                raise AdaptorCritical
-
-            # Check to see if the necessary changes have been reflected
-            for cloud in auth_data.get("resource", []):
-                cloud_type = cloud["type"]
-                auth_type = cloud["auth_data"].get("type", "")
-                if cloud_type in changes and auth_type == changes[cloud_type]:
-                    return
-            time.sleep(5)           
-            wait_timer -= 5
-        logger.warning("Got timeout while waiting for secret volume to update...")
+        policy = self.retry_policy(attempts=None, deadline=100, budget=None)
+        updated = policy.call(
+            self._volume_updated,
+            changes,
+            retry_on=(),
+            retry_if_result=lambda updated: not updated,
+        )
+        if not updated:
+            logger.warning("Got timeout while waiting for secret volume to update...")
+
+    def _volume_updated(self, changes):
+        """ Check to see if the necessary changes have been reflected """
+        # Read the file in the submitter's auth volume
+        try:
+            auth_data = utils.get_yaml_data(self.auth_data_submitter)
+        except FileNotFoundError:
+            logger.error("Credential file missing...")
+            raise AdaptorCritical
+
+        for cloud in auth_data.get("resource", []):
+            cloud_type = cloud["type"]
+            auth_type = cloud["auth_data"].get("type", "")
+            if cloud_type in changes and auth_type == changes[cloud_type]:
+                return True
+        return False
 
     def modify_openstack_authentication(self, auth_data, changes):
         """ Modify the OpenStack credential type """
@@ -465,7 +486,7 @@ def fix_endpoint_in_interface(node_data):
 
 def get_host_properties(node):
     """ Get host properties """
-    return {x: y.value for x, y in node.get_properties().items()}
+    return utils.get_property_values(node)
 
 def get_ec2_host_properties(properties):
     """
@@ -1,14 +1,13 @@
 import os
 import filecmp
 import logging
-import requests
 
 import ruamel.yaml as yaml
 from toscaparser.tosca_template import ToscaTemplate
 
 from submitter.abstracts import base_adaptor as abco
 from submitter.abstracts.exceptions import AdaptorCritical
-from submitter import utils
+from submitter import retry, utils
 
 logger = logging.getLogger("adaptor."+__name__)
 
@@ -19,6 +18,8 @@ PK = (STACK, DATA, SOURCES, CONSTANTS, QUERIES, ALERTS, SCALING, NODES, SERVICES
 
 class PkAdaptor(abco.Adaptor):
 
+    depends_on = ("KubernetesAdaptor",)
+
     def __init__(self, adaptor_id, config, dryrun, validate=False, template=None):
 
         super().__init__()
@@ -88,12 +89,23 @@ class PkAdaptor(abco.Adaptor):
                 return
         else:
             try:
-                with open(self.path, 'rb') as data:
-                    try:
-                        requests.post("http://{0}/policy/start".format(self.config['endpoint']), data=data, headers=headers)
-                    except Exception as e:
-                        logger.error(e)
-                    logger.info("Policy with {0} id is sent.".format(self.ID))
+                # Read it all, so a retry sends the whole file again
+                with open(self.path, 'rb') as file:
+                    data = file.read()
+                try:
+                    retry.http_request(
+                        self.retry_policy(),
+                        "post",
+                        "http://{0}/policy/start".format(self.config['endpoint']),
+                        data=data,
+                        headers=headers,
+                        # Starting a policy is not idempotent, so no
+                        # retry once the policy keeper may have got it
+                        idempotent=False,
+                    )
+                except Exception as e:
+                    logger.error(e)
+                logger.info("Policy with {0} id is sent.".format(self.ID))
             except Exception as e:
                 logger.error(e)
         self.status = "executed"
@@ -106,7 +118,11 @@ class PkAdaptor(abco.Adaptor):
                 logger.info("DRY-RUN: PK deletion in process...")
         else:
             try:
-                requests.post("http://{0}/policy/stop".format(self.config['endpoint']))
+                retry.http_request(
+                    self.retry_policy(),
+                    "post",
+                    "http://{0}/policy/stop".format(self.config['endpoint']),
+                )
             except Exception as e:
                 logger.error(e)
         logger.info("Policy {0} removed.".format(self.ID))
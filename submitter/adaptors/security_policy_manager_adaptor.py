@@ -6,12 +6,12 @@ A TOSCA to Security Policy Manager adaptor.
 """
 
 import logging
-import requests
 
 from toscaparser.tosca_template import ToscaTemplate
 
 from submitter.abstracts import base_adaptor as abco
 from submitter.abstracts.exceptions import AdaptorCritical
+from submitter import retry
 
 SECRET_TYPE = "tosca.policies.Security.MiCADO.Secret.KubernetesSecretDistribution"
 
@@ -82,7 +82,12 @@ class SecurityPolicyManagerAdaptor(abco.Adaptor):
                     else:
                         data_keys = {'name':key, 'value':value}
                         logger.info("launch secret")
-                        response = requests.post("{}/v1.0/appsecrets".format(self.endpoint), json = data_keys)
+                        response = retry.http_request(
+                            self.retry_policy(),
+                            "post",
+                            "{}/v1.0/appsecrets".format(self.endpoint),
+                            json=data_keys,
+                        )
         self.status = "executed"
 
     def undeploy(self):
@@ -95,7 +100,11 @@ class SecurityPolicyManagerAdaptor(abco.Adaptor):
                         logger.info("launch api command to delete secrets with {}/v1.0/appsecrets/{}".format(self.endpoint, key))
                     else:
                         logger.info("launch secret delete")
-                        response = requests.delete("{}/v1.0/appsecrets/{}".format(self.endpoint, key))
+                        response = retry.http_request(
+                            self.retry_policy(),
+                            "delete",
+                            "{}/v1.0/appsecrets/{}".format(self.endpoint, key),
+                        )
         self.status = "undeployed"
 
 
@@ -1,6 +1,5 @@
 import filecmp
 import os
-import copy
 import logging
 import time
 import shutil
@@ -98,6 +97,9 @@ class TerraformDict(dict):
 
 
 class TerraformAdaptor(abco.Adaptor):
+
+    lifecycle = "Terraform"
+
     def __init__(self, adaptor_id, config, dryrun, validate=False, template=None):
         """
         Constructor method of the Adaptor
@@ -107,6 +109,7 @@ class TerraformAdaptor(abco.Adaptor):
             raise AdaptorCritical("Template is not a valid TOSCAParser object")
         self.status = "init"
         self.dryrun = dryrun
+        self.config = config
         self.volume = config["volume"]
         self.validate = validate
         self.node_name = ""
@@ -115,7 +118,9 @@ class TerraformAdaptor(abco.Adaptor):
         self.app_name = adaptor_id
         self.template = template
 
-        self.terra_path = "/var/lib/micado/terraform/submitter/"
+        self.terra_path = "/var/lib/micado/terraform/submitter/{}".format(
+            config.get("app_dir", "")
+        )
 
         self.tf_file = "{}{}.tf.json".format(self.volume, self.app_name)
         self.tf_file_tmp = "{}{}.tf.json.tmp".format(self.volume, self.app_name)
@@ -153,7 +158,6 @@ class TerraformAdaptor(abco.Adaptor):
         for node in self.template.nodetemplates:
 
             self.node_name = node.name
-            node = copy.deepcopy(node)
             tf_interface = self._get_terraform_interface(node)
             if not tf_interface:
                 continue
@@ -414,7 +418,7 @@ class TerraformAdaptor(abco.Adaptor):
 
     def _get_properties_values(self, node):
         """ Get host properties """
-        return {x: y.value for x, y in node.get_properties().items()}
+        return utils.get_property_values(node)
 
     def _get_policies(self, node):
         """ Get the TOSCA policies """
@@ -1088,24 +1092,18 @@ class TerraformAdaptor(abco.Adaptor):
 
 
     def _terraform_exec(self, command, success_msg, lock_timeout=0):
-        """Execute the command in the terraform container"""
+        """Execute the command in the terraform container, retrying it
+        while another run holds the state lock, for up to lock_timeout"""
         command = f"cd {self.terra_path} && {command}"
-        while True:
-            try:
-                utils.exec_command_in_deployment(
-                    "terraform", command, success=success_msg
-                )
-            except AdaptorCritical as err:
-                if lock_timeout > 0 and "Error locking state" in str(err):
-                    time.sleep(5)
-                    lock_timeout -= 5
-                    logger.debug(
-                        "Waiting for lock, {}s until timeout".format(lock_timeout)
-                    )
-                    continue
-                else:
-                    raise err from None
-            break
+        policy = self.retry_policy(attempts=None, deadline=lock_timeout, budget=None)
+        policy.call(
+            utils.exec_command_in_deployment,
+            "terraform",
+            command,
+            success=success_msg,
+            retry_on=AdaptorCritical,
+            retry_if_error=lambda err: "Error locking state" in str(err),
+        )
 
     def _terraform_init(self):
         """ Run terraform init in the container """
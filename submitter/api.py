@@ -1,7 +1,10 @@
 import logging
-from flask import Flask
+import time
+
+from flask import Flask, g, request
 from werkzeug.exceptions import HTTPException
 
+from submitter import metrics
 from submitter.submitter_config import SubmitterConfig
 
 logging.config.dictConfig(SubmitterConfig.logging_config)
@@ -15,6 +18,29 @@ app.register_blueprint(v1blueprint)
 app.register_blueprint(v2blueprint, url_prefix="/v2.0/")
 
 
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_latency(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        metrics.API_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            status=response.status_code,
+        )
+    return response
+
+
+@app.route('/metrics')
+def host_metrics():
+    return metrics.REGISTRY.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+
 @app.route('/v2.0/docs/openapi.json')
 def host_openapi():
     return app.send_static_file('openapi.json')
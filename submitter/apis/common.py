@@ -1,13 +1,94 @@
 import json
 import os.path
+import threading
+import time
 
 from flask import abort
 
-from submitter import submitter_engine
 from submitter import api as flask
-from submitter import utils
+from submitter import events, utils
+from submitter.apis.jobs import JobManager
+from submitter.validation_pool import PoolBusy, ValidationPool, ValidationTimeout
+
+_engine = None
+_jobs = None
+_validation_pool = None
+_init_lock = threading.Lock()
+_streams = 0
+_streams_lock = threading.Lock()
+
+# Longest wait of a long-poll, and life of an event stream, in seconds
+MAX_POLL = 60
+STREAM_DURATION = 30
+KEEPALIVE = 15
+# Event streams open at once, each holds one of the 8 gunicorn threads
+MAX_STREAMS = 4
+
+
+def get_engine():
+    """Returns the engine shared by every API, building it on first use
+
+    The engine reads its config and state and imports the parsers, so
+    it is left out of the import of the API to keep worker boots fast.
+    """
+    global _engine, _jobs
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                from submitter.submitter_engine import SubmitterEngine
+
+                engine = SubmitterEngine()
+                _jobs = JobManager(
+                    engine.object_config.main_config.get("job_workers", 1)
+                )
+                _engine = engine
+    return _engine
+
+
+def get_jobs():
+    """Returns the job manager of the shared engine"""
+    get_engine()
+    return _jobs
+
+
+def get_validation_pool():
+    """Returns the pool of validation workers, or None if it is turned off
+
+    The pool is set by validation_pool in main_config, and turned off
+    when it is missing or has no workers.
+    """
+    global _validation_pool
+    if _validation_pool is None:
+        config = get_engine().object_config.main_config.get("validation_pool")
+        if not config or not config.get("workers"):
+            return None
+        with _init_lock:
+            if _validation_pool is None:
+                _validation_pool = ValidationPool(**config)
+    return _validation_pool
+
 
-_engine = submitter_engine.SubmitterEngine()
+def validate_adt(path, params=None):
+    """Validates an ADT without deploying it
+
+    Runs on the validation pool, so a flood of validations does not slow
+    down the deployments of the engine, or in the engine without a pool.
+
+    Raises:
+        PoolBusy: If too many validations are queued
+        ValidationTimeout: If the validation took too long
+
+    Returns:
+        str: Why the ADT is not valid, or None if it is valid
+    """
+    pool = get_validation_pool()
+    if pool is not None:
+        return pool.validate(path, params)["error"]
+    try:
+        get_engine()._validate(path, validate=True, parsed_params=params)
+    except Exception as error:
+        return str(error)
+    return None
 
 
 class Applications:
@@ -22,7 +103,7 @@ class Applications:
             app_id (str, optional): App ID. If ommitted, the full app list
                 will be returned. Defaults to None.
         """
-        self.engine = _engine
+        self.engine = get_engine()
         self.app_id = app_id
 
     def get(self):
@@ -39,7 +120,7 @@ class Applications:
             abort(404, f"Application {self.app_id} does not exist")
 
     def create(self, adt=None, url=None, params=None, dryrun=False):
-        """Deploys a new application in MiCADO
+        """Queues the deployment of a new application in MiCADO
 
         Args:
             adt (flask.FileStorage OR dict, optional): ADT of the application.
@@ -49,23 +130,28 @@ class Applications:
             params (str repr OR dict, optional): Key-value pair mapping for
                 TOSCA inputs. Defaults to None.
             dryrun (bool, optional): Dry run flag. Defaults to False.
+
+        Returns:
+            dict: Message and ID of the queued job
         """
         if self._id_exists():
             abort(400, "The application ID already exists")
         elif self.engine.app_list:
             abort(400, "Multiple applications are not supported")
+        self._check_pending()
 
+        params = _literal_params(params)
         path = self._get_path(adt, url)
-        tpl, adaps = self._validate(path, params, dryrun)
-        try:
-            self.engine.launch(tpl, adaps, self.app_id, dryrun)
-        except Exception as error:
-            abort(500, f"Error while deploying: {error}")
-
-        return {"message": f"Application {self.app_id} successfully deployed"}
+        job = get_jobs().submit(
+            self.app_id, "create", self._create, path, params, dryrun
+        )
+        return {
+            "message": f"Deployment of application {self.app_id} queued",
+            "job_id": job.id,
+        }
 
     def update(self, adt=None, url=None, params=None):
-        """Updates an existing application in MiCADO
+        """Queues the update of an existing application in MiCADO
 
         Args:
             adt (flask.FileStorage OR dict, optional): Modified ADT.
@@ -74,32 +160,171 @@ class Applications:
                 Required if no file provided. Defaults to None.
             params (str repr OR dict, optional): Key-value pair mapping for
                 TOSCA inputs. Defaults to None.
+
+        Returns:
+            dict: Message and ID of the queued job
         """
         if not self._id_exists():
             abort(404, f"Application with ID {self.app_id} does not exist")
         elif not self.engine.app_list:
             abort(404, "There are no currently running applications")
+        self._check_pending()
 
+        params = _literal_params(params)
         path = self._get_path(adt, url)
-        tpl, adaps = self._validate(path, params, validate_only=True)
-        try:
-            self.engine.update(self.app_id, tpl, adaps)
-        except Exception as error:
-            abort(500, f"Error while updating: {error}")
-
-        return {"message": f"Application {self.app_id} successfully updated"}
+        job = get_jobs().submit(self.app_id, "update", self._update, path, params)
+        return {
+            "message": f"Update of application {self.app_id} queued",
+            "job_id": job.id,
+        }
 
     def delete(self, force=False):
-        """Deletes a running application
+        """Queues the deletion of a running application
 
         Args:
             force (bool): Flag to force deletion
+
+        Returns:
+            dict: Message and ID of the queued job
         """
         if not self._id_exists():
             abort(404, f"Application with ID {self.app_id} does not exist")
         elif not self.engine.app_list:
             abort(404, "There are no currently running applications")
+        self._check_pending()
+
+        job = get_jobs().submit(self.app_id, "delete", self._delete, force)
+        return {
+            "message": f"Deletion of application {self.app_id} queued",
+            "job_id": job.id,
+        }
+
+    def resume(self):
+        """Queues the resume of a deployment or update that did not finish
+
+        Returns:
+            dict: Message and ID of the queued job
+        """
+        if not self._id_exists():
+            abort(404, f"Application with ID {self.app_id} does not exist")
+        self._check_pending()
+        if not self.engine.state.get_checkpoint(self.app_id):
+            abort(409, f"Application {self.app_id} has nothing to resume")
+
+        job = get_jobs().submit(self.app_id, "resume", self._resume)
+        return {
+            "message": f"Resume of application {self.app_id} queued",
+            "job_id": job.id,
+        }
+
+    def plan(self, adt=None, url=None, params=None):
+        """Previews which adaptors an update of the application would run
+
+        Args:
+            adt (flask.FileStorage OR dict, optional): Modified ADT.
+                Ignored if URL provided, required if no URL. Defaults to None.
+            url (str, optional): URL of the modified ADT.
+                Required if no file provided. Defaults to None.
+            params (str repr OR dict, optional): Key-value pair mapping for
+                TOSCA inputs. Defaults to None.
+
+        Returns:
+            dict: The adaptors to update and skip, and why
+        """
+        if not self._id_exists():
+            abort(404, f"Application with ID {self.app_id} does not exist")
+
+        params = _literal_params(params)
+        handler = TemplateHandler(f"{self.app_id}.plan")
+        path = url if url else handler.save_template(adt)
+        try:
+            template = self.engine._get_template(path, params)
+        except Exception as error:
+            abort(500, f"Error while validating: {error}")
+        finally:
+            handler.delete_template()
+
+        return self.engine.plan_update(self.app_id, template).to_dict()
+
+    def validate(self, adt=None, url=None, params=None):
+        """Validates an ADT without deploying it
+
+        Args:
+            adt (flask.FileStorage OR dict, optional): ADT to validate.
+                Ignored if URL provided, required if no URL. Defaults to None.
+            url (str, optional): URL of the ADT to validate.
+                Required if no file provided. Defaults to None.
+            params (str repr OR dict, optional): Key-value pair mapping for
+                TOSCA inputs. Defaults to None.
 
+        Returns:
+            dict: Message
+        """
+        params = _literal_params(params)
+        handler = TemplateHandler(f"{utils.id_generator()}.validate")
+        path = url if url else handler.save_template(adt)
+        try:
+            error = validate_adt(path, params)
+        except PoolBusy as busy:
+            abort(503, str(busy))
+        except ValidationTimeout as timeout:
+            abort(504, str(timeout))
+        finally:
+            handler.delete_template()
+
+        if error:
+            abort(422, f"ADT is not valid: {error}")
+        return {"message": "ADT is valid"}
+
+    def _create(self, job, path, params, dryrun):
+        """
+        Validate and deploy the application, run as a background job
+        """
+        job.phase = "validating"
+        tpl, adaps = self._validate(path, params, dryrun)
+        job.adaptors = adaps
+        job.phase = "deploying"
+        try:
+            self.engine.launch(tpl, adaps, self.app_id, dryrun, path, params)
+        except Exception as error:
+            abort(500, f"Error while deploying: {error}")
+
+        return {"message": f"Application {self.app_id} successfully deployed"}
+
+    def _update(self, job, path, params):
+        """
+        Validate and update the application, run as a background job
+        """
+        job.phase = "validating"
+        tpl, adaps = self._validate(path, params, validate_only=True)
+        job.adaptors = adaps
+        job.phase = "updating"
+        try:
+            self.engine.update(self.app_id, tpl, adaps, path, params)
+        except Exception as error:
+            abort(500, f"Error while updating: {error}")
+
+        return {"message": f"Application {self.app_id} successfully updated"}
+
+    def _resume(self, job):
+        """
+        Resume the application from its checkpoint, run as a background job
+        """
+        job.phase = "resuming"
+        try:
+            self.engine.resume(self.app_id)
+        except Exception as error:
+            abort(500, f"Error while resuming: {error}")
+        job.adaptors = self.get().get("adaptors_object") or {}
+
+        return {"message": f"Application {self.app_id} successfully resumed"}
+
+    def _delete(self, job, force):
+        """
+        Undeploy the application, run as a background job
+        """
+        job.adaptors = self.get().get("adaptors_object") or {}
+        job.phase = "deleting"
         try:
             self.engine.undeploy(self.app_id, force)
         except Exception as error:
@@ -132,6 +357,130 @@ class Applications:
         """
         return self.app_id in self.engine.app_list
 
+    def _check_pending(self):
+        """
+        Aborts if an earlier job on this application is still unfinished
+        """
+        if get_jobs().pending(self.app_id):
+            abort(409, f"Application {self.app_id} has a job in progress")
+
+
+class Jobs:
+    """Class to access the background jobs
+    """
+
+    def __init__(self, job_id=None):
+        """
+        Constructor
+
+        Args:
+            job_id (str, optional): Job ID. If ommitted, all known jobs
+                will be returned. Defaults to None.
+        """
+        self.job_id = job_id
+
+    def get(self, app_id=None):
+        """Gets job information
+
+        Args:
+            app_id (str, optional): Only list the jobs of this application
+
+        Returns:
+            Job OR list: The requested job(s)
+        """
+        if not self.job_id:
+            return get_jobs().list(app_id)
+        job = get_jobs().get(self.job_id)
+        if not job:
+            abort(404, f"Job {self.job_id} does not exist")
+        return job
+
+
+class Events:
+    """Class to follow the events of the engine
+    """
+
+    def __init__(self, app_id=None):
+        """
+        Constructor
+
+        Args:
+            app_id (str, optional): Only follow the events of this
+                application. If ommitted, all events are followed.
+                Defaults to None.
+        """
+        self.app_id = app_id
+
+    def poll(self, since=0, timeout=30):
+        """Gets the events after since, waiting for some if there are none
+
+        Args:
+            since (int, optional): ID of the last event seen. Defaults to 0.
+            timeout (float, optional): Seconds to wait, up to MAX_POLL.
+                Defaults to 30.
+
+        Returns:
+            dict: The events and the ID to poll from next
+        """
+        timeout = max(0, min(timeout, MAX_POLL))
+        found = events.BUS.wait(since, self.app_id, timeout)
+        return {
+            "events": [event.to_dict() for event in found],
+            "last_id": found[-1].id if found else max(since, 0),
+        }
+
+    def stream(self, since=0):
+        """Returns the events after since as Server-Sent Events
+
+        A stream holds a worker thread for as long as it is open, so at
+        most MAX_STREAMS are open at once, leaving the other threads to
+        the rest of the API. Each stream ends after STREAM_DURATION, and
+        clients reconnect with the Last-Event-ID they saw. Clients that
+        need to follow events for longer without a thread should poll.
+
+        Returns:
+            iterable: The stream, to send as text/event-stream
+        """
+        global _streams
+        with _streams_lock:
+            if _streams >= MAX_STREAMS:
+                abort(503, "Too many event streams open, long-poll instead")
+            _streams += 1
+        return _EventStream(self._stream(since))
+
+    def _stream(self, since):
+        deadline = time.monotonic() + STREAM_DURATION
+        yield "retry: 1000\n\n"
+        while time.monotonic() < deadline:
+            timeout = max(0, min(KEEPALIVE, deadline - time.monotonic()))
+            found = events.BUS.wait(since, self.app_id, timeout)
+            if not found:
+                yield ": keep-alive\n\n"
+                continue
+            for event in found:
+                yield event.to_sse()
+            since = found[-1].id
+
+
+class _EventStream:
+    """An event stream that gives its slot back when the server closes it,
+    even if the client went away before the first event"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._closed = False
+
+    def __iter__(self):
+        return self._stream
+
+    def close(self):
+        global _streams
+        self._stream.close()
+        with _streams_lock:
+            if not self._closed:
+                self._closed = True
+                _streams -= 1
+
 
 class TemplateHandler:
     """
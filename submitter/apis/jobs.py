@@ -0,0 +1,129 @@
+"""
+MiCADO Submitter Engine Job Manager
+-----------------------------------
+Runs long application operations in the background and tracks them
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from submitter import utils
+
+logger = logging.getLogger("submitter." + __name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = ("queued", "running", "succeeded", "failed")
+
+
+class Job:
+    """A background operation on an application
+
+    Attributes:
+        id: Generated job identifier
+        app_id: ID of the application the job operates on
+        operation: Name of the operation (create, update, delete...)
+        status: One of queued, running, succeeded or failed
+        phase: What the job is currently doing, set by the operation
+        adaptors: Adaptor objects working on this job, for progress
+        result: Return value of the operation, once succeeded
+        error: Error message, once failed
+    """
+
+    def __init__(self, app_id, operation):
+        self.id = utils.id_generator(12)
+        self.app_id = app_id
+        self.operation = operation
+        self.status = QUEUED
+        self.phase = QUEUED
+        self.adaptors = {}
+        self.result = None
+        self.error = None
+        self.submitted = _now()
+        self.started = None
+        self.finished = None
+
+    @property
+    def progress(self):
+        """Current status of each adaptor working on this job"""
+        return {name: adaptor.status for name, adaptor in self.adaptors.items()}
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+
+class JobManager:
+    """Runs jobs on a pool of background workers
+
+    Keeps the most recent jobs so clients can poll them after they finish.
+
+    Args:
+        max_workers (int, optional): Number of jobs run at once. Defaults to 1.
+        history (int, optional): Finished jobs to remember. Defaults to 100.
+    """
+
+    def __init__(self, max_workers=1, history=100):
+        self.history = history
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, app_id, operation, fn, *args, **kwargs):
+        """Queue fn(job, *args, **kwargs) to run in the background
+
+        Returns:
+            Job: The newly queued job
+        """
+        job = Job(app_id, operation)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        logger.info("queued {} job {} for {}".format(operation, job.id, app_id))
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        """Returns the job with the given ID, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, app_id=None):
+        """Returns known jobs, oldest first, optionally for one application"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if app_id:
+            jobs = [job for job in jobs if job.app_id == app_id]
+        return jobs
+
+    def pending(self, app_id):
+        """Returns the unfinished jobs of an application"""
+        return [job for job in self.list(app_id) if not job.done]
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = job.phase = RUNNING
+        job.started = _now()
+        logger.info("starting {} job {}".format(job.operation, job.id))
+        try:
+            job.result = fn(job, *args, **kwargs)
+        except Exception as error:
+            job.error = getattr(error, "description", None) or str(error)
+            job.status = FAILED
+            logger.error("{} job {} failed: {}".format(job.operation, job.id, error))
+        else:
+            job.status = SUCCEEDED
+            logger.info("{} job {} succeeded".format(job.operation, job.id))
+        job.phase = job.status
+        job.finished = _now()
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+
+def _now():
+    return datetime.now(timezone.utc)
@@ -2,13 +2,9 @@ import os
 import logging
 import ast
 import threading
-import queue
-import time
 import urllib.request
 import json
 
-import yaml
-
 from flask import (
     Blueprint,
     request,
@@ -19,69 +15,89 @@ from flask import (
     flash,
     redirect,
 )
-from toscaparser.common.exception import *
 
 from submitter import utils
 from submitter import api as flask
-from submitter.submitter_engine import SubmitterEngine
+from submitter.apis.common import get_engine, get_jobs, validate_adt
+from submitter.apis.jobs import FAILED, QUEUED, RUNNING
+from submitter.validation_pool import PoolBusy, ValidationTimeout
 
 v1blueprint = Blueprint('apiv1', __name__)
 
 JSON_FILE = "system/ids.json"
 
+logger = logging.getLogger("submitter." + __name__)
+submitter = None
+_init_lock = threading.Lock()
+
 
+@v1blueprint.before_request
 def __init__():
+    """Share the engine on the first request"""
+    global submitter
+    if submitter is not None:
+        return
+    with _init_lock:
+        if submitter is None:
+            submitter = get_engine()
 
-    global logger, submitter, queue_exception, queue_threading
-
-    logger = logging.getLogger("submitter." + __name__)
-    submitter = SubmitterEngine()
-    queue_exception = queue.Queue()
-    queue_threading = queue.Queue()
-    thread = threading.Thread(target=threads_management)
-    thread.daemon = True
-    thread.start()
-
-
-class ExecSubmitterThread(threading.Thread):
-    def __init__(self, q, *args, **kwargs):
-        super(ExecSubmitterThread, self).__init__(*args, **kwargs)
-
-        self.q = q
-
-    def run(self):
-        try:
-            self._target(*self._args, **self._kwargs)
-        except Exception as e:
-            exception = {"name": self.getName(), "exception": e}
-            self.q.put(exception)
-
-
-def threads_management():
-    global current_thread, last_error
-    last_error = ""
-    current_thread = ""
-    while True:
-        time.sleep(3)
-        if not queue_threading.empty():
-            thread = queue_threading.get()
-            current_thread = thread.getName()
-            thread.start()
-            thread.join()
-        try:
-            if not queue_exception.empty():
-                exception = queue_exception.get()
-                logger.error(
-                    "exception caught on thread {}".format(exception["name"])
-                )
-                raise exception["exception"]
 
-        except Exception as e:
-            last_error = e
-            logger.info("{}".format(e))
+def submit_job(id_app, operation, target, *args, adaptors=None):
+    """Queue target(*args) on the job workers shared with the v2 API
+
+    A worker picks the job up as soon as it is free. Its result, timings
+    and error are kept in the job history, under "<operation>_<id_app>".
+    """
+
+    def run(job, *args):
+        job.adaptors = adaptors or {}
+        return target(*args)
+
+    return get_jobs().submit(id_app, operation, run, *args)
+
+
+def update_job(job, id_app, path_to_file, dryrun, parsed_params):
+    """Validate and update an application, run as a background job
+
+    Validating takes the lock of the application, so it is done here
+    rather than in the request, which would otherwise wait for a launch
+    or update of the application to finish.
+    """
+    job.phase = "validating"
+    template, dict_object_adaptors = submitter._validate(
+        path_to_file, dryrun, True, id_app, parsed_params
+    )
+    job.adaptors = dict_object_adaptors
+    job.phase = "updating"
+    return submitter.update(
+        id_app, template, dict_object_adaptors, path_to_file, parsed_params
+    )
+
+
+def pending_jobs(id_app, operation=None):
+    """The unfinished jobs of an application, of one operation if given"""
+    return [
+        job
+        for job in get_jobs().pending(id_app)
+        if operation is None or job.operation == operation
+    ]
+
+
+def job_info(job):
+    """What v1 clients see of a job"""
+    return dict(
+        id=job.id,
+        name="{}_{}".format(job.operation, job.app_id),
+        status=job.status,
+        error=job.error,
+        submitted=_isoformat(job.submitted),
+        started=_isoformat(job.started),
+        finished=_isoformat(job.finished),
+    )
 
 
-__init__()
+def _isoformat(time):
+    return time.isoformat() if time else None
 
 
 class RequestError(Exception):
@@ -135,6 +151,7 @@ def launch():
     """
     response = dict(status_code="", message="", data=[])
     path_to_file = None
+    template = None
 
     try:
         dryrun = request.form["dryrun"]
@@ -206,14 +223,18 @@ def launch():
         response["message"] = "The application is not valid: {}".format(error)
         response["status_code"] = 422
         return jsonify(response)
-    thread = ExecSubmitterThread(
-        q=queue_exception,
-        target=submitter.launch,
-        args=(template, dict_object_adaptors, id_app, dryrun),
-        daemon=True,
+    job = submit_job(
+        id_app,
+        "launch",
+        submitter.launch,
+        template,
+        dict_object_adaptors,
+        id_app,
+        dryrun,
+        path_to_file,
+        parsed_params,
+        adaptors=dict_object_adaptors,
     )
-    thread.setName("launch_{}".format(id_app))
-    queue_threading.put(thread)
 
     response[
         "message"
@@ -221,8 +242,7 @@ def launch():
         id_app
     )
     response["status_code"] = 200
-    global last_error
-    last_error = ""
+    response["data"] = dict(job_id=job.id)
     return jsonify(response)
 
 
@@ -238,7 +258,7 @@ def validate():
     """
     response = dict(status_code="", message="", data=[])
     path_to_file = None
-    validate = True
+    template = None
 
     try:
         path_to_file = request.form["input"]
@@ -263,10 +283,31 @@ def validate():
         return jsonify(response)
 
     if template:
-        template.save("{}/files/templates/template.yaml".format(flask.app.root_path))
-        path_to_file = "files/templates/template.yaml"
+        # Every upload gets its own file, so concurrent validations
+        # do not overwrite each other
+        path_to_file = "files/templates/{}.validate.yaml".format(
+            utils.id_generator()
+        )
+        template.save("{}/{}".format(flask.app.root_path, path_to_file))
 
-    submitter._validate(path_to_file, validate=True)
+    try:
+        error = validate_adt(path_to_file)
+    except PoolBusy as busy:
+        response["message"] = str(busy)
+        response["status_code"] = 503
+        return jsonify(response)
+    except ValidationTimeout as timeout:
+        response["message"] = str(timeout)
+        response["status_code"] = 504
+        return jsonify(response)
+    finally:
+        if template:
+            os.remove("{}/{}".format(flask.app.root_path, path_to_file))
+    if error:
+        logger.error(error)
+        response["message"] = "The application is not valid: {}".format(error)
+        response["status_code"] = 422
+        return jsonify(response)
 
     response["message"] = "The provided application template is valid"
     response["status_code"] = 200
@@ -280,16 +321,10 @@ def undeploy(id_app):
     response = dict(status_code="", message="", data=[])
     try:
         if "force" in request.form:
-            thread = ExecSubmitterThread(
-                q=queue_exception,
-                target=submitter.undeploy,
-                args=(id_app, True),
-                daemon=True,
-            )
-            thread.setName("undeploy_{}".format(id_app))
-            queue_threading.put(thread)
+            job = submit_job(id_app, "undeploy", submitter.undeploy, id_app, True)
             logger.info("force flag found")
             response["status_code"] = 200
+            response["data"] = dict(job_id=job.id)
             response[
                 "message"
             ] = "correctly send force undeploy command to MiCADO master."
@@ -313,24 +348,16 @@ def undeploy(id_app):
         response["status_code"] = 400
         return jsonify(response)
 
-    for item in queue_threading.queue:
-        if "undeploy_{}".format(id_app) in item.getName():
-            logger.debug(
-                "The application with id={} has already undeploy action pending"
-            )
-            response[
-                "message"
-            ] = "this application has already undeploy action pending."
-            response["status_code"] = 400
-            return jsonify(response)
-    thread = ExecSubmitterThread(
-        q=queue_exception,
-        target=submitter.undeploy,
-        args=(id_app,),
-        daemon=True,
-    )
-    thread.setName("undeploy_{}".format(id_app))
-    queue_threading.put(thread)
+    if pending_jobs(id_app, "undeploy"):
+        logger.debug(
+            "The application with id={} has already undeploy action pending"
+        )
+        response[
+            "message"
+        ] = "this application has already undeploy action pending."
+        response["status_code"] = 400
+        return jsonify(response)
+    job = submit_job(id_app, "undeploy", submitter.undeploy, id_app)
 
     logger.debug(
         "successfully send undeploy request for {} to MiCADO master".format(
@@ -341,8 +368,7 @@ def undeploy(id_app):
         "message"
     ] = "successfully send undeployed for {} to MiCADO master".format(id_app)
     response["status_code"] = 200
-    global last_error
-    last_error = ""
+    response["data"] = dict(job_id=job.id)
     return jsonify(response)
 
 
@@ -352,6 +378,7 @@ def update(id_app):
 
     response = dict(status_code="", message="", data=[])
     path_to_file = None
+    template = None
 
     if not submitter.app_list.keys():
         response["message"] = "There is no running applications to update"
@@ -366,13 +393,12 @@ def update(id_app):
         response["status_code"] = 400
         return jsonify(response)
 
-    for item in queue_threading.queue:
-        if "update_{}".format(id_app) in item.getName():
-            response[
-                "message"
-            ] = "this application has already an update pending, please wait for it to be completed before sending a new one."
-            response["status_code"] = 400
-            return jsonify(response)
+    if pending_jobs(id_app, "update"):
+        response[
+            "message"
+        ] = "this application has already an update pending, please wait for it to be completed before sending a new one."
+        response["status_code"] = 400
+        return jsonify(response)
     try:
         path_to_file = request.form["input"]
     except Exception:
@@ -397,32 +423,16 @@ def update(id_app):
         path_to_file = "files/templates/{}.yaml".format(id_app)
     try:
         dryrun = submitter.app_list[id_app]["dry_run"]
-        template, dict_object_adaptors = submitter._validate(
-            path_to_file, dryrun, True, id_app, parsed_params
+        job = get_jobs().submit(
+            id_app, "update", update_job, id_app, path_to_file, dryrun, parsed_params
         )
-
-    except Exception as error:
-        logger.error(error)
-        response["message"] = "The application is not valid: {}".format(error)
-        response["status_code"] = 422
-        return jsonify(response)
-    try:
-        thread = ExecSubmitterThread(
-            q=queue_exception,
-            target=submitter.update,
-            args=(id_app, template, dict_object_adaptors),
-            daemon=True,
-        )
-        thread.setName("update_{}".format(id_app))
-        queue_threading.put(thread)
         response[
             "message"
         ] = "Thread to update the application is launch. To check process curl http://YOUR_HOST/v1.0/app/{}/status ".format(
             id_app
         )
         response["status_code"] = 200
-        global last_error
-        last_error = ""
+        response["data"] = dict(job_id=job.id)
         return jsonify(response)
     except Exception:
         response["message"] = "{} update failed".format(id_app)
@@ -439,21 +449,22 @@ def info_app(id_app):
         this_app_status = (
             submitter.get_status(id_app) or "Could not get status"
         )
-        q_t = queue_threading.queue
-
-        if not "launch_{}".format(id_app) in current_thread:
-            for item in q_t:
-                if "launch_{}".format(id_app) in item.getName():
-                    this_app_status = (
-                        "pending, other application in the queue."
-                    )
+        if any(job.status == QUEUED for job in pending_jobs(id_app)):
+            this_app_status = "pending, other application in the queue."
 
     except KeyError:
         response["status_code"] = 404
         response["message"] = "App with ID {} does not exist".format(id_app)
-        if last_error:
+        if pending_jobs(id_app, "launch"):
+            response["message"] = "App with ID {} is queued for launch".format(
+                id_app
+            )
+        failed = [job for job in get_jobs().list(id_app) if job.status == FAILED]
+        if failed:
             response["data"].append(
-                "Error on last threaded action: {}".format(last_error)
+                "Error on last threaded action: {} (job {})".format(
+                    failed[-1].error, failed[-1].id
+                )
             )
 
         return jsonify(response)
@@ -488,12 +499,15 @@ def list_thread():
     """ API call to query the info on the thread being executed"""
     response = dict(status_code=200, message="Info on Thread", data=[])
     try:
-        q_t = list()
-        for item in queue_threading.queue:
-            q_t.append(item.getName())
+        jobs = get_jobs().list()
         response["data"] = {
-            "thread being executed": current_thread,
-            "list of threads waiting": q_t,
+            "thread being executed": [
+                job_info(job)["name"] for job in jobs if job.status == RUNNING
+            ],
+            "list of threads waiting": [
+                job_info(job)["name"] for job in jobs if job.status == QUEUED
+            ],
+            "jobs": [job_info(job) for job in jobs],
         }
     except Exception as e:
         logger.info(e)
@@ -502,6 +516,21 @@ def list_thread():
     return jsonify(response)
 
 
+@v1blueprint.route("/v1.0/job/<job_id>", methods=["GET"], strict_slashes=False)
+def info_job(job_id):
+    """ API call to get the result, timings and error of a queued action"""
+    job = get_jobs().get(job_id)
+    if not job:
+        response = dict(
+            status_code=404, message="Job {} does not exist".format(job_id), data=[]
+        )
+        return jsonify(response)
+    response = dict(
+        status_code=200, message="Info on job {}".format(job_id), data=job_info(job)
+    )
+    return jsonify(response)
+
+
 @v1blueprint.route("/v1.0/list_app", methods=["GET"], strict_slashes=False)
 def list_app():
     """ API function to list all the running aplications"""
@@ -2,7 +2,14 @@ from flask import Blueprint, abort
 from webargs import flaskparser, core
 from werkzeug.exceptions import HTTPException
 
-from .views import Application
+from .views import (
+    Application,
+    ApplicationPlan,
+    ApplicationResume,
+    EventFeed,
+    Job,
+    Validation,
+)
 
 v2blueprint = Blueprint("apiv2", __name__)
 
@@ -41,3 +48,50 @@ v2blueprint.add_url_rule(
     view_func=app_view,
     methods=["GET", "POST", "PUT", "DELETE"],
 )
+
+plan_view = ApplicationPlan.as_view("plan_api")
+v2blueprint.add_url_rule(
+    "/applications/<string:app_id>/plan/",
+    view_func=plan_view,
+    methods=["POST"],
+)
+
+resume_view = ApplicationResume.as_view("resume_api")
+v2blueprint.add_url_rule(
+    "/applications/<string:app_id>/resume/",
+    view_func=resume_view,
+    methods=["POST"],
+)
+
+validate_view = Validation.as_view("validate_api")
+v2blueprint.add_url_rule(
+    "/validate/",
+    view_func=validate_view,
+    methods=["POST"],
+)
+
+job_view = Job.as_view("jobs_api")
+v2blueprint.add_url_rule(
+    "/jobs/",
+    view_func=job_view,
+    defaults={"job_id": None},
+    methods=["GET"],
+)
+v2blueprint.add_url_rule(
+    "/jobs/<string:job_id>/",
+    view_func=job_view,
+    methods=["GET"],
+)
+
+event_view = EventFeed.as_view("events_api")
+v2blueprint.add_url_rule(
+    "/events/",
+    view_func=event_view,
+    defaults={"app_id": None},
+    methods=["GET"],
+)
+v2blueprint.add_url_rule(
+    "/applications/<string:app_id>/events/",
+    view_func=event_view,
+    methods=["GET"],
+)
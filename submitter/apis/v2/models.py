@@ -18,6 +18,48 @@ class AppListSchema(Schema):
     applications = fields.Function(lambda obj: list(obj.keys()))
 
 
+class JobSchema(Schema):
+
+    id = fields.Str()
+    app_id = fields.Str()
+    operation = fields.Str()
+    status = fields.Str()
+    phase = fields.Str()
+    progress = fields.Dict()
+    message = fields.Method("get_message")
+    error = fields.Str()
+    submitted = fields.DateTime()
+    started = fields.DateTime()
+    finished = fields.DateTime()
+
+    def get_message(self, obj):
+        return (obj.result or {}).get("message")
+
+
+class JobListSchema(Schema):
+    message = fields.Str(default="MiCADO Jobs")
+    jobs = fields.Function(
+        lambda obj: JobSchema(only=("id", "app_id", "operation", "status")).dump(
+            obj, many=True
+        )
+    )
+
+
+class PlanSchema(Schema):
+    message = fields.Str(default="MiCADO Update Plan")
+    update = fields.List(fields.Str())
+    skip = fields.List(fields.Str())
+    reasons = fields.Dict()
+    changes = fields.Dict()
+    full_update = fields.Str()
+
+
+class EventListSchema(Schema):
+    message = fields.Str(default="MiCADO Events")
+    events = fields.List(fields.Dict())
+    last_id = fields.Int()
+
+
 class ReqArgs:
     json = {
         "adt": fields.Dict(),
@@ -32,3 +74,5 @@ class ReqArgs:
     }
     file = {"adt": fields.Field()}
     force = {"force": fields.Bool()}
+    app = {"app_id": fields.Str()}
+    events = {"since": fields.Int(), "timeout": fields.Float()}
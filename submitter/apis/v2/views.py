@@ -1,9 +1,18 @@
+from flask import Response, request, url_for
 from flask.views import MethodView
 from webargs.flaskparser import use_kwargs
 
-from submitter.apis.common import Applications
+from submitter.apis.common import Applications, Events, Jobs
 from submitter.utils import id_generator
-from .models import ReqArgs, AppSchema, AppListSchema
+from .models import (
+    ReqArgs,
+    AppSchema,
+    AppListSchema,
+    JobSchema,
+    JobListSchema,
+    PlanSchema,
+    EventListSchema,
+)
 
 
 class Application(MethodView):
@@ -28,7 +37,7 @@ class Application(MethodView):
         ) else True
         if not app_id:
             app_id = id_generator()
-        return Applications(app_id).create(adt, url, params, dryrun)
+        return _accepted(Applications(app_id).create(adt, url, params, dryrun))
 
     @use_kwargs(ReqArgs.json, location="json")
     @use_kwargs(ReqArgs.file, location="files")
@@ -37,14 +46,74 @@ class Application(MethodView):
         """
         Update the application matching the given ID
         """
-        return Applications(app_id).update(adt, url, params)
+        return _accepted(Applications(app_id).update(adt, url, params))
 
     @use_kwargs(ReqArgs.force, location="form")
     def delete(self, app_id, force=False):
         """
         Delete the application matching the given ID
         """
-        return Applications(app_id).delete(force)
+        return _accepted(Applications(app_id).delete(force))
+
+
+class ApplicationPlan(MethodView):
+    @use_kwargs(ReqArgs.json, location="json")
+    @use_kwargs(ReqArgs.file, location="files")
+    @use_kwargs(ReqArgs.form, location="form")
+    def post(self, app_id, adt=None, url=None, params=None, dryrun=False):
+        """
+        Preview which adaptors an update of the application would run
+        """
+        return PlanSchema().dump(Applications(app_id).plan(adt, url, params))
+
+
+class ApplicationResume(MethodView):
+    def post(self, app_id):
+        """
+        Resume a deployment or update of the application that did not finish
+        """
+        return _accepted(Applications(app_id).resume())
+
+
+class Validation(MethodView):
+    @use_kwargs(ReqArgs.json, location="json")
+    @use_kwargs(ReqArgs.file, location="files")
+    @use_kwargs(ReqArgs.form, location="form")
+    def post(self, adt=None, url=None, params=None, dryrun=False):
+        """
+        Validate an ADT without deploying it
+        """
+        return Applications().validate(adt, url, params)
+
+
+class Job(MethodView):
+    @use_kwargs(ReqArgs.app, location="query")
+    def get(self, job_id, app_id=None):
+        """
+        Fetch the job matching the given ID, or list jobs
+        """
+        if job_id:
+            return JobSchema().dump(Jobs(job_id).get())
+        else:
+            return JobListSchema().dump(Jobs().get(app_id))
+
+
+class EventFeed(MethodView):
+    @use_kwargs(ReqArgs.events, location="query")
+    def get(self, app_id, since=None, timeout=30):
+        """
+        Stream events as Server-Sent Events, or long-poll for them
+        """
+        if since is None:
+            since = request.headers.get("Last-Event-ID", type=int) or 0
+        feed = Events(app_id)
+        if request.accept_mimetypes.best == "text/event-stream":
+            return Response(
+                feed.stream(since),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        return EventListSchema().dump(feed.poll(since, timeout))
 
 
 class ApplicationStatus(MethodView):
@@ -66,3 +135,11 @@ class ApplicationServices(MethodView):
         """
         Fetch the deployed services of an application
         """
+
+
+def _accepted(response):
+    """
+    Returns a 202 response pointing at the queued job
+    """
+    location = url_for("apiv2.jobs_api", job_id=response["job_id"])
+    return response, 202, {"Location": location}
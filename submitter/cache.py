@@ -0,0 +1,99 @@
+"""
+MiCADO Submitter Engine Cache
+-----------------------------
+A small thread-safe LRU cache with time-based expiry
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from submitter import metrics
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Least-recently-used cache whose entries also expire after a TTL
+
+    Args:
+        maxsize (int, optional): Entries to keep, 0 disables the cache.
+            Defaults to 16.
+        ttl (float, optional): Seconds an entry stays valid, None for no
+            expiry. Defaults to None.
+        name (str, optional): Name to publish the hits, misses and
+            evictions under in the metrics, None not to. Defaults to None.
+    """
+
+    def __init__(self, maxsize=16, ttl=None, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the cached value for key, counting a hit or a miss"""
+        with self._lock:
+            expires, value = self._data.get(key, (None, _MISSING))
+            if value is not _MISSING and expires is not None:
+                if expires <= time.monotonic():
+                    del self._data[key]
+                    self._evicted()
+                    value = _MISSING
+
+            if value is _MISSING:
+                self.misses += 1
+                self._publish(metrics.CACHE_LOOKUPS, result="miss")
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            self._publish(metrics.CACHE_LOOKUPS, result="hit")
+            return value
+
+    def put(self, key, value):
+        """Caches value under key, evicting the least recently used"""
+        if not self.maxsize:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evicted()
+
+    def invalidate(self, key=None, match=None):
+        """Drops one key, the keys for which match(key) is true, or all"""
+        with self._lock:
+            if key is not None:
+                self._data.pop(key, None)
+            elif match is not None:
+                for cached_key in [k for k in self._data if match(k)]:
+                    del self._data[cached_key]
+            else:
+                self._data.clear()
+
+    def stats(self):
+        """Returns the hit, miss and eviction counters and current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+            }
+
+    def _evicted(self):
+        self.evictions += 1
+        self._publish(metrics.CACHE_EVICTIONS)
+
+    def _publish(self, counter, **labels):
+        if self.name:
+            counter.inc(cache=self.name, **labels)
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,118 @@
+"""
+MiCADO Submitter Engine Events
+------------------------------
+Publishes changes to applications and adaptors, so clients can follow
+them as they happen instead of polling
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# Kinds of event
+ADAPTOR_STATUS = "adaptor_status"
+APPLICATION = "application"
+PHASE = "phase"
+ERROR = "error"
+
+
+class Event:
+    """Something that happened to an application
+
+    Attributes:
+        id (int): Sequence number, increasing across all events
+        kind (str): One of ADAPTOR_STATUS, APPLICATION, PHASE or ERROR
+        app_id (str): The application, or None for engine-wide events
+        data (dict): Details, depending on the kind of event
+        time (datetime): When the event was published
+    """
+
+    __slots__ = ("id", "kind", "app_id", "data", "time")
+
+    def __init__(self, event_id, kind, app_id, data):
+        self.id = event_id
+        self.kind = kind
+        self.app_id = app_id
+        self.data = data
+        self.time = datetime.now(timezone.utc)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "app_id": self.app_id,
+            "time": self.time.isoformat(),
+            **self.data,
+        }
+
+    def to_sse(self):
+        """The event as a Server-Sent Events message"""
+        return "id: {}\nevent: {}\ndata: {}\n\n".format(
+            self.id, self.kind, json.dumps(self.to_dict(), default=str)
+        )
+
+
+class EventBus:
+    """Keeps the latest events and wakes up the clients waiting for them
+
+    Clients remember the id of the last event they saw and ask for the
+    events after it, so a client that reconnects misses nothing unless
+    more than ``history`` events were published in between.
+
+    Args:
+        history (int, optional): Events to keep. Defaults to 1000.
+    """
+
+    def __init__(self, history=1000):
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+        self._changed = threading.Condition()
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, kind, app_id=None, **data):
+        """Records an event and wakes up the waiting clients"""
+        with self._changed:
+            self._last_id += 1
+            event = Event(self._last_id, kind, app_id, data)
+            self._events.append(event)
+            self._changed.notify_all()
+        return event
+
+    def since(self, last_id=0, app_id=None):
+        """The events after last_id, of one application if given"""
+        with self._changed:
+            return self._since(last_id, app_id)
+
+    def wait(self, last_id=0, app_id=None, timeout=None):
+        """Like since(), but blocks until there are events or timeout runs out
+
+        Returns:
+            list: The events, empty if the timeout ran out
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while True:
+                events = self._since(last_id, app_id)
+                if events:
+                    return events
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._changed.wait(remaining)
+
+    def _since(self, last_id, app_id):
+        if last_id > self._last_id:
+            # The client saw the events of an engine before a restart
+            last_id = 0
+        return [
+            event
+            for event in self._events
+            if event.id > last_id and (app_id is None or event.app_id == app_id)
+        ]
+
+
+BUS = EventBus()
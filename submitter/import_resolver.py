@@ -0,0 +1,211 @@
+"""
+MiCADO Submitter Engine Import Resolver
+---------------------------------------
+Resolves the URL imports of an ADT through a local mirror and an on-disk
+cache, so type definitions are not fetched from the network on every parse
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import yaml
+from toscaparser import imports
+from toscaparser.common.exception import ExceptionCollector, URLException
+from toscaparser.utils import yamlparser
+
+from submitter import metrics
+
+logger = logging.getLogger("submitter." + __name__)
+
+INDEX_FILE = "index.json"
+OBJECTS_DIR = "objects"
+
+
+class ImportResolver:
+    """Fetches imports through a content-addressed cache
+
+    Imported files are stored once per content hash under objects/, and an
+    index maps each URL to its hash along with the ETag and Last-Modified
+    the server sent. Entries younger than max_age are served straight from
+    disk, older ones are revalidated with a conditional request. If the
+    server can't be reached, the stale copy is served instead. In offline
+    mode the network is never used and only cached imports resolve.
+
+    Args:
+        path (str): Directory to keep the cache in
+        max_age (int, optional): Seconds before an entry is revalidated.
+            Defaults to 3600.
+        offline (bool, optional): Serve from the cache only. Defaults to False.
+        mirrors (dict, optional): Maps URL prefixes to a local directory
+            or another URL prefix to fetch from instead. Defaults to None.
+        timeout (int, optional): Seconds to wait for a server. Defaults to 30.
+    """
+
+    def __init__(
+        self, path, max_age=3600, offline=False, mirrors=None, timeout=30
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.offline = offline
+        self.mirrors = mirrors or {}
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._original_loader = None
+
+    def fetch(self, url):
+        """Returns the content of url, from the mirror, cache or network
+
+        Raises:
+            urllib.error.URLError: If url can't be resolved
+        """
+        mirrored = self._from_mirror(url)
+        if mirrored is not None:
+            return mirrored
+
+        with self._lock:
+            entry = self._load_index().get(url)
+        content = self._read_object(entry)
+
+        fresh = content is not None and (
+            self.offline or time.time() - entry["fetched_at"] < self.max_age
+        )
+        metrics.CACHE_LOOKUPS.inc(cache="import", result="hit" if fresh else "miss")
+        if content is not None and self.offline:
+            return content
+        if self.offline:
+            raise urllib.error.URLError("{} is not cached (offline)".format(url))
+        if fresh:
+            logger.debug("serving {} from the import cache".format(url))
+            return content
+
+        try:
+            return self._download(url, entry if content is not None else None)
+        except urllib.error.URLError as error:
+            if content is None:
+                raise
+            logger.warning(
+                "Could not revalidate {}, using cached copy: {}".format(
+                    url, getattr(error, "reason", error)
+                )
+            )
+            return content
+
+    def load_yaml(self, path, a_file=True):
+        """Drop-in replacement for toscaparser's yamlparser.load_yaml"""
+        if a_file:
+            return self._original_loader(path, a_file)
+        try:
+            content = self.fetch(path)
+        except urllib.error.URLError as error:
+            msg = 'Failed to reach server "{}". Reason is: {}.'.format(
+                path, getattr(error, "reason", error)
+            )
+            ExceptionCollector.appendException(URLException(what=msg))
+            return
+        return yaml.load(content, Loader=yamlparser.yaml_loader)
+
+    def install(self):
+        """Routes toscaparser imports through this resolver"""
+        if self._original_loader is None:
+            self._original_loader = yamlparser.load_yaml
+        imports.YAML_LOADER = self.load_yaml
+        logger.info(
+            "TOSCA imports cached in {}{}".format(
+                self.path, " (offline)" if self.offline else ""
+            )
+        )
+
+    def uninstall(self):
+        """Restores toscaparser's own import loader"""
+        if self._original_loader is not None:
+            imports.YAML_LOADER = self._original_loader
+
+    def _from_mirror(self, url):
+        """Returns url from a configured mirror, None if it isn't mirrored"""
+        for prefix, mirror in self.mirrors.items():
+            if not url.startswith(prefix):
+                continue
+            target = mirror.rstrip("/") + "/" + url[len(prefix):].lstrip("/")
+            if os.path.isfile(target):
+                with open(target, "rb") as file:
+                    return file.read()
+            if "://" in target and not self.offline:
+                with urllib.request.urlopen(target, timeout=self.timeout) as resp:
+                    return resp.read()
+        return None
+
+    def _download(self, url, entry=None):
+        """GETs url, conditionally if there is a cached entry to revalidate"""
+        request = urllib.request.Request(url)
+        if entry and entry.get("etag"):
+            request.add_header("If-None-Match", entry["etag"])
+        if entry and entry.get("last_modified"):
+            request.add_header("If-Modified-Since", entry["last_modified"])
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                content = response.read()
+                headers = response.headers
+        except urllib.error.HTTPError as error:
+            if error.code != 304 or not entry:
+                raise
+            logger.debug("{} not modified".format(url))
+            self._store(url, dict(entry, fetched_at=time.time()))
+            return self._read_object(entry)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self._write_file(os.path.join(self.path, OBJECTS_DIR, digest), content)
+        self._store(
+            url,
+            {
+                "sha256": digest,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            },
+        )
+        logger.debug("cached {} as {}".format(url, digest))
+        return content
+
+    def _read_object(self, entry):
+        """Returns the cached content of an index entry, if still valid"""
+        if not entry:
+            return None
+        object_path = os.path.join(self.path, OBJECTS_DIR, entry["sha256"])
+        try:
+            with open(object_path, "rb") as file:
+                content = file.read()
+        except OSError:
+            return None
+        if hashlib.sha256(content).hexdigest() != entry["sha256"]:
+            logger.warning("Discarding corrupt import {}".format(object_path))
+            return None
+        return content
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.path, INDEX_FILE)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, url, entry):
+        with self._lock:
+            index = self._load_index()
+            index[url] = entry
+            content = json.dumps(index, indent=2).encode()
+            self._write_file(os.path.join(self.path, INDEX_FILE), content)
+
+    def _write_file(self, path, content):
+        """Writes atomically, so readers never see a partial file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(handle, "wb") as file:
+            file.write(content)
+        os.replace(tmp_path, path)
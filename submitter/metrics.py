@@ -0,0 +1,210 @@
+"""
+MiCADO Submitter Engine Metrics
+-------------------------------
+Counters and histograms of the engine and API, in Prometheus text format
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+API_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Registry:
+    """Collects metrics and renders them for Prometheus to scrape"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError("Metric {} already registered".format(metric.name))
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append("# HELP {} {}".format(metric.family, metric.help))
+            lines.append("# TYPE {} {}".format(metric.family, metric.kind))
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.help = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    @property
+    def family(self):
+        """Name of the metric in HELP, TYPE and its samples"""
+        return self.name
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                "{} takes labels {}, got {}".format(
+                    self.name, self.labelnames, tuple(labels)
+                )
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        pairs = ",".join('{}="{}"'.format(name, _escape(v)) for name, v in pairs)
+        return "{" + pairs + "}"
+
+
+class Counter(_Metric):
+    """A value that only goes up, like a number of failures"""
+
+    kind = "counter"
+
+    @property
+    def family(self):
+        return self.name + "_total"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = self._labels(key)
+            yield "{}{} {}".format(self.family, labels, _number(value))
+
+
+class Histogram(_Metric):
+    """Counts observations, like durations, into cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=(),
+        buckets=DEFAULT_BUCKETS,
+        registry=None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes how long the body of the with block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels):
+        return self._values.get(self._key(labels), (None, 0.0, 0))[2]
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._values.items()
+            )
+        for key, counts, total, count in values:
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = self._labels(key, [("le", _number(bound))])
+                yield "{}_bucket{} {}".format(self.name, labels, bucket_count)
+            labels = self._labels(key, [("le", "+Inf")])
+            yield "{}_bucket{} {}".format(self.name, labels, count)
+            yield "{}_sum{} {}".format(self.name, self._labels(key), _number(total))
+            yield "{}_count{} {}".format(self.name, self._labels(key), count)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+PHASE_DURATION = Histogram(
+    "submitter_phase_duration_seconds",
+    "Time taken by an engine phase across all adaptors",
+    ["phase"],
+)
+STEP_DURATION = Histogram(
+    "submitter_adaptor_step_duration_seconds",
+    "Time taken by one adaptor in an engine phase",
+    ["adaptor", "phase"],
+)
+STEP_FAILURES = Counter(
+    "submitter_adaptor_step_failures",
+    "Adaptor steps that raised an error",
+    ["adaptor", "phase"],
+)
+ROLLBACKS = Counter(
+    "submitter_rollbacks",
+    "Rollbacks started after a critical adaptor error",
+    ["phase"],
+)
+RETRIES = Counter(
+    "submitter_retries",
+    "Retries of failed operations",
+    ["policy"],
+)
+RETRY_GIVE_UPS = Counter(
+    "submitter_retry_give_ups",
+    "Operations that stopped retrying, and why",
+    ["policy", "reason"],
+)
+CACHE_LOOKUPS = Counter(
+    "submitter_cache_lookups",
+    "Lookups in the template, query and import caches, by result",
+    ["cache", "result"],
+)
+CACHE_EVICTIONS = Counter(
+    "submitter_cache_evictions",
+    "Entries dropped from a cache because it was full or they expired",
+    ["cache"],
+)
+API_LATENCY = Histogram(
+    "submitter_api_request_duration_seconds",
+    "Time taken to answer an API request",
+    ["method", "endpoint", "status"],
+    buckets=API_BUCKETS,
+)
@@ -1,48 +1,91 @@
-import os
 import importlib
 import pkgutil
 import inspect
 import logging
+import threading
 
 from submitter.abstracts import Adaptor
-from submitter import adaptors
 
 logger = logging.getLogger("submitter." + __name__)
 
+# Where to find the built-in adaptors, as "module:Class"
+ADAPTORS = {
+    "KubernetesAdaptor": "submitter.adaptors.k8s_adaptor.k8s_adaptor:KubernetesAdaptor",
+    "AnsibleAdaptor": (
+        "submitter.adaptors.ansible_adaptor.ansible_adaptor:AnsibleAdaptor"
+    ),
+    "TerraformAdaptor": "submitter.adaptors.terraform_adaptor:TerraformAdaptor",
+    "OccopusAdaptor": "submitter.adaptors.occopus_adaptor:OccopusAdaptor",
+    "PkAdaptor": "submitter.adaptors.pk_adaptor:PkAdaptor",
+    "SecurityPolicyManagerAdaptor": (
+        "submitter.adaptors.security_policy_manager_adaptor"
+        ":SecurityPolicyManagerAdaptor"
+    ),
+}
+
 
 class PluginManager(object):
-    def __init__(self):
+    """Imports adaptors on first use
+
+    Adaptors in the ADAPTORS registry are imported from their module alone,
+    so only the adaptors named in the config are ever loaded. Any other
+    adaptor is looked up by searching the adaptors package. Loaded classes
+    are shared by every PluginManager.
+
+    Args:
+        registry (dict, optional): Maps adaptor names to "module:Class".
+            Defaults to ADAPTORS.
+    """
+
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, registry=None):
         logger.debug("init of the Plugin_Gestion")
-        self.plugins = self._load_plugins()
-
-    def _load_plugins(self):
-        """search through the plugin folder and import all valid plugin"""
-        logger.debug("loading the adaptors")
-        plugins = {}
-        adaptor_modules = [
-            importlib.import_module(name)
-            for _, name, ispkg in pkgutil.walk_packages(
-                path=adaptors.__path__, prefix=adaptors.__name__ + "."
-            )
-            if name.endswith("_adaptor") and not ispkg
-        ]
-        for module in adaptor_modules:
-            adaptor_class = {
-                name: plugin_class
-                for name, plugin_class in inspect.getmembers(module, inspect.isclass)
-                if issubclass(plugin_class, Adaptor)
-            }
-            plugins.update(adaptor_class)
-
-        return plugins
+        self.registry = ADAPTORS if registry is None else registry
 
     def get_plugin(self, plugin_name):
-        """Given the name of a plugin, returns the plugin's class and an instance of the plugin,
-        or (None, None) if the plugin isn't listed in the available plugins."""
+        """Given the name of a plugin, returns the plugin's class, importing
+        it if needed. Raises FileNotFoundError if it cannot be found."""
         logger.debug("plugin wanted: {}".format(plugin_name))
+        with self._lock:
+            if plugin_name not in self._loaded:
+                self._loaded[plugin_name] = self._load_plugin(plugin_name)
+            return self._loaded[plugin_name]
+
+    def _load_plugin(self, plugin_name):
+        path = self.registry.get(plugin_name)
+        if path is None:
+            return self._search_plugin(plugin_name)
+
+        module_name, _, class_name = path.partition(":")
+        logger.debug("loading the adaptor {} from {}".format(plugin_name, path))
         try:
-            return self.plugins[plugin_name]
-        except KeyError as err:
+            module = importlib.import_module(module_name)
+            plugin_class = getattr(module, class_name or plugin_name)
+        except (ImportError, AttributeError) as err:
             raise FileNotFoundError(
-                "Could not find '{}' in adaptors".format(plugin_name)
+                "Could not load '{}' from {}: {}".format(plugin_name, path, err)
             ) from err
+
+        if not (inspect.isclass(plugin_class) and issubclass(plugin_class, Adaptor)):
+            raise FileNotFoundError("'{}' is not an adaptor".format(path))
+        return plugin_class
+
+    def _search_plugin(self, plugin_name):
+        """search through the plugin folder for an unregistered plugin"""
+        from submitter import adaptors
+
+        logger.debug("searching the adaptors for {}".format(plugin_name))
+        for _, name, ispkg in pkgutil.walk_packages(
+            path=adaptors.__path__, prefix=adaptors.__name__ + "."
+        ):
+            if ispkg or not name.endswith("_adaptor"):
+                continue
+            plugin_class = getattr(importlib.import_module(name), plugin_name, None)
+            if inspect.isclass(plugin_class) and issubclass(plugin_class, Adaptor):
+                return plugin_class
+
+        raise FileNotFoundError(
+            "Could not find '{}' in adaptors".format(plugin_name)
+        )
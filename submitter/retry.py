@@ -0,0 +1,244 @@
+"""
+MiCADO Submitter Engine Retry
+-----------------------------
+Retries operations that fail for a while, such as calls to other MiCADO
+services, with exponential backoff, deadlines and retry budgets
+"""
+import collections
+import logging
+import random
+import threading
+import time
+
+from submitter import metrics
+
+logger = logging.getLogger("submitter." + __name__)
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+class RetryBudget:
+    """Caps retries to a share of the calls made over a sliding window
+
+    Transient errors are retried, but when a dependency is down and
+    every call fails, retries stop once they exceed the budget, instead
+    of multiplying the load on it.
+
+    Args:
+        ratio (float, optional): Retries allowed per call. Defaults to 0.2.
+        minimum (int, optional): Retries always allowed in the window.
+            Defaults to 10.
+        window (float, optional): Length of the window in seconds.
+            Defaults to 60.
+    """
+
+    def __init__(self, ratio=0.2, minimum=10, window=60):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self._calls = collections.deque()
+        self._retries = collections.deque()
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self._calls.append(time.monotonic())
+
+    def try_spend(self):
+        """Takes a retry from the budget, returns False if there is none left"""
+        with self._lock:
+            now = time.monotonic()
+            for times in (self._calls, self._retries):
+                while times and times[0] < now - self.window:
+                    times.popleft()
+            if len(self._retries) >= self.minimum + self.ratio * len(self._calls):
+                return False
+            self._retries.append(now)
+            return True
+
+
+def get_budget(name, **config):
+    """Returns the budget shared by every policy of the given name"""
+    with _budgets_lock:
+        budget = _budgets.get(name)
+        if budget is None:
+            budget = _budgets[name] = RetryBudget(**config)
+        else:
+            for key, value in config.items():
+                setattr(budget, key, value)
+        return budget
+
+
+class RetryPolicy:
+    """Retries a failing operation with exponential backoff and jitter
+
+    The wait before retry n is random, up to base_delay * multiplier**n
+    and at most max_delay, so clients failing together do not retry
+    together. Retrying stops after the given attempts, when the deadline
+    would pass, or when the budget runs out, whichever comes first.
+
+    Args:
+        name (str, optional): Name in logs and metrics. Defaults to "default".
+        attempts (int, optional): Calls, including the first. None for no
+            limit. Defaults to 5.
+        base_delay (float, optional): Seconds before the first retry.
+            Defaults to 0.5.
+        max_delay (float, optional): Longest wait in seconds. Defaults to 30.
+        multiplier (float, optional): Growth of the wait. Defaults to 2.
+        jitter (bool, optional): Randomise the wait. Defaults to True.
+        deadline (float, optional): Seconds to keep retrying for. None for
+            no limit. Defaults to None.
+        budget (RetryBudget, optional): Budget to take retries from.
+            Defaults to None.
+    """
+
+    def __init__(
+        self,
+        name="default",
+        attempts=5,
+        base_delay=0.5,
+        max_delay=30,
+        multiplier=2,
+        jitter=True,
+        deadline=None,
+        budget=None,
+    ):
+        if attempts is None and deadline is None:
+            raise ValueError("A retry policy needs attempts or a deadline")
+        self.name = name
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.budget = budget
+
+    @classmethod
+    def from_config(cls, name, config=None, **changes):
+        """Builds a policy from a ``retry`` section of the config
+
+        A ``budget`` in the section is shared by every policy of the name.
+        """
+        config = dict(config or {}, **changes)
+        budget = config.pop("budget", None)
+        if isinstance(budget, dict):
+            budget = get_budget(name, **budget)
+        return cls(name, budget=budget, **config)
+
+    def replace(self, **changes):
+        """Returns a copy of the policy with some settings changed"""
+        settings = dict(vars(self), **changes)
+        return type(self)(**settings)
+
+    def call(
+        self,
+        fn,
+        *args,
+        retry_on=Exception,
+        retry_if_error=None,
+        retry_if_result=None,
+        **kwargs
+    ):
+        """Calls fn(*args, **kwargs), retrying it while it fails
+
+        Args:
+            retry_on (type or tuple, optional): Exceptions to retry.
+                Defaults to Exception.
+            retry_if_error (callable, optional): Only retry the exceptions
+                it returns True for. Defaults to None.
+            retry_if_result (callable, optional): Also retry the results
+                it returns True for. Defaults to None.
+
+        Returns:
+            The result of the last call, once it succeeds or retrying stops
+
+        Raises:
+            The error of the last call, if it failed and retrying stopped
+        """
+        if self.budget:
+            self.budget.record_call()
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            error = None
+            try:
+                result = fn(*args, **kwargs)
+            except retry_on as err:
+                if retry_if_error and not retry_if_error(err):
+                    raise
+                error = err
+            else:
+                if not (retry_if_result and retry_if_result(result)):
+                    return result
+
+            delay = self._next_delay(attempt, start)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+
+            metrics.RETRIES.inc(policy=self.name)
+            logger.debug(
+                "{} failed ({}), attempt {}, retrying in {:.2f}s".format(
+                    self.name, error or "unwanted result", attempt, delay
+                )
+            )
+            time.sleep(delay)
+
+    def _next_delay(self, attempt, start):
+        """The wait before the next attempt, or None to stop retrying"""
+        reason = None
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        if self.attempts is not None and attempt >= self.attempts:
+            reason = "attempts"
+        elif self.deadline is not None:
+            remaining = self.deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                reason = "deadline"
+            delay = min(delay, max(remaining, 0))
+        if reason is None and self.budget and not self.budget.try_spend():
+            reason = "budget"
+
+        if reason is None:
+            return delay
+        metrics.RETRY_GIVE_UPS.inc(policy=self.name, reason=reason)
+        logger.debug(
+            "{} gave up after {} attempts ({})".format(self.name, attempt, reason)
+        )
+        return None
+
+
+def http_request(policy, method, url, timeout=30, idempotent=True, **kwargs):
+    """Sends a request with the requests library, following the policy
+
+    Connection errors, timeouts and 5xx responses are retried. The last
+    response is returned even if it is a 5xx, for the caller to check.
+    Requests that are not idempotent are only retried on connection
+    errors, as a timeout or a 5xx may come after the server acted on them.
+    """
+    import requests
+
+    if not idempotent:
+        return policy.call(
+            requests.request,
+            method,
+            url,
+            timeout=timeout,
+            retry_on=requests.ConnectionError,
+            **kwargs
+        )
+    return policy.call(
+        requests.request,
+        method,
+        url,
+        timeout=timeout,
+        retry_on=(requests.ConnectionError, requests.Timeout),
+        retry_if_result=lambda response: response.status_code >= 500,
+        **kwargs
+    )
@@ -0,0 +1,285 @@
+"""
+MiCADO Submitter Engine State Store
+-----------------------------------
+Keeps the state of deployed applications and their adaptors in SQLite
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("submitter." + __name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    app_id TEXT PRIMARY KEY,
+    components TEXT NOT NULL,
+    dry_run INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS adaptors (
+    app_id TEXT NOT NULL REFERENCES apps (app_id) ON DELETE CASCADE,
+    adaptor TEXT NOT NULL,
+    status TEXT,
+    output TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (app_id, adaptor)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    app_id TEXT PRIMARY KEY REFERENCES apps (app_id) ON DELETE CASCADE,
+    phase TEXT NOT NULL,
+    steps TEXT NOT NULL,
+    completed TEXT NOT NULL,
+    source TEXT,
+    params TEXT,
+    failed TEXT,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied REAL NOT NULL
+);
+"""
+
+
+class StateStore:
+    """Transactional store for application and adaptor state
+
+    Every change is written on its own as a small transaction, so a
+    launch or an update only writes the rows it touches. The database runs
+    in WAL mode, so readers don't block the writer.
+
+    Args:
+        path (str): Path to the SQLite database, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Groups writes into one atomic transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def is_empty(self):
+        with self._lock:
+            return not self._conn.execute("SELECT 1 FROM apps LIMIT 1").fetchone()
+
+    def load(self):
+        """Returns every application, shaped like SubmitterEngine.app_list
+
+        Returns:
+            dict: Maps app IDs to components, dry_run and adaptor output
+        """
+        with self._lock:
+            apps = self._conn.execute(
+                "SELECT app_id, components, dry_run FROM apps"
+            ).fetchall()
+            adaptors = self._conn.execute(
+                "SELECT app_id, adaptor, output FROM adaptors"
+            ).fetchall()
+
+        app_list = {
+            app_id: {
+                "components": json.loads(components),
+                "dry_run": bool(dry_run),
+                "output": {},
+            }
+            for app_id, components, dry_run in apps
+        }
+        for app_id, adaptor, output in adaptors:
+            if output is not None:
+                app_list[app_id]["output"][adaptor] = json.loads(output)
+        return app_list
+
+    def save_app(self, app_id, components, dry_run):
+        """Records a new application or its changed list of components"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO apps (app_id, components, dry_run, updated) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (app_id) DO UPDATE SET "
+                "components = excluded.components, dry_run = excluded.dry_run, "
+                "updated = excluded.updated",
+                (
+                    app_id,
+                    json.dumps(list(components)),
+                    int(bool(dry_run)),
+                    time.time(),
+                ),
+            )
+
+    def save_adaptor(self, app_id, adaptor, status=None, output=None):
+        """Records the status and output of one adaptor of an application"""
+        output = json.dumps(output, default=str) if output else None
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO adaptors (app_id, adaptor, status, output, updated) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (app_id, adaptor) DO UPDATE SET "
+                "status = excluded.status, "
+                "output = COALESCE(excluded.output, adaptors.output), "
+                "updated = excluded.updated",
+                (app_id, adaptor, status, output, time.time()),
+            )
+
+    def get_status(self, app_id):
+        """Returns the last recorded status of each adaptor of an app"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT adaptor, status FROM adaptors WHERE app_id = ?", (app_id,)
+            ).fetchall()
+        return {adaptor: status for adaptor, status in rows if status}
+
+    def start_checkpoint(self, app_id, phase, steps, source=None, params=None):
+        """Records that a phase started on an application
+
+        Args:
+            app_id (str): The application
+            phase (str): The phase, execute or update
+            steps (list): The adaptors the phase runs
+            source (str, optional): Path or URL of the ADT, to resume from
+            params (dict, optional): Inputs the ADT was parsed with
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (app_id, phase, steps, "
+                "completed, source, params, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    app_id,
+                    phase,
+                    json.dumps(list(steps)),
+                    json.dumps([]),
+                    source,
+                    json.dumps(params or {}, default=str),
+                    time.time(),
+                ),
+            )
+
+    def complete_step(self, app_id, step):
+        """Checkpoints an adaptor that finished its step"""
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT completed FROM checkpoints WHERE app_id = ?", (app_id,)
+            ).fetchone()
+            if not row:
+                return
+            completed = json.loads(row[0])
+            if step not in completed:
+                completed.append(step)
+            conn.execute(
+                "UPDATE checkpoints SET completed = ?, failed = NULL, error = NULL, "
+                "updated = ? WHERE app_id = ?",
+                (json.dumps(completed), time.time(), app_id),
+            )
+
+    def fail_step(self, app_id, step, error):
+        """Records the adaptor step that stopped a phase"""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE checkpoints SET failed = ?, error = ?, updated = ? "
+                "WHERE app_id = ?",
+                (step, str(error), time.time(), app_id),
+            )
+
+    def get_checkpoint(self, app_id):
+        """Returns the unfinished phase of an application, or None
+
+        Returns:
+            dict: phase, steps, completed, source, params, failed and error
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT phase, steps, completed, source, params, failed, error "
+                "FROM checkpoints WHERE app_id = ?",
+                (app_id,),
+            ).fetchone()
+        if not row:
+            return None
+        phase, steps, completed, source, params, failed, error = row
+        return {
+            "phase": phase,
+            "steps": json.loads(steps),
+            "completed": json.loads(completed),
+            "source": source,
+            "params": json.loads(params) if params else {},
+            "failed": failed,
+            "error": error,
+        }
+
+    def clear_checkpoint(self, app_id):
+        """Forgets the checkpoint of a phase that finished"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE app_id = ?", (app_id,))
+
+    def remove_app(self, app_id):
+        """Forgets an application and the state of its adaptors"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM apps WHERE app_id = ?", (app_id,))
+
+    def import_apps(self, app_list):
+        """Loads applications from an old ids.json in one transaction"""
+        with self.transaction() as conn:
+            for app_id, app in app_list.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO apps "
+                    "(app_id, components, dry_run, updated) VALUES (?, ?, ?, ?)",
+                    (
+                        app_id,
+                        json.dumps(app.get("components", [])),
+                        int(bool(app.get("dry_run"))),
+                        time.time(),
+                    ),
+                )
+                for adaptor, output in (app.get("output") or {}).items():
+                    conn.execute(
+                        "INSERT OR IGNORE INTO adaptors "
+                        "(app_id, adaptor, output, updated) VALUES (?, ?, ?, ?)",
+                        (
+                            app_id,
+                            adaptor,
+                            json.dumps(output, default=str),
+                            time.time(),
+                        ),
+                    )
+        logger.info(
+            "imported {} application(s) into the state store".format(len(app_list))
+        )
+
+    def has_migration(self, name):
+        """Returns True if the one-off migration name was recorded"""
+        with self._lock:
+            return bool(
+                self._conn.execute(
+                    "SELECT 1 FROM migrations WHERE name = ?", (name,)
+                ).fetchone()
+            )
+
+    def record_migration(self, name):
+        """Records that the one-off migration name is done"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO migrations (name, applied) VALUES (?, ?)",
+                (name, time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
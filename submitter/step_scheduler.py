@@ -0,0 +1,146 @@
+"""
+MiCADO Submitter Engine Step Scheduler
+--------------------------------------
+Runs the steps of an engine phase as a dependency graph on a worker pool
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger("submitter." + __name__)
+
+
+class StepScheduler:
+    """Schedules the steps of a phase according to their dependencies
+
+    Every step starts as soon as all of the steps it depends on are done.
+    Dependencies on steps that are not part of the phase are followed
+    through to the nearest steps that are, so ordering is kept transitively.
+    When several steps are ready, they are started in the configured order,
+    so a single worker runs the phase exactly like the old serial loop.
+
+    Args:
+        steps (list): Ordered names of the steps in this phase
+        dependencies (dict): Maps a step name to the names it depends on
+        max_workers (int, optional): Size of the worker pool. Defaults to 1.
+
+    Raises:
+        ValueError: If the dependencies are circular
+    """
+
+    def __init__(self, steps, dependencies, max_workers=1):
+        self.steps = list(steps)
+        self.max_workers = max(1, int(max_workers or 1))
+        self.dependencies = {
+            step: _present_dependencies(step, dependencies, set(self.steps))
+            for step in self.steps
+        }
+        self._check_cycles()
+
+    def run(self, step_fn, keep_going=False):
+        """Calls step_fn(step) for each step, respecting dependencies
+
+        After a step fails, no new steps are started unless keep_going
+        is set, in which case only the steps depending on a failed step are
+        skipped. Steps already running are always allowed to finish.
+
+        Args:
+            step_fn (callable): Called with the name of each step
+            keep_going (bool, optional): Keep starting independent steps
+                after a failure. Defaults to False.
+
+        Returns:
+            dict: Exceptions raised by failed steps, in configured order
+        """
+        done, failed, skipped = set(), {}, set()
+        running = {}
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="step"
+        ) as pool:
+            while True:
+                if keep_going or not failed:
+                    for step in self._ready(done, failed, skipped, running):
+                        if len(running) >= self.max_workers:
+                            break
+                        logger.debug("starting step {}".format(step))
+                        running[pool.submit(step_fn, step)] = step
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        done.add(step)
+                    else:
+                        logger.debug("step {} failed: {}".format(step, error))
+                        failed[step] = error
+
+        return {step: failed[step] for step in self.steps if step in failed}
+
+    def _ready(self, done, failed, skipped, running):
+        """Yields steps whose dependencies are done, marking dead ends"""
+        started = set(running.values())
+        for step in self.steps:
+            if step in done or step in failed or step in skipped:
+                continue
+            if step in started:
+                continue
+            dependencies = self.dependencies[step]
+            if dependencies & (set(failed) | skipped):
+                logger.debug("skipping {}, a dependency failed".format(step))
+                skipped.add(step)
+                continue
+            if dependencies <= done:
+                yield step
+
+    def _check_cycles(self):
+        """Raises ValueError if the dependency graph is not acyclic"""
+        resolved = set()
+        remaining = dict(self.dependencies)
+        while remaining:
+            ready = [s for s, deps in remaining.items() if deps <= resolved]
+            if not ready:
+                raise ValueError(
+                    "Circular dependency between steps: {}".format(
+                        ", ".join(sorted(remaining))
+                    )
+                )
+            for step in ready:
+                resolved.add(step)
+                remaining.pop(step)
+
+
+def reverse_dependencies(dependencies):
+    """Inverts a dependency graph, for phases that tear things down
+
+    Args:
+        dependencies (dict): Maps a step name to the names it depends on
+
+    Returns:
+        dict: Maps a step name to the names that depend on it
+    """
+    reversed_deps = {}
+    for step, step_deps in dependencies.items():
+        reversed_deps.setdefault(step, set())
+        for dependency in step_deps:
+            reversed_deps.setdefault(dependency, set()).add(step)
+    return reversed_deps
+
+
+def _present_dependencies(step, dependencies, present):
+    """Returns the nearest dependencies of a step that are in this phase"""
+    found, seen = set(), set()
+    pending = list(dependencies.get(step, ()))
+    while pending:
+        dependency = pending.pop()
+        if dependency in seen or dependency == step:
+            continue
+        seen.add(dependency)
+        if dependency in present:
+            found.add(dependency)
+        else:
+            pending.extend(dependencies.get(dependency, ()))
+    return found
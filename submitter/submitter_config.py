@@ -3,7 +3,11 @@ MiCADO Submitter Engine Submitter Config
 ----------------------------------------
 A module allowing the configuration of the whole submitter
 """
+import copy
+import hashlib
 import logging
+import os
+import threading
 from os import path
 
 from submitter import utils
@@ -17,12 +21,66 @@ DEFAULTS = {
     "out_path": "/var/lib/submitter/files/output_configs/"
 }
 
+_cache = {}
+_cache_lock = threading.Lock()
+
+
 def _reading_config(path):
     """reading the config file and creating a dictionary related to it"""
     logger.debug("reading config file")
     return utils.get_yaml_data(path)
 
 
+def load_config(config_path=CONFIG_FILE):
+    """Returns the parsed config file, shared by the whole process
+
+    The file is only parsed again when its modification time or size
+    changes and its content hashes differently. A config that no longer
+    parses is logged and the last good one is kept.
+
+    Returns:
+        tuple: A version number, bumped on every reload, and the config
+    """
+    with _cache_lock:
+        stat = os.stat(config_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = _cache.get(config_path)
+        if cached and cached["stamp"] == stamp:
+            return cached["version"], cached["config"]
+
+        with open(config_path, "rb") as file:
+            raw = file.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached and cached["digest"] == digest:
+            cached["stamp"] = stamp
+            return cached["version"], cached["config"]
+
+        logger.debug("reading config file")
+        try:
+            config = utils.get_yaml_data(raw.decode(), stream=True)
+        except Exception as error:
+            if not cached:
+                raise
+            logger.error(
+                "Keeping the last config, could not read {}: {}".format(
+                    config_path, error
+                )
+            )
+            cached.update(stamp=stamp, digest=digest)
+            return cached["version"], cached["config"]
+
+        version = cached["version"] + 1 if cached else 1
+        if cached:
+            logger.info("reloaded config file {}".format(config_path))
+        _cache[config_path] = {
+            "stamp": stamp,
+            "digest": digest,
+            "version": version,
+            "config": config,
+        }
+        return version, config
+
+
 class SubmitterConfig:
     """
     This is the SubmitterConfig,
@@ -34,19 +92,37 @@ class SubmitterConfig:
     Optional testing parameter can be passed to __init__
     to define which key_config files to take for test purposes.
 
-
+    The file is parsed once per process (see ``load_config()``) and each
+    instance works on its own copy. ``main_config`` and ``step_config``
+    are fixed for the life of the instance, while ``adaptor_config``
+    follows changes to the file, so adaptors pick up new settings the
+    next time they are instantiated.
     """
 
-    logging_config = _reading_config(CONFIG_FILE)["logging"]
+    logging_config = copy.deepcopy(load_config(CONFIG_FILE)[1]["logging"])
 
     def __init__(self, testing=None):
         logger.debug("initialisation of SubmitterConfig class")
-        config_path = testing or CONFIG_FILE
-        config = _reading_config(config_path)
+        self.config_path = testing or CONFIG_FILE
+        self._version = None
+        config = self._refresh()
 
         self.main_config = config["main_config"]
         self.step_config = config["step"]
-        self.adaptor_config = config["adaptor_config"]
+
+    @property
+    def adaptor_config(self):
+        return self._refresh()["adaptor_config"]
+
+    def _refresh(self):
+        """Takes a copy of the shared config if the file changed"""
+        version, config = load_config(self.config_path)
+        if version != self._version:
+            if self._version is not None:
+                logger.info("picked up changes to the adaptor config")
+            self._config = copy.deepcopy(config)
+            self._version = version
+        return self._config
 
     def get_list_adaptors(self):
         """return list of adaptors to use"""
@@ -1,55 +1,106 @@
+import hashlib
 import json
 import logging
+import os
+import tempfile
+import threading
+import urllib.request
+from contextlib import contextmanager
 from pathlib import Path
 
 from micadoparser import parser
 from micadoparser.validator import MultiError
 
+from submitter.cache import LRUCache
+from submitter.import_resolver import ImportResolver
 from submitter.plugin_manager import PluginManager
+from submitter.retry import RetryPolicy
+from submitter.state_store import StateStore
+from submitter.update_planner import UpdatePlanner
+from submitter.step_scheduler import StepScheduler, reverse_dependencies
 from submitter.abstracts.exceptions import AdaptorCritical, AdaptorError
 from submitter.submitter_config import SubmitterConfig
-from submitter import utils
+from submitter import events, metrics, utils
 
 logger = logging.getLogger("submitter." + __name__)
 
 
 JSON_FILE = Path(__file__).parent / "system/ids.json"
+STATE_DB = Path(__file__).parent / "system/state.db"
+
+# micadoparser and toscaparser keep global state while parsing
+_PARSER_LOCK = threading.Lock()
+
+_MISSING = object()
 
 
 class SubmitterEngine(object):
     """The engine responsible for triggering adaptors and their steps"""
 
-    def __init__(self):
+    def __init__(self, load_state=True):
         """
         Init the SubmitterEngine with adaptors and retrieve JSON_DATA to see if there's any
         already launched application.
+
+        With load_state False, the engine neither reads nor writes the
+        state of applications, and can only validate ADTs.
         """
         super(SubmitterEngine, self).__init__()
         logger.debug("init of submitter engine class")
 
-        try:
-            self.app_list = utils.load_json(JSON_FILE)
-        except FileNotFoundError:
-            logger.debug(
-                "file {} not found, so no previous app loaded".format(JSON_FILE)
-            )
-            self.app_list = {}
         logger.debug("load configurations")
         self.object_config = SubmitterConfig()
 
+        self.state, self.app_list = None, {}
+        if load_state:
+            self.state = StateStore(
+                self.object_config.main_config.get("state_db") or STATE_DB
+            )
+            # ids.json is imported once, not every time the store empties
+            if not self.state.has_migration("ids.json"):
+                if self.state.is_empty():
+                    self._import_json()
+                self.state.record_migration("ids.json")
+            self.app_list = self.state.load()
+
         self.adaptors_class_name = self._get_adaptors_class()
         logger.debug(
             "list of adaptors init'd: {}".format(self.adaptors_class_name)
         )
 
-        self.translated_adaptors = {}
-        self.executed_adaptors = {}
+        self._lock = threading.RLock()
+        self._app_locks = {}
 
-    def launch(self, template, dict_object_adaptors, id_app, dry_run):
+        cache_config = self.object_config.main_config.get("template_cache") or {}
+        self.template_cache = LRUCache(
+            cache_config.get("maxsize", 16), cache_config.get("ttl", 600), "template"
+        )
+        cache_config = self.object_config.main_config.get("query_cache") or {}
+        self.query_cache = LRUCache(
+            cache_config.get("maxsize", 128), cache_config.get("ttl", 10), "query"
+        )
+        # Adaptors of applications deployed before a restart, built once
+        self._idle_adaptors = {}
+
+        self.import_resolver = None
+        import_config = self.object_config.main_config.get("import_cache")
+        if import_config:
+            self.import_resolver = ImportResolver(**import_config)
+            self.import_resolver.install()
+
+    def launch(
+        self,
+        template,
+        dict_object_adaptors,
+        id_app,
+        dry_run,
+        path_to_file=None,
+        parsed_params=None,
+    ):
         """
         Launch method, that will call the in-method egine to execute the application
         Creating empty list for the whole class adaptor and executed adaptor
-        :params: path_to_file, parsed_params
+        :params: path_to_file, parsed_params of the template, to resume from
         :types: string, dictionary
         .. note::
             For the time being we only have one "workflow engine" but we could extend this
@@ -58,24 +109,43 @@ class SubmitterEngine(object):
         """
 
         logger.info("******  Launching the application ******")
-        if self.app_list:
-            raise Exception(
-                "An application is already running, MiCADO doesn't currently support multi applications"
+        with self.app_lock(id_app):
+            with self._lock:
+                if id_app in self.app_list:
+                    raise Exception(
+                        "An application with ID {} is already running".format(id_app)
+                    )
+                elif self.app_list:
+                    # Undeploying an app still deletes every MiCADO node and
+                    # stops every scaling policy, see KubernetesAdaptor and
+                    # PkAdaptor, so only one application can run at a time
+                    raise Exception(
+                        "An application is already running, MiCADO doesn't "
+                        "currently support multi applications"
+                    )
+                self.app_list.update(
+                    {
+                        id_app: {
+                            "components": list(dict_object_adaptors.keys()),
+                            "adaptors_object": dict_object_adaptors,
+                            "dry_run": dry_run,
+                            "template": template,
+                        }
+                    }
+                )
+            self.state.save_app(id_app, dict_object_adaptors.keys(), dry_run)
+            self._start_checkpoint(
+                id_app,
+                "execute",
+                self.object_config.step_config["execute"],
+                path_to_file,
+                parsed_params,
             )
+            self._forget_adaptors(id_app)
+            logger.debug("dictionnaty of id is: {}".format(self.app_list))
 
-        self.app_list.update(
-            {
-                id_app: {
-                    "components": list(dict_object_adaptors.keys()),
-                    "adaptors_object": dict_object_adaptors,
-                    "dry_run": dry_run,
-                }
-            }
-        )
-        self._update_json()
-        logger.debug("dictionnaty of id is: {}".format(self.app_list))
-
-        self._engine(dict_object_adaptors, id_app)
+            with _published(id_app, "deployed"):
+                self._engine(dict_object_adaptors, id_app)
 
         logger.info("launched process done")
         logger.info("*********************")
@@ -89,40 +159,51 @@ class SubmitterEngine(object):
         """
         logger.info("****** proceding to the undeployment of the application *****")
 
-        try:
-            if id_app not in self.app_list.keys() and not force:
-                raise Exception("application doesn't exist")
-        except AttributeError:
-            logger.error(
-                "no application has been detected on the infrastructure trying to see if force flag present"
-            )
-            if not force:
-                raise Exception("no application detected")
-            else:
-                logger.info("force flag detected, preceeding to undeploy")
+        with self.app_lock(id_app):
+            try:
+                if id_app not in self.app_list.keys() and not force:
+                    raise Exception("application doesn't exist")
+            except AttributeError:
+                logger.error(
+                    "no application has been detected on the infrastructure trying to see if force flag present"
+                )
+                if not force:
+                    raise Exception("no application detected")
+                else:
+                    logger.info("force flag detected, preceeding to undeploy")
 
-        dict_object_adaptors = self._instantiate_adaptors(
-            id_app, self.app_list[id_app]["dry_run"]
-        )
-        logger.debug("{}".format(dict_object_adaptors))
+            dict_object_adaptors = self._app_adaptors(
+                id_app, self.app_list[id_app]["dry_run"]
+            )
+            logger.debug("{}".format(dict_object_adaptors))
 
-        self._undeploy(dict_object_adaptors)
+            with _published(id_app, "undeployed"):
+                self._undeploy(dict_object_adaptors, id_app)
 
-        self._cleanup(id_app, dict_object_adaptors)
-        if self.app_list:
-            self.app_list.pop(id_app)
-            self._update_json()
+                self._cleanup(id_app, dict_object_adaptors)
+                self._remove_app_dirs(id_app)
+                with self._lock:
+                    self.app_list.pop(id_app, None)
+                self._forget_adaptors(id_app)
+                self.state.remove_app(id_app)
         logger.info("undeploy process done")
         logger.info("*********************")
 
-    def update(self, id_app, template, dict_object_adaptors):
+    def update(
+        self,
+        id_app,
+        template,
+        dict_object_adaptors,
+        path_to_file=None,
+        parsed_params=None,
+    ):
         """
         Update method that will be updating the application we want to update.
 
         :params id: id of the application we want to update
         :params type: string
 
-        :params path_to_file: path to the template file
+        :params path_to_file: path to the template file, to resume from
         :params type: string
 
         :params parse_params: dictionary containing the value we want to use as the value of the input section
@@ -134,23 +215,109 @@ class SubmitterEngine(object):
             "****** proceding to the update of the application {}******".format(id_app)
         )
 
-        dry_run = self.app_list[id_app]["dry_run"]
-
-        logger.debug("list of adaptor created: {}".format(dict_object_adaptors))
-        self.app_list.update(
-            {
-                id_app: {
-                    "components": list(dict_object_adaptors.keys()),
-                    "adaptors_object": dict_object_adaptors,
-                    "dry_run": dry_run,
-                }
-            }
-        )
-        self._update(dict_object_adaptors, id_app)
-        logger.info("update process done")
-        self._update_json()
+        with self.app_lock(id_app):
+            dry_run = self.app_list[id_app]["dry_run"]
+            plan = self.plan_update(id_app, template)
+
+            logger.debug("list of adaptor created: {}".format(dict_object_adaptors))
+            with self._lock:
+                app = self.app_list[id_app]
+                self.app_list.update(
+                    {
+                        id_app: {
+                            "components": list(dict_object_adaptors.keys()),
+                            "adaptors_object": dict_object_adaptors,
+                            "dry_run": dry_run,
+                            "output": app.get("output", {}),
+                            "template": app.get("template"),
+                        }
+                    }
+                )
+            self.state.save_app(id_app, dict_object_adaptors.keys(), dry_run)
+            self._start_checkpoint(
+                id_app, "update", plan.adaptors, path_to_file, parsed_params
+            )
+            self._forget_adaptors(id_app)
+            try:
+                with _published(id_app, "updated"):
+                    self._update(dict_object_adaptors, id_app, plan.adaptors)
+            finally:
+                # Queries answered mid-update may be stale already
+                self._forget_adaptors(id_app)
+            self._checkpoint(self.state.clear_checkpoint, id_app)
+            self.app_list[id_app]["template"] = template
+            logger.info("update process done")
         logger.info("*******************")
 
+    def resume(self, id_app):
+        """Continues a deployment or update that crashed or failed
+
+        The ADT is parsed and translated again, then the phase carries on
+        from the checkpoint: adaptors that finished their step are not run
+        again, so only the failed and the remaining steps cost anything.
+        An update is translated without writing files, as in update, so
+        that the adaptors still diff the new ADT against what is deployed.
+
+        :params id_app: id of the application to resume
+        :params type: string
+        """
+        checkpoint = self.state.get_checkpoint(id_app)
+        if not checkpoint:
+            raise KeyError("Application {} has nothing to resume".format(id_app))
+        if not checkpoint["source"]:
+            raise Exception("The ADT of application {} is not known".format(id_app))
+
+        logger.info(
+            "****** resuming the {} of application {} after {} ******".format(
+                checkpoint["phase"], id_app, checkpoint["completed"] or "no steps"
+            )
+        )
+        template = self._get_template(checkpoint["source"], checkpoint["params"])
+        with self.app_lock(id_app):
+            dry_run = self.app_list[id_app]["dry_run"]
+            validate = checkpoint["phase"] == "update"
+            adaptors = self._instantiate_adaptors(id_app, dry_run, validate, template)
+            self._translate(adaptors, {}, id_app)
+            with self._lock:
+                self.app_list[id_app].update(
+                    {
+                        "components": list(adaptors.keys()),
+                        "adaptors_object": adaptors,
+                        "template": template,
+                    }
+                )
+            self._forget_adaptors(id_app)
+
+            done = checkpoint["completed"]
+            if checkpoint["phase"] == "update":
+                with _published(id_app, "updated"):
+                    self._update(adaptors, id_app, checkpoint["steps"], done)
+                self._checkpoint(self.state.clear_checkpoint, id_app)
+            else:
+                with _published(id_app, "deployed"):
+                    self._engine(adaptors, id_app, done)
+        logger.info("resume process done")
+
+    def plan_update(self, id_app, template):
+        """Works out which adaptors an update to the application affects
+
+        Compares the new template with the one last deployed, node by node
+        and policy by policy. If the previous template is not known (e.g.
+        after a restart), every adaptor is updated.
+
+        Returns:
+            UpdatePlan: the adaptors to update and the reasons why
+        """
+        owners = {}
+        for adaptor in self.adaptors_class_name:
+            if adaptor.__name__ not in self.object_config.step_config["update"]:
+                continue
+            config = self.object_config.adaptor_config.get(adaptor.__name__) or {}
+            owners[adaptor.__name__] = (adaptor.lifecycle, config.get("types", []))
+
+        old_template = self.app_list.get(id_app, {}).get("template")
+        return UpdatePlanner(owners).plan(old_template, template)
+
     def _validate(
         self,
         path_to_file,
@@ -175,65 +342,121 @@ class SubmitterEngine(object):
         logger.info(
             "****** Starting the validation process of {} *****".format(path_to_file)
         )
-        template = parser.set_template(path_to_file, parsed_params)
+        template = self._get_template(path_to_file, parsed_params)
 
-        # Adaptors instantiation
-        logger.debug("Instantiating the required adaptors")
-        dict_object_adaptors = self._instantiate_adaptors(
-            app_id, dry_run, validate, template
-        )
-        logger.info("Adaptors are successfully instantiated")
-        logger.debug("list of objects adaptor: {}".format(dict_object_adaptors))
-
-        # Adaptors translation
-        try:
-            self._translate(dict_object_adaptors)
-        except MultiError:
-            raise
-        except AdaptorCritical as error:
-            logger.error(
-                "******* Critical error during deployment, starting to roll back *********",
-                error,
+        with self.app_lock(app_id):
+            # Adaptors instantiation
+            logger.debug("Instantiating the required adaptors")
+            dict_object_adaptors = self._instantiate_adaptors(
+                app_id, dry_run, validate, template
             )
-            if self.translated_adaptors:
-                logger.info("Starting clean-up on translated files")
-                self._cleanup(app_id, self.translated_adaptors)
+            logger.info("Adaptors are successfully instantiated")
+            logger.debug("list of objects adaptor: {}".format(dict_object_adaptors))
 
-            logger.info("Adaptor translation wasn't successful...")
-            logger.info("*******************")
-            raise
+            # Adaptors translation
+            translated_adaptors = {}
+            try:
+                self._translate(dict_object_adaptors, translated_adaptors, app_id)
+            except MultiError:
+                raise
+            except AdaptorCritical as error:
+                logger.error(
+                    "******* Critical error during deployment, starting to roll back *********",
+                    error,
+                )
+                metrics.ROLLBACKS.inc(phase="translate")
+                if translated_adaptors:
+                    logger.info("Starting clean-up on translated files")
+                    self._cleanup(app_id, translated_adaptors)
+
+                logger.info("Adaptor translation wasn't successful...")
+                logger.info("*******************")
+                raise
         logger.info("Adaptors are successfully translated")
 
         return template, dict_object_adaptors
 
-    def _engine(self, adaptors, app_id):
+    def _engine(self, adaptors, app_id, done=()):
         """Engine itself. Creates first an id, then parse the input file. Retreive the list of id created by the translate methods of the adaptors.
         Excute those id in their respective adaptor. Update the app_list and the json file.
+
+        Adaptors in done already executed before a resume. A failed
+        deployment is left as it is, to be resumed, unless
+        ``rollback_on_failure`` is on in main_config.
         """
+        executed_adaptors = {}
         try:
-            self._execute(app_id, adaptors)
-            logger.debug(self.executed_adaptors)
+            self._execute(app_id, adaptors, executed_adaptors, done)
+            logger.debug(executed_adaptors)
 
         except MultiError:
             raise
         except AdaptorCritical:
+            if not self.object_config.main_config.get("rollback_on_failure", False):
+                logger.info(
+                    "******* Critical error during deployment, keeping the "
+                    "executed steps to resume from *********"
+                )
+                raise
             logger.info(
                 "******* Critical error during deployment, starting to roll back *********"
             )
-            if self.executed_adaptors:
+            metrics.ROLLBACKS.inc(phase="execute")
+            if executed_adaptors:
                 logger.info("Starting undeploy on executed components")
-                self._undeploy(self.executed_adaptors)
-            if self.translated_adaptors:
+                self._undeploy(executed_adaptors, app_id)
+            if adaptors:
                 logger.info("Starting clean-up on translated files")
-                self._cleanup(app_id, self.translated_adaptors)
-            if self.app_list:
-                logger.info("Removing application ID from deployment")
-                self.app_list.pop(app_id)
-                self._update_json()
+                self._cleanup(app_id, adaptors)
+            with self._lock:
+                if app_id in self.app_list:
+                    logger.info("Removing application ID from deployment")
+                    self.app_list.pop(app_id)
+            self.state.remove_app(app_id)
 
             logger.info("The deployment wasn't successful...")
             logger.info("*******************")
             raise
+        self._checkpoint(self.state.clear_checkpoint, app_id)
+
+    def _get_template(self, path_to_file, parsed_params=None):
+        """Parses and validates the ADT, or returns it from the cache
+
+        Templates are cached by a hash of the ADT content, its location
+        (for relative imports) and the parsed_params, so validating and
+        then deploying the same ADT only parses it once.
+        """
+        adt = _read_adt(path_to_file)
+        key = _template_key(adt, parsed_params) if adt else None
+        template = self.template_cache.get(key) if key else None
+        if template is not None:
+            logger.info("Using cached template for {}".format(path_to_file))
+            return template
+
+        with _PARSER_LOCK:
+            if adt and not os.path.isfile(path_to_file):
+                template = _parse_downloaded(path_to_file, adt[0], parsed_params)
+            else:
+                template = parser.set_template(path_to_file, parsed_params)
+
+        if key:
+            self.template_cache.put(key, template)
+        return template
+
+    @contextmanager
+    def app_lock(self, app_id):
+        """Serialise operations on one application
+
+        Operations on different applications hold different locks, so
+        they can translate and deploy at the same time.
+        """
+        if not app_id:
+            yield
+            return
+        with self._lock:
+            lock = self._app_locks.setdefault(app_id, threading.RLock())
+        with lock:
+            yield
 
     def _get_adaptors_class(self):
         """Retrieve the list of the adaptors' classes"""
@@ -265,48 +488,122 @@ class SubmitterEngine(object):
                 adaptor_id = adaptor.__name__
             obj = adaptor(
                 adaptor_id,
-                self.object_config.adaptor_config[adaptor.__name__],
+                self._get_adaptor_config(adaptor.__name__, app_id),
                 dry_run,
                 validate,
                 template=template,
             )
+            if app_id:
+                # Status changes from now on are published (see Adaptor)
+                obj._app_id = app_id
+                if getattr(obj, "status", None):
+                    events.BUS.publish(
+                        events.ADAPTOR_STATUS,
+                        app_id,
+                        adaptor=adaptor.__name__,
+                        status=obj.status,
+                    )
             adaptors[adaptor.__name__] = obj
         return adaptors
 
-    def _translate(self, adaptors):
-        """Launch the translate engine"""
+    def _get_adaptor_config(self, adaptor_name, app_id):
+        """Returns the adaptor config, namespaced to the application
+
+        Each application gets its own sub-directory of the output volume,
+        and adaptors that mirror the volume into other containers are given
+        the same sub-directory in ``app_dir``. Applications deployed before
+        namespacing (known, but with no sub-directory) keep the shared
+        volume, where their files are, also when they are updated.
+        """
+        config = self.object_config.adaptor_config[adaptor_name]
+        if not app_id or "volume" not in config:
+            return config
+
+        volume = "{}{}/".format(config["volume"], app_id)
+        if app_id in self.app_list and not os.path.isdir(volume):
+            return config
+        os.makedirs(volume, exist_ok=True)
+        return {**config, "volume": volume, "app_dir": "{}/".format(app_id)}
+
+    def _remove_app_dirs(self, app_id):
+        """Removes the (now empty) output sub-directories of an application"""
+        volumes = {
+            config["volume"]
+            for config in self.object_config.adaptor_config.values()
+            if "volume" in (config or {})
+        }
+        for volume in volumes:
+            try:
+                os.rmdir("{}{}/".format(volume, app_id))
+            except OSError:
+                pass
+
+    def _translate(self, adaptors, translated_adaptors, app_id=None):
+        """Launch the translate engine
+
+        Adaptors only read the template during translation, so with
+        ``concurrent_translate`` set in main_config they all translate at
+        once on the worker pool. Every adaptor gets to finish, errors are
+        logged per adaptor and the first one (in step order) is raised.
+        """
         logger.debug("launch of translate method")
         logger.info("translate method called in all the adaptors")
-        self.translated_adaptors = {}
 
-        for step in self.object_config.step_config["translate"]:
+        def translate_step(step):
             logger.info("translating method call from {}".format(step))
-            while True:
-                try:
-                    self.translated_adaptors[step] = adaptors[step]
-                    adaptors[step].translate()
-                except AdaptorError:
-                    continue
-                break
-
-    def _execute(self, app_id, adaptors):
-        """method called by the engine to launch the adaptors execute methods"""
-        logger.info("launch of the execute methods in each adaptors in a serial way")
-        self.executed_adaptors = {}
+            translated_adaptors[step] = adaptors[step]
+            config = self.object_config.adaptor_config.get(step) or {}
+            policy = RetryPolicy.from_config(step, config.get("retry"))
+            policy.call(adaptors[step].translate, retry_on=AdaptorError)
+
+        if not self.object_config.main_config.get("concurrent_translate"):
+            translate_step = _timed("translate", translate_step, app_id)
+            with _phase("translate", app_id):
+                for step in self.object_config.step_config["translate"]:
+                    translate_step(step)
+            return
+
+        errors = self._run_phase(
+            "translate", translate_step, app_id, independent=True, keep_going=True
+        )
+        for step, error in errors.items():
+            logger.error("translation failed in {}: {}".format(step, error))
+        if errors:
+            raise next(iter(errors.values()))
+
+    def _execute(self, app_id, adaptors, executed_adaptors, done=()):
+        """method called by the engine to launch the adaptors execute methods
+
+        Adaptors in done executed before a resume, so they are skipped
+        """
+        logger.info("launch of the execute methods in each adaptors")
         self.app_list.setdefault(app_id, {}).setdefault("output", {})
-        for step in self.object_config.step_config["execute"]:
-            self.executed_adaptors[step] = adaptors[step]
-            adaptors[step].execute()
-            output = getattr(adaptors[step], "output", None)
-            if output:
-                self.app_list[app_id]["output"].update({step: output})
 
-        self._update_json()
+        def execute_step(step):
+            executed_adaptors[step] = adaptors[step]
+            if step in done:
+                logger.info("{} executed before the resume, skipping".format(step))
+                adaptors[step].status = "Executed (before resume)"
+                return
+            try:
+                adaptors[step].execute()
+            except Exception as error:
+                self._checkpoint(self.state.fail_step, app_id, step, error)
+                raise
+            else:
+                self._checkpoint(self.state.complete_step, app_id, step)
+            finally:
+                self._save_adaptor_state(app_id, step, adaptors[step])
 
-    def _undeploy(self, adaptors):
+        errors = self._run_phase("execute", execute_step, app_id)
+        if errors:
+            raise next(iter(errors.values()))
+
+    def _undeploy(self, adaptors, app_id=None):
         """method called by the engine to launch the adaptor undeploy method of a specific component identified by its ID"""
         logger.info("undeploying component")
-        for step in self.object_config.step_config["undeploy"]:
+
+        def undeploy_step(step):
             try:
                 adaptors[step].undeploy()
             except KeyError as e:
@@ -320,28 +617,164 @@ class SubmitterEngine(object):
                     )
                 )
 
-    def _update(self, adaptors, app_id):
-        """method that will translate first the new component and then see if there's a difference, and then execute"""
+        self._run_phase("undeploy", undeploy_step, app_id, reverse=True)
+
+    def _update(self, adaptors, app_id, steps=None, done=()):
+        """method that will translate first the new component and then see if there's a difference, and then execute
+
+        Only the adaptors in steps are updated, if given (see plan_update),
+        and those in done are skipped, having updated before a resume
+        """
         logger.info("update of each component related to the application wanted")
         self.app_list.setdefault(app_id, {}).setdefault("output", {})
-        for step in self.object_config.step_config["update"]:
-            adaptors[step].update()
-            output = getattr(adaptors[step], "output", None)
-            if output:
-                self.app_list[app_id]["output"].update({step: output})
 
-    def query(self, query, app_id, dry_run=False):
-        """query"""
-        for adaptor in self._instantiate_adaptors(app_id, dry_run).values():
+        def update_step(step):
+            if steps is not None and step not in steps:
+                logger.info("{} is not affected by the update, skipping".format(step))
+                adaptors[step].status = "Unchanged"
+                return
+            if step in done:
+                logger.info("{} updated before the resume, skipping".format(step))
+                adaptors[step].status = "Updated (before resume)"
+                return
             try:
-                result = adaptor.query(query)
-            except AttributeError:
-                continue
+                adaptors[step].update()
+            except Exception as error:
+                self._checkpoint(self.state.fail_step, app_id, step, error)
+                raise
             else:
-                return result
+                self._checkpoint(self.state.complete_step, app_id, step)
+            finally:
+                self._save_adaptor_state(app_id, step, adaptors[step])
+
+        errors = self._run_phase("update", update_step, app_id)
+        if errors:
+            raise next(iter(errors.values()))
+
+    def _start_checkpoint(self, app_id, phase, steps, path_to_file, parsed_params):
+        """Records the start of a phase, with what it takes to resume it"""
+        self._checkpoint(
+            self.state.start_checkpoint,
+            app_id,
+            phase,
+            steps,
+            path_to_file,
+            parsed_params,
+        )
+
+    def _checkpoint(self, write, *args):
+        """Writes a checkpoint, without failing the step if it can't"""
+        try:
+            write(*args)
+        except Exception as e:
+            logger.warning("could not write checkpoint of {}: {}".format(args[0], e))
+
+    def _save_adaptor_state(self, app_id, step, adaptor):
+        """Records the status and output of an adaptor after its step"""
+        output = getattr(adaptor, "output", None)
+        if output:
+            self.app_list[app_id]["output"].update({step: output})
+        try:
+            self.state.save_adaptor(
+                app_id, step, getattr(adaptor, "status", None), output
+            )
+        except Exception as e:
+            logger.warning("could not save state of {}: {}".format(step, e))
+
+    def _run_phase(
+        self,
+        phase,
+        step_fn,
+        app_id=None,
+        reverse=False,
+        keep_going=False,
+        independent=False,
+    ):
+        """Run step_fn on the steps of a phase, following adaptor dependencies
+
+        Independent adaptors run side by side on a pool of
+        ``max_workers`` threads (from main_config). Phases that tear things
+        down pass reverse to walk the dependency graph backwards, and phases
+        with no ordering constraints at all pass independent.
+
+        Returns:
+            dict: exceptions raised by failed steps
+        """
+        dependencies = {} if independent else self._get_dependencies()
+        if reverse:
+            dependencies = reverse_dependencies(dependencies)
+        scheduler = StepScheduler(
+            self.object_config.step_config[phase],
+            dependencies,
+            self.object_config.main_config.get("max_workers", 1),
+        )
+        with _phase(phase, app_id) as failed:
+            errors = scheduler.run(_timed(phase, step_fn, app_id), keep_going)
+            failed.extend(errors)
+        return errors
+
+    def _get_dependencies(self):
+        """Map each adaptor to the adaptors it depends on
+
+        Adaptors declare ``depends_on``, which can be overridden by
+        ``depends_on`` in the adaptor_config of key_config.yml
+        """
+        dependencies = {}
+        for adaptor in self.adaptors_class_name:
+            config = self.object_config.adaptor_config.get(adaptor.__name__) or {}
+            dependencies[adaptor.__name__] = set(
+                config.get("depends_on", adaptor.depends_on)
+            )
+        return dependencies
+
+    def query(self, query, app_id, dry_run=False):
+        """Asks the first adaptor with a query method
+
+        Results are cached for ``ttl`` seconds (``query_cache`` in
+        main_config) and dropped when the application changes.
+        """
+        key = (app_id, query)
+        result = self.query_cache.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+
+        dry_run = self.app_list.get(app_id, {}).get("dry_run", dry_run)
+        for adaptor in self._app_adaptors(app_id, dry_run).values():
+            query_fn = getattr(adaptor, "query", None)
+            if query_fn is None:
+                continue
+            result = query_fn(query)
+            self.query_cache.put(key, result)
+            return result
         else:
             raise AdaptorCritical("No query method available")
 
+    def _app_adaptors(self, app_id, dry_run=False):
+        """The adaptors of an application, reused from call to call
+
+        These are the adaptors of the last launch or update, or for an
+        application deployed before a restart, adaptors built without a
+        template the first time they are needed.
+        """
+        with self._lock:
+            adaptors = self.app_list.get(app_id, {}).get(
+                "adaptors_object"
+            ) or self._idle_adaptors.get(app_id)
+        if adaptors:
+            return adaptors
+
+        adaptors = self._instantiate_adaptors(app_id, dry_run)
+        with self._lock:
+            if app_id not in self.app_list:
+                return adaptors
+            return self._idle_adaptors.setdefault(app_id, adaptors)
+
+    def _forget_adaptors(self, app_id):
+        """Drops the adaptors and query results kept for an application"""
+        with self._lock:
+            self._idle_adaptors.pop(app_id, None)
+        self.query_cache.invalidate(match=lambda key: key[0] == app_id)
+
     def get_status(self, app_id):
         """method to retrieve the status of the differents adaptor"""
         try:
@@ -352,14 +785,15 @@ class SubmitterEngine(object):
         except KeyError:
             logger.error("application id {} doesn't exist".format(app_id))
             raise KeyError
-        return result
+        return result or self.state.get_status(app_id)
 
     def _cleanup(self, id, adaptors):
         """method called by the engine to launch the celanup method of all the components for a specific application
         identified by it's ID, and removing the template from files/templates"""
 
         logger.info("cleaning up the file after undeployment")
-        for step in self.object_config.step_config["cleanup"]:
+
+        def cleanup_step(step):
             try:
                 adaptors[step].cleanup()
             except KeyError as e:
@@ -371,24 +805,111 @@ class SubmitterEngine(object):
                     "error: {}; proceeding to cleanup of the other adaptors".format(e)
                 )
 
-    def _update_json(self):
-        """method called by the engine to update the json file that will contain the dictionary of the IDs of the applications
-        and the list of the IDs of its components link to the ID of the app.
-
-        """
-        data_to_save = dict()
-        if isinstance(self.app_list, dict):
-            for key in self.app_list:
-                data_to_save.setdefault(key, {})
-                if isinstance(self.app_list[key], dict):
-                    for k, v in self.app_list[key].items():
-                        if "components" in k or "outputs" in k or "dry_run" in k:
-                            data_to_save[key].setdefault(k, v)
-        if not data_to_save:
-            logger.debug("data to save is empty")
-            data_to_save = {}
+        self._run_phase("cleanup", cleanup_step, id, reverse=True)
 
+    def _import_json(self):
+        """Imports the applications of a previous ids.json into the store"""
         try:
-            utils.dump_json(data_to_save, JSON_FILE)
-        except Exception as e:
-            logger.warning("{}".format(e))
+            app_list = utils.load_json(JSON_FILE)
+        except FileNotFoundError:
+            logger.debug(
+                "file {} not found, so no previous app loaded".format(JSON_FILE)
+            )
+            return
+        if isinstance(app_list, dict) and app_list:
+            self.state.import_apps(app_list)
+
+
+def _timed(phase, step_fn, app_id=None):
+    """Wraps step_fn to record the duration and failures of each step"""
+
+    def timed_step(step):
+        with metrics.STEP_DURATION.time(adaptor=step, phase=phase):
+            try:
+                return step_fn(step)
+            except Exception as error:
+                metrics.STEP_FAILURES.inc(adaptor=step, phase=phase)
+                events.BUS.publish(
+                    events.ERROR,
+                    app_id,
+                    adaptor=step,
+                    phase=phase,
+                    message=str(error),
+                )
+                raise
+
+    return timed_step
+
+
+@contextmanager
+def _phase(phase, app_id=None):
+    """Times a phase and publishes when it starts and ends
+
+    Yields a list, for phases that carry on past failed steps to add
+    the steps that failed to.
+    """
+    events.BUS.publish(events.PHASE, app_id, phase=phase, state="started")
+    failed = []
+    try:
+        with metrics.PHASE_DURATION.time(phase=phase):
+            yield failed
+    except Exception:
+        events.BUS.publish(events.PHASE, app_id, phase=phase, state="failed")
+        raise
+    state = "failed" if failed else "finished"
+    events.BUS.publish(
+        events.PHASE, app_id, phase=phase, state=state, failed=list(failed)
+    )
+
+
+@contextmanager
+def _published(app_id, state):
+    """Publishes the outcome of an operation on an application"""
+    try:
+        yield
+    except Exception as error:
+        events.BUS.publish(
+            events.APPLICATION, app_id, state="failed", message=str(error)
+        )
+        raise
+    events.BUS.publish(events.APPLICATION, app_id, state=state)
+
+
+def _read_adt(path_to_file):
+    """Returns the content and location of the ADT, or None if it can't be read"""
+    try:
+        if os.path.isfile(path_to_file):
+            with open(path_to_file, "rb") as file:
+                content = file.read()
+            location = os.path.dirname(os.path.abspath(path_to_file))
+        else:
+            with urllib.request.urlopen(path_to_file, timeout=30) as response:
+                content = response.read()
+            location = path_to_file.rsplit("/", 1)[0]
+    except Exception as error:
+        logger.debug("Not caching {}: {}".format(path_to_file, error))
+        return None
+    return content, location
+
+
+def _template_key(adt, parsed_params):
+    """Returns a hash of the ADT, its location and its inputs"""
+    content, location = adt
+    digest = hashlib.sha256(content)
+    digest.update(location.encode())
+    params = json.dumps(parsed_params or {}, sort_keys=True, default=str)
+    digest.update(params.encode())
+    return digest.hexdigest()
+
+
+def _parse_downloaded(url, content, parsed_params):
+    """Parses an ADT already downloaded from url, without fetching it again
+
+    micadoparser copies an ADT read from a URL to a temporary file before
+    parsing it anyway, so parsing a local copy of the content is the same.
+    """
+    suffix = ".csar" if url.endswith(".csar") else ".yaml"
+    with tempfile.NamedTemporaryFile(suffix=suffix) as file:
+        file.write(content)
+        file.flush()
+        return parser.set_template(file.name, parsed_params)
@@ -0,0 +1,301 @@
+"""
+MiCADO Submitter Engine Update Planner
+--------------------------------------
+Works out which adaptors an update to an ADT actually affects
+"""
+import json
+import logging
+from fnmatch import fnmatchcase
+
+from submitter import utils
+
+logger = logging.getLogger("submitter." + __name__)
+
+# Sections of an ADT that only take effect through the nodes and policies
+IGNORED_SECTIONS = ("description", "metadata", "dsl_definitions")
+
+# Policy properties applied to the targeted nodes by the adaptor that
+# orchestrates those nodes (e.g. the instance limits of a virtual machine)
+TARGET_PROPERTIES = ("min_instances", "max_instances")
+
+
+class UpdatePlan:
+    """Which adaptors need updating, and why
+
+    Attributes:
+        adaptors (list): Names of the adaptors to update, in given order
+        skipped (list): Names of the adaptors left untouched
+        reasons (dict): Maps adaptor names to why they need updating
+        nodes (list): Names of the added, removed or modified nodes
+        policies (list): Names of the added, removed or modified policies
+        full (str): Why every adaptor is updated, if that is the case
+    """
+
+    def __init__(self):
+        self.adaptors = []
+        self.skipped = []
+        self.reasons = {}
+        self.nodes = []
+        self.policies = []
+        self.full = None
+
+    def to_dict(self):
+        return {
+            "update": self.adaptors,
+            "skip": self.skipped,
+            "reasons": self.reasons,
+            "changes": {"nodes": self.nodes, "policies": self.policies},
+            "full_update": self.full,
+        }
+
+
+class UpdatePlanner:
+    """Diffs two parsed templates to find the adaptors an update affects
+
+    Every adaptor claims the nodes and policies it translates, by the TOSCA
+    interface of its nodes (``lifecycle``) and by type patterns (``types``
+    in its adaptor_config). An adaptor that claims nothing is always
+    updated, as is every adaptor when a section outside the nodes and
+    policies (inputs, imports, repositories...) changes.
+
+    Args:
+        owners (dict): Maps adaptor names to a (lifecycle, types) tuple
+    """
+
+    def __init__(self, owners):
+        self.owners = owners
+
+    def plan(self, old_template, new_template):
+        """Compares the templates and returns an UpdatePlan"""
+        plan = UpdatePlan()
+        affected = {name: [] for name in self.owners}
+
+        if old_template is None:
+            plan.full = "the previous template is not known"
+        elif _global_fingerprint(old_template) != _global_fingerprint(
+            new_template
+        ):
+            plan.full = "a section outside the nodes and policies changed"
+        else:
+            self._diff_nodes(plan, affected, old_template, new_template)
+            self._diff_policies(plan, affected, old_template, new_template)
+
+        for name, (lifecycle, types) in self.owners.items():
+            if plan.full:
+                affected[name].append(plan.full)
+            elif not lifecycle and not types:
+                affected[name].append("it does not declare what it translates")
+
+            if affected[name]:
+                plan.adaptors.append(name)
+                plan.reasons[name] = affected[name]
+            else:
+                plan.skipped.append(name)
+
+        logger.info(
+            "update plan: updating {}, skipping {}".format(
+                plan.adaptors or "nothing", plan.skipped or "nothing"
+            )
+        )
+        return plan
+
+    def _diff_nodes(self, plan, affected, old_template, new_template):
+        old = {node.name: node for node in old_template.nodetemplates}
+        new = {node.name: node for node in new_template.nodetemplates}
+        changed = {
+            name
+            for name in set(old) | set(new)
+            if name not in old
+            or name not in new
+            or _node_fingerprint(old[name]) != _node_fingerprint(new[name])
+        }
+        plan.nodes = sorted(changed)
+
+        # Nodes built from the changed ones, like containers and their volumes
+        touched = _related_closure(changed, old_template, new_template)
+        for name in sorted(touched):
+            reason = "node {} changed".format(name)
+            if name not in changed:
+                reason = "node {} relates to a changed node".format(name)
+            for node in (old.get(name), new.get(name)):
+                if node is None:
+                    continue
+                for owner in self._node_owners(node):
+                    _add_reason(affected, owner, reason)
+
+                for policy in _policies_targeting(name, old_template, new_template):
+                    for owner in self._type_owners(policy.type):
+                        _add_reason(
+                            affected,
+                            owner,
+                            "policy {} targets changed node {}".format(
+                                policy.name, name
+                            ),
+                        )
+
+    def _diff_policies(self, plan, affected, old_template, new_template):
+        old, new = _policies_by_name(old_template), _policies_by_name(new_template)
+        for name in sorted(set(old) | set(new)):
+            old_policy, new_policy = old.get(name), new.get(name)
+            if old_policy and new_policy:
+                if _policy_fingerprint(old_policy) == _policy_fingerprint(new_policy):
+                    continue
+            plan.policies.append(name)
+            reason = "policy {} changed".format(name)
+
+            for policy in (old_policy, new_policy):
+                if policy is not None:
+                    for owner in self._type_owners(policy.type):
+                        _add_reason(affected, owner, reason)
+
+            if not _changes_targets(old_policy, new_policy):
+                continue
+            for policy in (old_policy, new_policy):
+                for target in getattr(policy, "targets_list", None) or []:
+                    for owner in self._node_owners(target):
+                        _add_reason(affected, owner, reason)
+
+    def _node_owners(self, node):
+        """Names of the adaptors translating this node"""
+        node_types = _type_chain(node)
+        return [
+            name
+            for name, (lifecycle, types) in self.owners.items()
+            if (lifecycle and utils.check_lifecycle(node, lifecycle))
+            or any(_matches(node_type, types) for node_type in node_types)
+        ]
+
+    def _type_owners(self, tosca_type):
+        """Names of the adaptors translating this type"""
+        return [
+            name
+            for name, (_, types) in self.owners.items()
+            if _matches(tosca_type, types)
+        ]
+
+
+def _matches(tosca_type, patterns):
+    """True if the type matches or derives by name from one of the patterns"""
+    return any(
+        tosca_type == pattern
+        or tosca_type.startswith(pattern + ".")
+        or fnmatchcase(tosca_type, pattern)
+        for pattern in patterns or ()
+    )
+
+
+def _add_reason(affected, owner, reason):
+    if reason not in affected[owner]:
+        affected[owner].append(reason)
+
+
+def _type_chain(node):
+    """The type of a node and the types it derives from"""
+    types = [node.type]
+    type_def = getattr(node, "type_definition", None)
+    parent = getattr(type_def, "parent_type", None)
+    while parent is not None:
+        types.append(parent.type)
+        parent = getattr(parent, "parent_type", None)
+    return types
+
+
+def _type_definitions(node):
+    """The definitions of a node type and its parents, to catch type changes"""
+    definitions = []
+    type_def = getattr(node, "type_definition", None)
+    while type_def is not None:
+        definitions.append(getattr(type_def, "defs", None))
+        type_def = getattr(type_def, "parent_type", None)
+    return definitions
+
+
+def _fingerprint(data):
+    return json.dumps(data, sort_keys=True, default=str)
+
+
+def _node_fingerprint(node):
+    return _fingerprint(
+        {
+            "type": node.type,
+            "template": node.entity_tpl,
+            "definitions": _type_definitions(node),
+        }
+    )
+
+
+def _policy_fingerprint(policy):
+    return _fingerprint({"type": policy.type, "template": policy.entity_tpl})
+
+
+def _global_fingerprint(template):
+    """Everything in the ADT other than its nodes and policies"""
+    tpl = dict(getattr(template, "tpl", None) or {})
+    for section in IGNORED_SECTIONS:
+        tpl.pop(section, None)
+    topology = dict(tpl.pop("topology_template", None) or {})
+    topology.pop("node_templates", None)
+    topology.pop("policies", None)
+    topology.pop("description", None)
+    return _fingerprint(
+        {
+            "tpl": tpl,
+            "topology": topology,
+            "params": getattr(template, "parsed_params", None),
+        }
+    )
+
+
+def _related_closure(changed, *templates):
+    """The changed nodes plus every node that relates to one of them"""
+    touched = set(changed)
+    while True:
+        found = {
+            node.name
+            for template in templates
+            for node in template.nodetemplates
+            if node.name not in touched
+            and any(related.name in touched for related in node.related)
+        }
+        if not found:
+            return touched
+        touched |= found
+
+
+def _policies_targeting(node_name, *templates):
+    return [
+        policy
+        for template in templates
+        for policy in template.policies
+        if node_name in [target.name for target in policy.targets_list or []]
+    ]
+
+
+def _policies_by_name(template):
+    """Maps policy names to policies, numbering any repeated names"""
+    policies, seen = {}, {}
+    for policy in template.policies:
+        seen[policy.name] = seen.get(policy.name, 0) + 1
+        name = policy.name
+        if seen[policy.name] > 1:
+            name = "{}[{}]".format(policy.name, seen[policy.name])
+        policies[name] = policy
+    return policies
+
+
+def _changes_targets(old_policy, new_policy):
+    """True if a policy change matters to the adaptors of its targets"""
+    if old_policy is None or new_policy is None:
+        return True
+    if _target_names(old_policy) != _target_names(new_policy):
+        return True
+    old_props = old_policy.entity_tpl.get("properties") or {}
+    new_props = new_policy.entity_tpl.get("properties") or {}
+    return any(
+        _fingerprint(old_props.get(prop)) != _fingerprint(new_props.get(prop))
+        for prop in TARGET_PROPERTIES
+    )
+
+
+def _target_names(policy):
+    return sorted(target.name for target in policy.targets_list or [])
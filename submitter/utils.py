@@ -2,20 +2,17 @@ import random
 import string
 import json
 import logging
-import copy
 import io
+import threading
 
 from ruamel.yaml import YAML, representer
-from kubernetes import config as kubeconfig
-from kubernetes.client.api import core_v1_api
-from kubernetes.client.rest import ApiException
-from kubernetes.stream import stream
 
 from submitter.abstracts.exceptions import AdaptorCritical
 
 logger = logging.getLogger("submitter." + __name__)
 
 api = None
+_kube_lock = threading.Lock()
 
 
 class NonAliasingRTRepresenter(representer.RoundTripRepresenter):
@@ -25,17 +22,34 @@ class NonAliasingRTRepresenter(representer.RoundTripRepresenter):
         return True
 
 
-yaml = YAML()
-yaml.default_flow_style = False
-yaml.preserve_quotes = True
-yaml.Representer = NonAliasingRTRepresenter
+_local = threading.local()
+
+
+def _yaml():
+    """ Get this thread's YAML instance, as ruamel.yaml is not thread-safe """
+    try:
+        return _local.yaml
+    except AttributeError:
+        yaml = YAML()
+        yaml.default_flow_style = False
+        yaml.preserve_quotes = True
+        yaml.Representer = NonAliasingRTRepresenter
+        _local.yaml = yaml
+        return yaml
 
 
 def init_kubernetes():
-    """Initialise kubernetes sdk from kubeconfig"""
+    """Initialise kubernetes sdk from kubeconfig, once per process"""
     global api
-    kubeconfig.load_kube_config()
-    api = core_v1_api.CoreV1Api()
+    with _kube_lock:
+        if api is not None:
+            return
+        # The kubernetes sdk takes most of a second to import
+        from kubernetes import config as kubeconfig
+        from kubernetes.client.api import core_v1_api
+
+        kubeconfig.load_kube_config()
+        api = core_v1_api.CoreV1Api()
 
 
 def get_pod_of_namespaced_deployment(deployment_name, namespace):
@@ -57,6 +71,9 @@ def exec_command_in_deployment(
     deployment_name, command, success=None, namespace="micado-system"
 ):
     """Exec a shell command in the first pod of a deployment, check success"""
+    from kubernetes.client.rest import ApiException
+    from kubernetes.stream import stream
+
     pod_name = get_pod_of_namespaced_deployment(deployment_name, namespace)
     exec_command = ["/bin/sh", "-c"]
     exec_command.append(command)
@@ -81,6 +98,8 @@ def exec_command_in_deployment(
 
 def get_namespaced_secret(secret_name, namespace="micado-system"):
     """Get a secret in a namespace"""
+    from kubernetes.client.rest import ApiException
+
     if not api:
         raise AdaptorCritical("Kube API not initialised!")
     try:
@@ -92,6 +111,8 @@ def get_namespaced_secret(secret_name, namespace="micado-system"):
 
 def patch_namespaced_secret(secret_name, body, namespace="micado-system"):
     """Patch a secret"""
+    from kubernetes.client.rest import ApiException
+
     if not api:
         raise AdaptorCritical("Kube API not initialised!")
     try:
@@ -121,28 +142,35 @@ def dump_order_yaml(data, path=None):
     """ Dump the dictionary to a yaml file """
     if not path:
         buffer = io.StringIO()
-        yaml.dump(data, buffer)
+        _yaml().dump(data, buffer)
         return buffer.getvalue()
 
     with open(path, "w") as file:
-        yaml.dump(data, file)
+        _yaml().dump(data, file)
 
 
 def dump_list_yaml(data, path):
     """ Dump a list of dictionaries to a single yaml file """
 
     with open(path, "w") as file:
-        yaml.dump_all(data, file)
+        _yaml().dump_all(data, file)
+
+
+def get_list_yaml(path):
+    """ Retrieve the list of yaml dictionaries from a multi-document file """
+
+    with open(path, "r") as file:
+        return [data for data in _yaml().load_all(file) if data]
 
 
 def get_yaml_data(path, stream=False):
     """ Retrieve the yaml dictionary form a yaml file and return it """
 
     if stream:
-        return yaml.load(path)
+        return _yaml().load(path)
 
     with open(path, "r") as file:
-        data = yaml.load(file)
+        data = _yaml().load(file)
 
     return data
 
@@ -185,26 +213,51 @@ def get_lifecycle(node, interface_type):
         lifecycle,
         "get_property",
         lambda x: isinstance(x, list),
-        lambda x, y: y.get(x[1]),
+        lambda x, y: copy_data(y.get(x[1])),
         properties,
     )
 
     return lifecycle
 
 
+def get_property_values(node):
+    """Get the values of the node properties, as a copy the caller owns
+
+    Adaptors change these while translating, so they get a copy of the
+    values rather than a deepcopy of the whole NodeTemplate
+
+    Returns:
+        dict: property names and values
+    """
+    return copy_data({k: v.value for k, v in node.get_properties().items()})
+
+
+def copy_data(data):
+    """Copy the dicts and lists of parsed YAML data, sharing the rest
+
+    Much cheaper than copy.deepcopy for the plain data of a template,
+    as there is no memo to keep and scalars are not copied
+    """
+    if isinstance(data, dict):
+        return type(data)((key, copy_data(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return [copy_data(item) for item in data]
+    return data
+
+
 def _get_parent_interfaces(node, interface_type):
     interfaces = {}
     try:
         parent_interfaces = node.type_definition.interfaces[interface_type]
-        parent_interfaces = copy.deepcopy(parent_interfaces)
     except (AttributeError, KeyError, TypeError):
         parent_interfaces = {}
 
+    # Only the inputs are copied, as they are all get_lifecycle changes
     for stage, value in parent_interfaces.items():
         if stage == "type":
             continue
         try:
-            interfaces[stage] = value.get("inputs") or {}
+            interfaces[stage] = copy_data(value.get("inputs") or {})
         except AttributeError:
             interfaces[stage] = {}
 
@@ -216,12 +269,14 @@ def _update_parent_spec(lifecycle, stage):
     if not stage.inputs:
         return
 
+    # Copied, so the template keeps its own inputs
+    inputs = copy_data(stage.inputs)
     try:
-        lifecycle[stage.name]["spec"].update(stage.inputs["spec"])
-        stage.inputs["spec"] = lifecycle[stage.name]["spec"]
+        lifecycle[stage.name]["spec"].update(inputs["spec"])
+        inputs["spec"] = lifecycle[stage.name]["spec"]
     except KeyError:
         pass
-    lifecycle[stage.name].update(stage.inputs)
+    lifecycle[stage.name].update(inputs)
 
 
 def get_cloud_type(node, supported_clouds):
@@ -0,0 +1,143 @@
+"""
+MiCADO Submitter Engine Validation Pool
+---------------------------------------
+Validates ADTs in worker processes, so parsing and translating them does
+not hold the GIL or grow the heap of the engine process
+"""
+import logging
+import multiprocessing
+import threading
+import time
+
+logger = logging.getLogger("submitter." + __name__)
+
+# The engine of each worker process, built on its first validation
+_worker_engine = None
+
+
+class PoolBusy(Exception):
+    """Every worker is busy and the queue is full"""
+
+
+class ValidationTimeout(Exception):
+    """A validation did not finish in time"""
+
+
+class ValidationPool:
+    """A pool of processes validating ADTs
+
+    Workers are spawned rather than forked, so they start from a clean
+    interpreter instead of a copy of the engine, and each one is replaced
+    after max_tasks validations to give its memory back. Up to
+    queue_size validations wait for a free worker, any more are turned
+    away with PoolBusy. A validation still unfinished after timeout
+    seconds (counted from when it was queued) raises ValidationTimeout,
+    and the pool is restarted to stop the worker running it.
+
+    Args:
+        workers (int, optional): Worker processes. Defaults to 2.
+        queue_size (int, optional): Validations waiting for a worker.
+            Defaults to 8.
+        timeout (float, optional): Seconds a validation may take.
+            Defaults to 120.
+        max_tasks (int, optional): Validations per worker before it is
+            replaced. Defaults to 50.
+        target (callable, optional): Module-level function run by the
+            workers. Defaults to validate_adt.
+    """
+
+    def __init__(
+        self, workers=2, queue_size=8, timeout=120, max_tasks=50, target=None
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+        self.target = target or validate_adt
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def validate(self, *args):
+        """Runs the target with args on a worker and returns its result
+
+        Raises:
+            PoolBusy: If the queue is full
+            ValidationTimeout: If the validation took longer than timeout
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusy("Too many validations queued, try again later")
+        try:
+            return self._run(args)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Stops the workers, waiting for running validations to finish"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    def _run(self, args):
+        pool = self._get_pool()
+        result = pool.apply_async(self.target, args)
+        deadline = time.monotonic() + self.timeout
+        while not result.ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._restart(pool)
+                raise ValidationTimeout(
+                    "Validation took longer than {}s".format(self.timeout)
+                )
+            if self._pool is not pool:
+                raise ValidationTimeout(
+                    "Validation stopped, the worker pool was restarted"
+                )
+            result.wait(min(remaining, 1))
+        return result.get()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                logger.debug("starting {} validation workers".format(self.workers))
+                self._pool = self._context.Pool(
+                    self.workers, maxtasksperchild=self.max_tasks
+                )
+            return self._pool
+
+    def _restart(self, pool):
+        """Terminates a pool stuck on a validation, once"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        logger.warning("validation timed out, restarting the worker pool")
+        pool.terminate()
+        pool.join()
+
+
+def validate_adt(path_to_file, parsed_params=None):
+    """Validates an ADT in a worker process
+
+    Parses the ADT and has the adaptors translate it without writing
+    anything, like SubmitterEngine._validate with validate set.
+
+    Returns:
+        dict: valid, and the error if the ADT is not valid
+    """
+    global _worker_engine
+    if _worker_engine is None:
+        from submitter.submitter_engine import SubmitterEngine
+
+        _worker_engine = SubmitterEngine(load_state=False)
+
+    try:
+        _worker_engine._validate(
+            path_to_file, validate=True, parsed_params=parsed_params
+        )
+    except Exception as error:
+        # Exceptions of the parsers do not all survive pickling
+        return {"valid": False, "error": str(error)}
+    return {"valid": True, "error": None}
@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from micadoparser.parser import set_template
+
+from benchmarks import adt_generator
+from submitter import utils
+
+
+class TestADTGenerator(unittest.TestCase):
+    """UnitTests for the synthetic ADT generator"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        shutil.copytree("tests/templates", self.work_dir, dirs_exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def _parse(self, adt):
+        path = Path(self.work_dir) / "generated.yaml"
+        utils.dump_order_yaml(adt, str(path))
+        return set_template(str(path), {})
+
+    def test_generated_adt_parses(self):
+        adt = adt_generator.generate(
+            services=12, hosts=3, volumes=2, configs=1, fan_out=4
+        )
+        template = self._parse(adt)
+        nodes = {node.name: node for node in template.nodetemplates}
+        # 12 services, 3 hosts, 12 * 2 / 4 volumes, 12 / 4 configs
+        self.assertEqual(len(nodes), 12 + 3 + 6 + 3)
+        self.assertEqual(
+            [rel.name for rel in nodes["service-5"].related],
+            ["host-2", "volume-1", "volume-4", "config-1"],
+        )
+
+    def test_sidecars_make_pods(self):
+        template = self._parse(adt_generator.generate(services=2, sidecars=2))
+        pod = [n for n in template.nodetemplates if n.name == "service-1"][0]
+        self.assertEqual(pod.type, adt_generator.POD)
+        self.assertEqual(len(template.nodetemplates), 1 + 2 * 4)
+
+    def test_policy_density(self):
+        def scaling_policies(density):
+            adt = adt_generator.generate(services=50, policy_density=density)
+            policies = adt["topology_template"]["policies"]
+            return [p for p in policies if list(p)[0].startswith("scale-service")]
+
+        self.assertEqual(len(scaling_policies(0)), 0)
+        self.assertEqual(len(scaling_policies(1)), 50)
+        self.assertEqual(scaling_policies(0.5), scaling_policies(0.5))
+
+    def test_occopus_hosts(self):
+        template = self._parse(adt_generator.generate(orchestrator="occopus"))
+        host = [n for n in template.nodetemplates if n.name == "host-0"][0]
+        self.assertTrue(utils.check_lifecycle(host, "Occopus"))
@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+
+from micadoparser.parser import set_template
+from benchmarks import startup, translate
+
+
+class TestTranslateBenchmark(unittest.TestCase):
+    """UnitTests for the translation benchmark helpers"""
+
+    def test_compare_flags_regressions(self):
+        baseline = {"tosca": {"validate": {"parse": {"wall": 1.0, "peak_kib": 100}}}}
+        results = {"tosca": {"validate": {"parse": {"wall": 1.5, "peak_kib": 110}}}}
+        self.assertListEqual(
+            translate.compare(results, baseline, tolerance=0.25),
+            ["tosca/validate/parse/wall: 1 -> 1.5 (+50%)"],
+        )
+        self.assertListEqual(translate.compare(results, baseline, tolerance=0.6), [])
+
+    def test_small_changes_are_noise(self):
+        baseline = {"edge": {"parse": {"wall": 0.001}}}
+        results = {"edge": {"parse": {"wall": 0.002}}}
+        self.assertListEqual(translate.compare(results, baseline), [])
+
+    def test_scaled_adt_parses(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            cases = translate.default_cases([3], work_dir)
+            template = set_template(str(cases["edge-x3"]), {})
+        names = [node.name for node in template.nodetemplates]
+        self.assertIn("redis-2", names)
+
+
+class TestStartupBenchmark(unittest.TestCase):
+    """UnitTests for the startup benchmark"""
+
+    def test_parse_importtime(self):
+        report = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     json.decoder\n"
+            "import time:      2500 |       2620 |   json\n"
+        )
+        self.assertDictEqual(
+            startup.parse_importtime(report),
+            {"json.decoder": (0.00012, 0.00012), "json": (0.0025, 0.00262)},
+        )
+
+    def test_api_defers_heavy_imports(self):
+        result = startup.run(repeat=1)
+        self.assertListEqual(result["deferred"], [])
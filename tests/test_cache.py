@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+
+from submitter import metrics
+from submitter.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """UnitTests for the LRU cache"""
+
+    def test_hit_and_miss_counters(self):
+        cache = LRUCache()
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertDictEqual(
+            cache.stats(), {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+        )
+
+    def test_named_cache_publishes_metrics(self):
+        lookups = metrics.CACHE_LOOKUPS
+        hits = lookups.get(cache="test", result="hit")
+        misses = lookups.get(cache="test", result="miss")
+        evictions = metrics.CACHE_EVICTIONS.get(cache="test")
+        cache = LRUCache(maxsize=1, name="test")
+        cache.put("a", 1)
+        cache.get("a")
+        cache.put("b", 2)
+        cache.get("a")
+        self.assertEqual(lookups.get(cache="test", result="hit"), hits + 1)
+        self.assertEqual(lookups.get(cache="test", result="miss"), misses + 1)
+        self.assertEqual(metrics.CACHE_EVICTIONS.get(cache="test"), evictions + 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        cache = LRUCache(ttl=10)
+        with mock.patch("submitter.cache.time.monotonic", return_value=100):
+            cache.put("a", 1)
+        with mock.patch("submitter.cache.time.monotonic", return_value=105):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("submitter.cache.time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_zero_size_disables_cache(self):
+        cache = LRUCache(maxsize=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        for key in ("app1/a", "app1/b", "app2/a"):
+            cache.put(key, key)
+        cache.invalidate("app2/a")
+        self.assertEqual(len(cache), 2)
+        cache.invalidate(match=lambda key: key.startswith("app1/"))
+        self.assertEqual(len(cache), 0)
@@ -1,6 +1,15 @@
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
 from submitter import submitter_engine
+from submitter.abstracts.exceptions import (
+    AdaptorCritical,
+    AdaptorError,
+    TranslateError,
+)
 from submitter.abstracts import base_adaptor as abco
 
 
@@ -19,3 +28,243 @@ class TestEngine(unittest.TestCase):
         self.assertTrue(
             all([issubclass(x, abco.Adaptor) for x in self.engine._get_adaptors_class()])
         )
+
+    def test_concurrent_translate_runs_every_adaptor(self):
+        self.engine.object_config.main_config["concurrent_translate"] = True
+        steps = self.engine.object_config.step_config["translate"]
+        adaptors = {step: mock.Mock() for step in steps}
+        adaptors[steps[0]].translate.side_effect = TranslateError("bad node")
+
+        translated = {}
+        with self.assertRaises(TranslateError):
+            self.engine._translate(adaptors, translated)
+        for adaptor in adaptors.values():
+            adaptor.translate.assert_called_once()
+        self.assertListEqual(sorted(translated), sorted(steps))
+
+    def test_translate_retries_adaptor_errors(self):
+        self.engine.object_config.main_config["concurrent_translate"] = False
+        steps = self.engine.object_config.step_config["translate"]
+        adaptors = {step: mock.Mock() for step in steps}
+        adaptors[steps[0]].translate.side_effect = [AdaptorError, None]
+        adaptors[steps[1]].translate.side_effect = AdaptorError("hopeless")
+
+        with mock.patch("submitter.retry.time.sleep"):
+            with self.assertRaisesRegex(AdaptorError, "hopeless"):
+                self.engine._translate(adaptors, {})
+        self.assertEqual(adaptors[steps[0]].translate.call_count, 2)
+        self.assertEqual(adaptors[steps[1]].translate.call_count, 5)
+
+    def test_adaptor_config_namespaced_per_app(self):
+        with tempfile.TemporaryDirectory() as volume:
+            config = {"volume": volume + "/"}
+            self.engine.object_config.adaptor_config["TestAdaptor"] = config
+            app_config = self.engine._get_adaptor_config("TestAdaptor", "my-app")
+            self.assertEqual(app_config["volume"], volume + "/my-app/")
+            self.assertEqual(app_config["app_dir"], "my-app/")
+            self.assertEqual(config["volume"], volume + "/")
+
+            self.engine._remove_app_dirs("my-app")
+            self.engine.app_list["my-app"] = {"dry_run": True}
+            try:
+                old_config = self.engine._get_adaptor_config("TestAdaptor", "my-app")
+            finally:
+                self.engine.app_list.pop("my-app")
+            self.assertIs(old_config, config)
+
+    def test_update_keeps_shared_volume_of_old_apps(self):
+        with tempfile.TemporaryDirectory() as volume:
+            config = {"volume": volume + "/"}
+            self.engine.object_config.adaptor_config["TestAdaptor"] = config
+            self.engine.app_list["old-app"] = {"dry_run": True}
+            self.addCleanup(self.engine.app_list.pop, "old-app")
+            adaptor = mock.Mock(__name__="TestAdaptor")
+            self.engine.adaptors_class_name = [adaptor]
+
+            self.engine._instantiate_adaptors("old-app", True, True, mock.Mock())
+
+            self.assertIs(adaptor.call_args[0][1], config)
+            self.assertFalse(os.path.exists(volume + "/old-app"))
+
+    def test_ids_json_imported_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = os.path.join(tmp, "ids.json")
+            with open(json_file, "w") as file:
+                file.write('{"old": {"components": [], "dry_run": true}}')
+            with mock.patch.object(
+                submitter_engine, "JSON_FILE", json_file
+            ), mock.patch.object(
+                submitter_engine, "STATE_DB", os.path.join(tmp, "state.db")
+            ):
+                engine = submitter_engine.SubmitterEngine()
+                self.assertListEqual(list(engine.app_list), ["old"])
+                engine.undeploy("old")
+                engine.state.close()
+
+                engine = submitter_engine.SubmitterEngine()
+                self.assertDictEqual(engine.app_list, {})
+                engine.state.close()
+
+    def test_template_parsed_once(self):
+        path = "tests/templates/tosca.yaml"
+        self.engine.template_cache.invalidate()
+        with mock.patch.object(submitter_engine.parser, "set_template") as parse:
+            first = self.engine._get_template(path, {"inputs": {"a": 1}})
+            second = self.engine._get_template(path, {"inputs": {"a": 1}})
+            self.engine._get_template(path, {"inputs": {"a": 2}})
+        self.assertIs(first, second)
+        self.assertEqual(parse.call_count, 2)
+
+    def test_url_template_downloaded_once(self):
+        url = "https://example.com/adts/tosca.yaml"
+        with open("tests/templates/tosca.yaml", "rb") as file:
+            content = file.read()
+        response = mock.MagicMock()
+        response.__enter__.return_value.read.return_value = content
+        self.engine.template_cache.invalidate()
+
+        def parse(path, parsed_params):
+            with open(path, "rb") as file:
+                self.assertEqual(file.read(), content)
+
+        with mock.patch.object(
+            submitter_engine.urllib.request, "urlopen", return_value=response
+        ) as urlopen, mock.patch.object(
+            submitter_engine.parser, "set_template", side_effect=parse
+        ) as set_template:
+            self.engine._get_template(url)
+        urlopen.assert_called_once()
+        self.assertNotEqual(set_template.call_args[0][0], url)
+
+    def test_phase_metrics(self):
+        def step_fn(step):
+            if step == "PkAdaptor":
+                raise RuntimeError("failed")
+
+        before = submitter_engine.metrics.STEP_FAILURES.get(
+            adaptor="PkAdaptor", phase="update"
+        )
+        self.engine._run_phase("update", step_fn, keep_going=True)
+        self.assertEqual(
+            submitter_engine.metrics.STEP_FAILURES.get(
+                adaptor="PkAdaptor", phase="update"
+            ),
+            before + 1,
+        )
+        self.assertGreater(
+            submitter_engine.metrics.PHASE_DURATION.get_count(phase="update"), 0
+        )
+
+    def test_phase_events(self):
+        def step_fn(step):
+            if step == "PkAdaptor":
+                raise RuntimeError("failed")
+
+        last_id = submitter_engine.events.BUS.last_id
+        self.engine._run_phase("update", step_fn, "events_app", keep_going=True)
+        found = submitter_engine.events.BUS.since(last_id, "events_app")
+        self.assertEqual(found[0].data, {"phase": "update", "state": "started"})
+        self.assertIn(
+            {"adaptor": "PkAdaptor", "phase": "update", "message": "failed"},
+            [event.data for event in found],
+        )
+        self.assertEqual(
+            found[-1].data,
+            {"phase": "update", "state": "failed", "failed": ["PkAdaptor"]},
+        )
+
+    def test_query_reuses_adaptors_and_caches(self):
+        adaptor = mock.Mock()
+        adaptor.query.return_value = ["frontend"]
+        self.engine.app_list["query_app"] = {"components": ["A"], "dry_run": True}
+        with mock.patch.object(
+            self.engine, "_instantiate_adaptors", return_value={"A": adaptor}
+        ) as instantiate:
+            self.assertEqual(self.engine.query("services", "query_app"), ["frontend"])
+            self.assertEqual(self.engine.query("services", "query_app"), ["frontend"])
+            instantiate.assert_called_once()
+            adaptor.query.assert_called_once()
+
+            self.engine._forget_adaptors("query_app")
+            self.engine.query("services", "query_app")
+            self.assertEqual(instantiate.call_count, 2)
+            self.assertEqual(adaptor.query.call_count, 2)
+        self.engine.app_list.pop("query_app")
+
+    def test_one_application_at_a_time(self):
+        adaptors = {step: mock.Mock() for step in self.engine.adaptors_class_name}
+        with self.assertRaisesRegex(Exception, "already running"):
+            self.engine.launch(mock.Mock(), adaptors, "second_app", True)
+        self.assertNotIn("second_app", self.engine.app_list)
+
+    def test_resume_runs_unfinished_steps(self):
+        # Only one application can run at a time
+        self.engine.app_list = {}
+        main_config = self.engine.object_config.main_config
+        main_config["max_workers"] = 1
+        steps = self.engine.object_config.step_config["execute"]
+        adaptors = {step: mock.Mock(output=None) for step in steps}
+        adaptors[steps[1]].execute.side_effect = AdaptorCritical("cloud down")
+        template = mock.Mock()
+        path = "tests/templates/edge.yaml"
+        try:
+            with self.assertRaises(AdaptorCritical):
+                self.engine.launch(template, adaptors, "resume_app", True, path, {})
+            checkpoint = self.engine.state.get_checkpoint("resume_app")
+            self.assertEqual(checkpoint["source"], path)
+            self.assertListEqual(checkpoint["completed"], steps[:1])
+            self.assertEqual(checkpoint["failed"], steps[1])
+
+            adaptors[steps[1]].execute.side_effect = None
+            for adaptor in adaptors.values():
+                adaptor.execute.reset_mock()
+            with mock.patch.object(
+                self.engine, "_get_template", return_value=template
+            ), mock.patch.object(
+                self.engine, "_instantiate_adaptors", return_value=adaptors
+            ):
+                self.engine.resume("resume_app")
+            adaptors[steps[0]].execute.assert_not_called()
+            for step in steps[1:]:
+                adaptors[step].execute.assert_called_once()
+            self.assertIsNone(self.engine.state.get_checkpoint("resume_app"))
+        finally:
+            self.engine.app_list.pop("resume_app", None)
+            self.engine.state.remove_app("resume_app")
+
+    def test_resume_update_diffs_against_deployed(self):
+        self.engine.app_list = {}
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        shutil.copytree("tests/templates", work_dir.name, dirs_exist_ok=True)
+        adaptor_config = self.engine.object_config.adaptor_config
+        volume = os.path.join(work_dir.name, "output") + "/"
+        os.mkdir(volume)
+        configs = {
+            name: dict(config, volume=volume)
+            for name, config in adaptor_config.items()
+            if config and "volume" in config
+        }
+        path = os.path.join(work_dir.name, "edge.yaml")
+        updated = os.path.join(work_dir.name, "edge-updated.yaml")
+        with open(path) as file, open(updated, "w") as new_file:
+            new_file.write(file.read().replace("image: redis", "image: redis:7"))
+
+        with mock.patch.dict(adaptor_config, configs):
+            template, adaptors = self.engine._validate(
+                path, True, False, "resume_update", {}
+            )
+            self.engine.launch(template, adaptors, "resume_update", True, path, {})
+            try:
+                # An update that stopped before KubernetesAdaptor updated
+                self.engine.state.start_checkpoint(
+                    "resume_update", "update", ["KubernetesAdaptor"], updated, {}
+                )
+                self.engine.resume("resume_update")
+                app = self.engine.app_list["resume_update"]
+                kubernetes = app["adaptors_object"]["KubernetesAdaptor"]
+                self.assertEqual(kubernetes.status, "DRY-RUN Deployment")
+                with open(kubernetes.manifest_path) as file:
+                    self.assertIn("redis:7", file.read())
+            finally:
+                self.engine.undeploy("resume_update")
@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from submitter import events
+from submitter.abstracts import Adaptor
+
+
+class StatusAdaptor(Adaptor):
+    def __init__(self):
+        self.status = "init"
+
+    translate = execute = undeploy = cleanup = update = lambda self: None
+
+
+class TestEventBus(unittest.TestCase):
+    """UnitTests for the event bus"""
+
+    def setUp(self):
+        self.bus = events.EventBus(history=3)
+
+    def test_since(self):
+        self.bus.publish(events.PHASE, "app1", phase="execute", state="started")
+        self.bus.publish(events.PHASE, "app2", phase="execute", state="started")
+        self.assertListEqual([e.id for e in self.bus.since()], [1, 2])
+        self.assertListEqual([e.id for e in self.bus.since(1)], [2])
+        self.assertListEqual([e.id for e in self.bus.since(0, "app1")], [1])
+        self.assertListEqual(self.bus.since(2), [])
+
+    def test_history_and_restart(self):
+        for _ in range(5):
+            self.bus.publish(events.ERROR, "app")
+        self.assertListEqual([e.id for e in self.bus.since()], [3, 4, 5])
+        self.assertListEqual([e.id for e in self.bus.since(100)], [3, 4, 5])
+
+    def test_wait(self):
+        start = time.monotonic()
+        self.assertListEqual(self.bus.wait(0, timeout=0.05), [])
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+        timer = threading.Timer(0.05, self.bus.publish, (events.APPLICATION, "a"))
+        timer.start()
+        found = self.bus.wait(0, "a", timeout=5)
+        timer.join()
+        self.assertEqual(found[0].kind, events.APPLICATION)
+
+    def test_sse(self):
+        event = self.bus.publish(events.ADAPTOR_STATUS, "app", status="Executed")
+        message = event.to_sse()
+        self.assertTrue(message.startswith("id: 1\nevent: adaptor_status\ndata: {"))
+        self.assertTrue(message.endswith('"status": "Executed"}\n\n'))
+
+    def test_adaptor_status_published(self):
+        adaptor = StatusAdaptor()
+        last_id = events.BUS.last_id
+        adaptor._app_id = "status-app"
+        adaptor.status = "Executed"
+        adaptor.status = "Executed"
+        adaptor.output = {}
+        found = events.BUS.since(last_id, "status-app")
+        self.assertEqual(len(found), 1)
+        self.assertDictEqual(
+            found[0].data, {"adaptor": "StatusAdaptor", "status": "Executed"}
+        )
@@ -0,0 +1,84 @@
+import io
+import tempfile
+import unittest
+import urllib.error
+from email.message import Message
+from unittest import mock
+
+from submitter import import_resolver
+from submitter.import_resolver import ImportResolver
+
+URL = "https://example.com/micado_types.yaml"
+TYPES = b"tosca_definitions_version: tosca_simple_yaml_1_3\n"
+
+
+def _response(content, etag='"v1"'):
+    response = mock.MagicMock()
+    response.__enter__.return_value = response
+    response.read.return_value = content
+    response.headers = {"ETag": etag}
+    return response
+
+
+def _not_modified(request, timeout=None):
+    raise urllib.error.HTTPError(URL, 304, "Not Modified", Message(), io.BytesIO())
+
+
+class TestImportResolver(unittest.TestCase):
+    """UnitTests for the cached TOSCA import resolver"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.resolver = ImportResolver(self.tmp.name)
+        patcher = mock.patch.object(import_resolver.urllib.request, "urlopen")
+        self.urlopen = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_fresh_entry_served_from_disk(self):
+        self.urlopen.return_value = _response(TYPES)
+        self.assertEqual(self.resolver.fetch(URL), TYPES)
+        self.assertEqual(self.resolver.fetch(URL), TYPES)
+        self.assertEqual(self.urlopen.call_count, 1)
+
+    def test_stale_entry_revalidated(self):
+        self.urlopen.return_value = _response(TYPES)
+        self.resolver.fetch(URL)
+        self.resolver.max_age = 0
+
+        self.urlopen.side_effect = _not_modified
+        self.assertEqual(self.resolver.fetch(URL), TYPES)
+        request = self.urlopen.call_args[0][0]
+        self.assertEqual(request.get_header("If-none-match"), '"v1"')
+
+    def test_stale_entry_served_when_unreachable(self):
+        self.urlopen.return_value = _response(TYPES)
+        self.resolver.fetch(URL)
+        self.resolver.max_age = 0
+
+        self.urlopen.side_effect = urllib.error.URLError("no route")
+        self.assertEqual(self.resolver.fetch(URL), TYPES)
+
+    def test_offline_serves_only_cache(self):
+        self.urlopen.return_value = _response(TYPES)
+        self.resolver.fetch(URL)
+
+        offline = ImportResolver(self.tmp.name, max_age=0, offline=True)
+        self.assertEqual(offline.fetch(URL), TYPES)
+        with self.assertRaises(urllib.error.URLError):
+            offline.fetch("https://example.com/other.yaml")
+        self.assertEqual(self.urlopen.call_count, 1)
+
+    def test_mirror(self):
+        with open(self.tmp.name + "/types.yaml", "wb") as file:
+            file.write(TYPES)
+        self.resolver.mirrors = {"https://example.com/": self.tmp.name}
+        self.assertEqual(self.resolver.fetch("https://example.com/types.yaml"), TYPES)
+        self.urlopen.assert_not_called()
+
+    def test_load_yaml(self):
+        self.urlopen.return_value = _response(TYPES)
+        self.resolver.install()
+        self.addCleanup(self.resolver.uninstall)
+        tpl = import_resolver.imports.YAML_LOADER(URL, False)
+        self.assertEqual(tpl["tosca_definitions_version"], "tosca_simple_yaml_1_3")
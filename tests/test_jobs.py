@@ -0,0 +1,52 @@
+import threading
+import unittest
+
+from submitter.apis.jobs import JobManager
+
+
+class TestJobManager(unittest.TestCase):
+    """UnitTests for the background job manager"""
+
+    def setUp(self):
+        self.jobs = JobManager(history=2)
+
+    def _wait(self, job):
+        for _ in range(100):
+            if job.done:
+                return
+            threading.Event().wait(0.05)
+        self.fail("job did not finish")
+
+    def test_job_succeeds(self):
+        job = self.jobs.submit("app", "create", lambda job: {"message": "ok"})
+        self._wait(job)
+        self.assertEqual(job.status, "succeeded")
+        self.assertDictEqual(job.result, {"message": "ok"})
+        self.assertIsNotNone(job.finished)
+
+    def test_job_failure_is_recorded(self):
+        def fail(job):
+            job.phase = "deploying"
+            raise RuntimeError("kaboom")
+
+        job = self.jobs.submit("app", "create", fail)
+        self._wait(job)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "kaboom")
+
+    def test_pending_jobs(self):
+        release = threading.Event()
+        job = self.jobs.submit("app", "update", lambda job: release.wait(5))
+        self.assertListEqual(self.jobs.pending("app"), [job])
+        self.assertListEqual(self.jobs.pending("other"), [])
+        release.set()
+        self._wait(job)
+        self.assertListEqual(self.jobs.pending("app"), [])
+
+    def test_history_is_bounded(self):
+        jobs = [self.jobs.submit("app", "create", lambda job: None) for _ in range(4)]
+        for job in jobs:
+            self._wait(job)
+        self.jobs.submit("app", "create", lambda job: None)
+        self.assertIsNone(self.jobs.get(jobs[0].id))
+        self.assertIsNotNone(self.jobs.get(jobs[-1].id))
@@ -0,0 +1,476 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from kubernetes import client
+
+from submitter import utils
+from submitter.adaptors.k8s_adaptor import apply
+from submitter.adaptors.k8s_adaptor.diff import ManifestDiff
+from submitter.adaptors.k8s_adaptor.k8s_adaptor import KubernetesAdaptor
+
+# group/version: [(plural, kind, namespaced)]
+RESOURCES = {
+    "v1": [
+        ("namespaces", "Namespace", False),
+        ("nodes", "Node", False),
+        ("persistentvolumes", "PersistentVolume", False),
+        ("configmaps", "ConfigMap", True),
+        ("endpoints", "Endpoints", True),
+        ("persistentvolumeclaims", "PersistentVolumeClaim", True),
+        ("pods", "Pod", True),
+        ("replicationcontrollers", "ReplicationController", True),
+        ("secrets", "Secret", True),
+        ("services", "Service", True),
+    ],
+    "apps/v1": [
+        ("daemonsets", "DaemonSet", True),
+        ("deployments", "Deployment", True),
+        ("replicasets", "ReplicaSet", True),
+        ("statefulsets", "StatefulSet", True),
+    ],
+    "batch/v1": [("jobs", "Job", True), ("cronjobs", "CronJob", True)],
+    "networking.k8s.io/v1": [("ingresses", "Ingress", True)],
+}
+
+
+class FakeKubernetes(ThreadingHTTPServer):
+    """Just enough of the Kubernetes API for discovery, server-side
+    apply, get, list, delete and deleting collections of nodes"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeHandler)
+        self.objects = {}
+        self.applied = []
+        self.connections = set()
+        self.requests = []
+        self.reject = {}
+        self.lock = threading.Lock()
+
+    @property
+    def host(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    def add(self, group_version, plural, namespace, obj):
+        key = (group_version, plural, namespace, obj["metadata"]["name"])
+        self.objects[key] = obj
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path, query = self._parse()
+        discovery = self._discovery(path)
+        if discovery is not None:
+            return self._reply(200, discovery)
+
+        group_version, plural, namespace, name = self._locate(path)
+        with self.server.lock:
+            if name:
+                obj = self.server.objects.get((group_version, plural, namespace, name))
+                if obj is None:
+                    return self._not_found(name)
+                return self._reply(200, obj)
+            items = [
+                obj
+                for (gv, kind, ns, _), obj in self.server.objects.items()
+                if gv == group_version
+                and kind == plural
+                and namespace in (None, ns)
+                and _selected(obj, query.get("labelSelector", [""])[0])
+            ]
+        self._reply(200, {"kind": "List", "items": items})
+
+    def do_PATCH(self):
+        path, query = self._parse()
+        assert self.headers["Content-Type"] == "application/apply-patch+yaml"
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        key = self._locate(path)
+        name = key[-1]
+        if name in self.server.reject:
+            return self._reply(
+                422,
+                {"kind": "Status", "code": 422, "message": self.server.reject[name]},
+            )
+        body["metadata"]["managedFields"] = [
+            {"manager": query["fieldManager"][0], "operation": "Apply"}
+        ]
+        with self.server.lock:
+            self.server.objects[key] = body
+            self.server.applied.append((body["kind"], name, query["force"][0]))
+        self._reply(200, body)
+
+    def do_DELETE(self):
+        path, query = self._parse()
+        group_version, plural, namespace, name = self._locate(path)
+        with self.server.lock:
+            if not name:
+                selector = query.get("labelSelector", [""])[0]
+                for key, obj in list(self.server.objects.items()):
+                    if key[:2] == (group_version, plural) and _selected(obj, selector):
+                        del self.server.objects[key]
+                return self._reply(200, {"kind": "Status", "status": "Success"})
+            key = (group_version, plural, namespace, name)
+            obj = self.server.objects.pop(key, None)
+        if obj is None:
+            return self._not_found(name)
+        self._reply(200, {"kind": "Status", "status": "Success"})
+
+    def _parse(self):
+        self.server.connections.add(self.client_address)
+        url = urlparse(self.path)
+        self.server.requests.append((self.command, url.path))
+        return url.path, parse_qs(url.query)
+
+    def _discovery(self, path):
+        if path == "/version":
+            return {"major": "1", "minor": "25", "gitVersion": "v1.25.0"}
+        if path == "/api":
+            return {"kind": "APIVersions", "versions": ["v1"]}
+        if path == "/apis":
+            groups = []
+            for group_version in RESOURCES:
+                if "/" not in group_version:
+                    continue
+                version = {
+                    "groupVersion": group_version,
+                    "version": group_version.split("/")[1],
+                }
+                groups.append(
+                    {
+                        "name": group_version.split("/")[0],
+                        "versions": [version],
+                        "preferredVersion": version,
+                    }
+                )
+            return {"kind": "APIGroupList", "groups": groups}
+        group_version = path.split("/", 2)[-1]
+        if path.startswith(("/api/", "/apis/")) and group_version in RESOURCES:
+            return {
+                "kind": "APIResourceList",
+                "groupVersion": group_version,
+                "resources": [
+                    {
+                        "name": plural,
+                        "singularName": plural[:-1],
+                        "namespaced": namespaced,
+                        "kind": kind,
+                        "verbs": ["get", "list", "patch", "delete"],
+                    }
+                    for plural, kind, namespaced in RESOURCES[group_version]
+                ],
+            }
+        return None
+
+    def _locate(self, path):
+        parts = path.strip("/").split("/")
+        if parts[0] == "api":
+            group_version, rest = parts[1], parts[2:]
+        else:
+            group_version, rest = "/".join(parts[1:3]), parts[3:]
+        namespace = None
+        if rest[0] == "namespaces" and len(rest) > 2:
+            namespace, rest = rest[1], rest[2:]
+        return group_version, rest[0], namespace, rest[1] if len(rest) > 1 else None
+
+    def _not_found(self, name):
+        self._reply(
+            404,
+            {"kind": "Status", "code": 404, "message": "{} not found".format(name)},
+        )
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _selected(obj, selector):
+    labels = obj.get("metadata", {}).get("labels") or {}
+    for term in filter(None, selector.split(",")):
+        key, _, value = term.partition("=")
+        if key not in labels or (value and labels[key] != value):
+            return False
+    return True
+
+
+def _manifest(kind, name, namespace="micado-worker", api_version="v1", **labels):
+    metadata = {"name": name, "labels": labels}
+    if namespace:
+        metadata["namespace"] = namespace
+    return {"apiVersion": api_version, "kind": kind, "metadata": metadata}
+
+
+INSTANCE = "app.kubernetes.io/instance"
+
+
+class TestApplyEngine(unittest.TestCase):
+    """UnitTests for the Kubernetes apply engine, on a fake API server"""
+
+    def setUp(self):
+        self.server = FakeKubernetes()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        configuration = client.Configuration()
+        configuration.host = self.server.host
+        configuration.connection_pool_maxsize = 4
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+        self.engine = apply.ApplyEngine(
+            client.ApiClient(configuration),
+            workers=4,
+            cache_file=os.path.join(cache.name, "discovery.json"),
+        )
+
+    def test_apply(self):
+        manifests = [
+            _manifest("Deployment", "web-%d" % i, api_version="apps/v1")
+            for i in range(20)
+        ]
+        manifests.append(_manifest("Namespace", "micado-worker", namespace=None))
+        manifests.append(_manifest("ConfigMap", "settings", namespace=None))
+
+        results = self.engine.apply(manifests)
+
+        self.assertEqual([r.action for r in results], ["applied"] * 22)
+        self.assertEqual(self.server.applied[0], ("Namespace", "micado-worker", "True"))
+        self.assertIn(("v1", "configmaps", "default", "settings"), self.server.objects)
+        stored = self.server.objects[
+            ("apps/v1", "deployments", "micado-worker", "web-0")
+        ]
+        self.assertEqual(
+            stored["metadata"]["managedFields"][0]["manager"], apply.FIELD_MANAGER
+        )
+        self.assertLessEqual(len(self.server.connections), 4)
+
+    def test_apply_error_names_object(self):
+        self.server.reject["bad"] = "spec.replicas: Invalid value: -1"
+        manifests = [
+            _manifest("Deployment", "bad", api_version="apps/v1"),
+            _manifest("Deployment", "good", api_version="apps/v1"),
+            _manifest("Widget", "unknown", api_version="example.com/v1"),
+        ]
+
+        with self.assertRaises(apply.ApplyError) as raised:
+            self.engine.apply(manifests)
+        message = str(raised.exception)
+        self.assertIn("Deployment micado-worker/bad: failed", message)
+        self.assertIn("spec.replicas: Invalid value: -1", message)
+        self.assertIn("Widget micado-worker/unknown: failed", message)
+        self.assertEqual(
+            [r.action for r in raised.exception.results],
+            ["failed", "applied", "failed"],
+        )
+
+    def test_prune_only_owned_objects(self):
+        labels = {INSTANCE: "app"}
+        old = [
+            _manifest("Service", "web", **labels),
+            _manifest("Service", "old", **labels),
+            _manifest("PersistentVolume", "data", namespace=None, **labels),
+        ]
+        self.engine.apply(old)
+        self.server.add(
+            "apps/v1",
+            "replicasets",
+            "micado-worker",
+            _manifest("ReplicaSet", "web-1234", api_version="apps/v1", **labels),
+        )
+        self.server.add(
+            "v1", "services", "micado-worker", _manifest("Service", "other", app="x")
+        )
+
+        pruned = self.engine.prune([old[0], old[2]], "{}=app".format(INSTANCE))
+
+        self.assertEqual(
+            [str(r) for r in pruned], ["Service micado-worker/old: pruned"]
+        )
+        remaining = {key[-1] for key in self.server.objects}
+        self.assertEqual(remaining, {"web", "data", "web-1234", "other"})
+
+    def test_delete(self):
+        manifests = [
+            _manifest("Namespace", "micado-worker", namespace=None),
+            _manifest("Service", "web"),
+        ]
+        self.engine.apply(manifests)
+        manifests.append(_manifest("Service", "gone"))
+        worker = _manifest("Node", "n1", None, **{"micado.eu/node_type": "worker"})
+        self.server.add("v1", "nodes", None, worker)
+        self.server.add("v1", "nodes", None, _manifest("Node", "master", None))
+
+        results = self.engine.delete(manifests, timeout=5)
+        self.engine.delete_nodes("micado.eu/node_type")
+
+        self.assertEqual(
+            [r.action for r in results], ["deleted", "deleted", "not found"]
+        )
+        self.assertEqual([key[-1] for key in self.server.objects], ["master"])
+
+    def test_adaptor_execute_and_undeploy(self):
+        with tempfile.TemporaryDirectory() as volume:
+            adaptor = KubernetesAdaptor(
+                "app_KubernetesAdaptor", {"volume": volume + "/"}, False
+            )
+            adaptor._apply_engine = self.engine
+            utils.dump_list_yaml(
+                [
+                    _manifest("Service", "web", **{INSTANCE: "app"}),
+                    _manifest("Service", "db", **{INSTANCE: "app"}),
+                ],
+                adaptor.manifest_path,
+            )
+            adaptor.execute()
+            self.assertEqual(len(self.server.objects), 2)
+
+            utils.dump_list_yaml(
+                [_manifest("Service", "web", **{INSTANCE: "app"})],
+                adaptor.manifest_path,
+            )
+            adaptor.execute(update=True)
+            self.assertEqual([key[-1] for key in self.server.objects], ["web"])
+
+            adaptor.undeploy()
+            self.assertEqual(self.server.objects, {})
+            self.assertEqual(adaptor.status, "Undeployed")
+
+    def test_adaptor_update_sends_only_changes(self):
+        services = [
+            _manifest("Service", "svc-%d" % i, **{INSTANCE: "app"}) for i in range(50)
+        ]
+        with tempfile.TemporaryDirectory() as volume:
+            adaptor = KubernetesAdaptor(
+                "app_KubernetesAdaptor", {"volume": volume + "/"}, False
+            )
+            adaptor._apply_engine = self.engine
+            utils.dump_list_yaml(services, adaptor.manifest_path)
+            adaptor.execute()
+            self.server.applied.clear()
+
+            def translate(update):
+                adaptor.manifests = services[1:]
+                utils.dump_list_yaml(adaptor.manifests, adaptor.manifest_tmp_path)
+
+            services[10]["spec"] = {"type": "NodePort"}
+            with mock.patch.object(adaptor, "translate", translate):
+                adaptor.update()
+                self.assertEqual(self.server.applied, [("Service", "svc-10", "True")])
+                self.assertEqual(len(self.server.objects), 49)
+                self.assertEqual(adaptor.status, "Updated")
+
+                adaptor.update()
+                self.assertEqual(adaptor.status, "Updated (nothing to update)")
+                self.assertEqual(len(self.server.applied), 1)
+
+    def test_adaptor_update_dry_run(self):
+        services = [_manifest("Service", "svc-%d" % i) for i in range(3)]
+        with tempfile.TemporaryDirectory() as volume:
+            adaptor = KubernetesAdaptor(
+                "app_KubernetesAdaptor", {"volume": volume + "/"}, True
+            )
+            utils.dump_list_yaml(services, adaptor.manifest_path)
+
+            def translate(update):
+                adaptor.manifests = services[1:]
+                utils.dump_list_yaml(adaptor.manifests, adaptor.manifest_tmp_path)
+
+            with mock.patch.object(adaptor, "translate", translate), mock.patch.object(
+                adaptor, "_get_apply_engine"
+            ) as get_engine:
+                adaptor.update()
+            get_engine.assert_not_called()
+            self.assertEqual(adaptor.status, "DRY-RUN Deployment")
+            self.assertFalse(os.path.exists(adaptor.manifest_tmp_path))
+            self.assertEqual(
+                utils.get_list_yaml(adaptor.manifest_path), services[1:]
+            )
+
+    def test_prune_in_scope(self):
+        labels = {INSTANCE: "app"}
+        deployed = [
+            _manifest("Service", "web", **labels),
+            _manifest("ConfigMap", "old", namespace="micado-old", **labels),
+            _manifest("Secret", "unrelated", **labels),
+        ]
+        self.engine.apply(deployed)
+        manifests = [
+            _manifest("Service", "web", **labels),
+            _manifest("Service", "new", **labels),
+        ]
+        self.engine.apply(manifests)
+
+        kinds, namespaces = self.engine.scope(manifests, deployed[:2])
+        self.assertEqual(kinds, [("v1", "ConfigMap"), ("v1", "Service")])
+        self.assertEqual(namespaces, ["micado-old", "micado-worker"])
+
+        self.server.requests.clear()
+        pruned = self.engine.prune(
+            manifests, INSTANCE, kinds=kinds, namespaces=namespaces
+        )
+
+        self.assertEqual([r.name for r in pruned], ["old"])
+        listed = sorted(path for verb, path in self.server.requests if verb == "GET")
+        self.assertEqual(
+            listed,
+            [
+                "/api/v1/namespaces/micado-old/configmaps",
+                "/api/v1/namespaces/micado-old/services",
+                "/api/v1/namespaces/micado-worker/configmaps",
+                "/api/v1/namespaces/micado-worker/services",
+            ],
+        )
+        unrelated = ("v1", "secrets", "micado-worker", "unrelated")
+        self.assertIn(unrelated, self.server.objects)
+
+
+class TestManifestDiff(unittest.TestCase):
+    """UnitTests for the object-level diff of manifests"""
+
+    def test_diff(self):
+        old = [
+            _manifest("Service", "same"),
+            _manifest("Service", "patched"),
+            _manifest("Service", "gone"),
+            _manifest("Ingress", "moved", api_version="extensions/v1beta1"),
+        ]
+        new = [
+            _manifest("Service", "same"),
+            dict(_manifest("Service", "patched"), spec={"type": "NodePort"}),
+            _manifest("Service", "new"),
+            _manifest("Ingress", "moved", api_version="networking.k8s.io/v1"),
+        ]
+
+        diff = ManifestDiff(old, new)
+
+        def names(manifests):
+            return [m["metadata"]["name"] for m in manifests]
+
+        self.assertEqual(names(diff.created), ["new", "moved"])
+        self.assertEqual(names(diff.changed), ["patched"])
+        self.assertEqual(names(diff.removed), ["gone"])
+        self.assertEqual(names(diff.unchanged), ["same"])
+        self.assertEqual(
+            str(diff), "2 to create, 1 to patch, 1 to delete, 1 unchanged"
+        )
+
+    def test_no_changes(self):
+        old = [{"kind": "Service", "apiVersion": "v1", "metadata": {"name": "a"}}]
+        new = [{"metadata": {"name": "a"}, "apiVersion": "v1", "kind": "Service"}]
+        self.assertFalse(ManifestDiff(old, new))
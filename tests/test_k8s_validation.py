@@ -0,0 +1,98 @@
+import unittest
+from unittest import mock
+
+import kubernetes_validate
+
+from submitter.adaptors.k8s_adaptor import validation
+from submitter.adaptors.k8s_adaptor.validation import (
+    INVALID,
+    NO_SCHEMA,
+    ManifestValidator,
+)
+
+
+def _deployment(name, **spec):
+    labels = {"app": name}
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": name},
+        "spec": dict(
+            {
+                "selector": {"matchLabels": labels},
+                "template": {
+                    "metadata": {"labels": labels},
+                    "spec": {"containers": [{"name": name, "image": "nginx"}]},
+                },
+            },
+            **spec
+        ),
+    }
+
+
+def _shutdown_executor():
+    if validation._executor is not None:
+        validation._executor.shutdown()
+        validation._executor = None
+
+
+class TestManifestValidator(unittest.TestCase):
+    """UnitTests for the cached validation of Kubernetes manifests"""
+
+    def setUp(self):
+        validation._memo.clear()
+
+    def test_matches_kubernetes_validate(self):
+        valid = _deployment("web")
+        invalid = _deployment("web", replicas="three")
+        unknown = dict(_deployment("web"), apiVersion="example.com/v1", kind="Widget")
+
+        outcomes = ManifestValidator("1.18.0").check([valid, invalid, unknown])
+
+        self.assertIsNone(outcomes[0])
+        kubernetes_validate.validate(valid, "1.18.0", strict=True)
+        with self.assertRaises(kubernetes_validate.ValidationError) as raised:
+            kubernetes_validate.validate(invalid, "1.18.0", strict=True)
+        self.assertEqual(outcomes[1], (INVALID, raised.exception.message))
+        self.assertEqual(outcomes[2][0], NO_SCHEMA)
+        self.assertIn("Widget", outcomes[2][1])
+
+    def test_unsupported_version_and_skipped_kinds(self):
+        invalid = _deployment("web", replicas="three")
+        self.assertEqual(ManifestValidator("99.0.0").check([invalid]), [None])
+        validator = ManifestValidator("1.18.0", skip_kinds=["Deployment"])
+        self.assertEqual(validator.check([invalid]), [None])
+
+    def test_results_are_remembered(self):
+        manifests = [_deployment("web"), _deployment("db"), _deployment("web")]
+        validator = ManifestValidator("1.18.0")
+        with mock.patch.object(
+            validation, "check_manifest", wraps=validation.check_manifest
+        ) as check:
+            validator.check(manifests)
+            self.assertEqual(check.call_count, 2)
+            validator.check(manifests)
+            self.assertEqual(check.call_count, 2)
+            ManifestValidator("1.25.0").check(manifests)
+            self.assertEqual(check.call_count, 4)
+
+    def test_parallel(self):
+        manifests = [_deployment("web-%d" % i) for i in range(4)]
+        manifests.append(_deployment("bad", replicas="three"))
+        self.addCleanup(_shutdown_executor)
+
+        with mock.patch.object(validation, "MIN_PARALLEL", 2):
+            outcomes = ManifestValidator("1.18.0", workers=2).check(manifests)
+
+        self.assertIsNotNone(validation._executor)
+        self.assertEqual(outcomes[:4], [None] * 4)
+        self.assertEqual(outcomes[4][0], INVALID)
+
+    def test_min_parallel_configurable(self):
+        manifests = [_deployment("web-%d" % i) for i in range(3)]
+        with mock.patch.object(validation, "_get_executor") as get_executor:
+            ManifestValidator("1.18.0", workers=2).check(manifests)
+            get_executor.assert_not_called()
+            validation._memo.clear()
+            ManifestValidator("1.18.0", workers=2, min_parallel=3).check(manifests)
+            get_executor.assert_called_once_with(2)
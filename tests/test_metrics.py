@@ -0,0 +1,57 @@
+import unittest
+
+from submitter import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """UnitTests for the Prometheus metrics registry"""
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter(self):
+        counter = metrics.Counter(
+            "test_failures", "Failures", ["phase"], registry=self.registry
+        )
+        counter.inc(phase="execute")
+        counter.inc(2, phase="execute")
+        self.assertEqual(counter.get(phase="execute"), 3)
+        self.assertIn('test_failures_total{phase="execute"} 3', self.registry.render())
+
+    def test_counter_exposition(self):
+        counter = metrics.Counter(
+            "test_retries", "Retries", ["policy"], registry=self.registry
+        )
+        counter.inc(policy="http")
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP test_retries_total Retries\n"
+            "# TYPE test_retries_total counter\n"
+            'test_retries_total{policy="http"} 1\n',
+        )
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Histogram(
+            "test_seconds", "Durations", ["phase"], [1, 5], registry=self.registry
+        )
+        histogram.observe(0.5, phase="translate")
+        histogram.observe(3, phase="translate")
+        lines = self.registry.render().splitlines()
+        self.assertIn("# TYPE test_seconds histogram", lines)
+        self.assertIn('test_seconds_bucket{phase="translate",le="1"} 1', lines)
+        self.assertIn('test_seconds_bucket{phase="translate",le="5"} 2', lines)
+        self.assertIn('test_seconds_bucket{phase="translate",le="+Inf"} 2', lines)
+        self.assertIn('test_seconds_sum{phase="translate"} 3.5', lines)
+        self.assertIn('test_seconds_count{phase="translate"} 2', lines)
+
+    def test_labels_are_checked_and_escaped(self):
+        counter = metrics.Counter("test_labels", "", ["name"], registry=self.registry)
+        with self.assertRaises(ValueError):
+            counter.inc(other="x")
+        counter.inc(name='say "hi"')
+        self.assertIn('test_labels_total{name="say \\"hi\\""} 1', self.registry.render())
+
+    def test_duplicate_metric(self):
+        metrics.Counter("test_twice", "", registry=self.registry)
+        with self.assertRaises(ValueError):
+            metrics.Counter("test_twice", "", registry=self.registry)
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import unittest
+
+from submitter.abstracts import Adaptor
+from submitter.plugin_manager import PluginManager
+
+
+class TestPluginManager(unittest.TestCase):
+    """UnitTests for the lazy adaptor registry"""
+
+    def test_registered_plugin(self):
+        plugin = PluginManager().get_plugin("PkAdaptor")
+        self.assertTrue(issubclass(plugin, Adaptor))
+        self.assertIs(PluginManager().get_plugin("PkAdaptor"), plugin)
+
+    def test_unregistered_plugin_is_searched(self):
+        manager = PluginManager(registry={})
+        manager._loaded = {}
+        self.assertEqual(manager.get_plugin("PkAdaptor").__name__, "PkAdaptor")
+
+    def test_unknown_plugin(self):
+        with self.assertRaises(FileNotFoundError):
+            PluginManager().get_plugin("NoSuchAdaptor")
+        with self.assertRaises(FileNotFoundError):
+            bad = PluginManager(registry={"Bad": "submitter.utils:dump_order_yaml"})
+            bad.get_plugin("Bad")
+
+    def test_only_used_plugins_are_imported(self):
+        script = (
+            "import sys\n"
+            "from submitter.plugin_manager import PluginManager\n"
+            "PluginManager().get_plugin('PkAdaptor')\n"
+            "print(sorted(m for m in sys.modules if m.endswith('_adaptor')))\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", script], text=True)
+        self.assertIn("submitter.adaptors.pk_adaptor", output)
+        self.assertNotIn("occopus_adaptor", output)
+        self.assertNotIn("k8s_adaptor", output)
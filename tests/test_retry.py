@@ -0,0 +1,91 @@
+import time
+import unittest
+from unittest import mock
+
+from submitter import metrics, retry
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """UnitTests for the retry policies"""
+
+    def test_recovers_from_transient_errors(self):
+        policy = retry.RetryPolicy("test-recover", attempts=5, base_delay=0)
+        fn = mock.Mock(side_effect=[ConnectionError, ConnectionError, "done"])
+
+        self.assertEqual(policy.call(fn, 1, key="value"), "done")
+        fn.assert_called_with(1, key="value")
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(metrics.RETRIES.get(policy="test-recover"), 2)
+
+    def test_gives_up_after_attempts(self):
+        policy = retry.RetryPolicy("test-attempts", attempts=3, base_delay=0)
+        fn = mock.Mock(side_effect=ConnectionError("down"))
+
+        with self.assertRaisesRegex(ConnectionError, "down"):
+            policy.call(fn)
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(
+            metrics.RETRY_GIVE_UPS.get(policy="test-attempts", reason="attempts"), 1
+        )
+
+    def test_unretried_errors_fail_fast(self):
+        policy = retry.RetryPolicy(attempts=5, base_delay=0)
+        fn = mock.Mock(side_effect=ValueError("locked"))
+
+        with self.assertRaises(ValueError):
+            policy.call(fn, retry_on=ConnectionError)
+        with self.assertRaises(ValueError):
+            policy.call(fn, retry_if_error=lambda err: "lock" not in str(err))
+        self.assertEqual(fn.call_count, 2)
+
+    def test_deadline(self):
+        policy = retry.RetryPolicy(
+            "test-deadline", attempts=None, deadline=0.3, base_delay=0.05, jitter=False
+        )
+        start = time.monotonic()
+        result = policy.call(lambda: False, retry_if_result=lambda ok: not ok)
+
+        self.assertFalse(result)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(
+            metrics.RETRY_GIVE_UPS.get(policy="test-deadline", reason="deadline"), 1
+        )
+
+    def test_budget(self):
+        budget = retry.RetryBudget(ratio=0, minimum=2)
+        policy = retry.RetryPolicy(attempts=10, base_delay=0, budget=budget)
+        fn = mock.Mock(side_effect=ConnectionError)
+
+        with self.assertRaises(ConnectionError):
+            policy.call(fn)
+        self.assertEqual(fn.call_count, 3)
+
+    def test_from_config_shares_budget(self):
+        config = {"attempts": 2, "budget": {"ratio": 0.5, "minimum": 1}}
+        first = retry.RetryPolicy.from_config("test-shared", config)
+        second = retry.RetryPolicy.from_config("test-shared", config, attempts=7)
+
+        self.assertIs(first.budget, second.budget)
+        self.assertEqual(second.attempts, 7)
+        self.assertIsNone(second.replace(budget=None).budget)
+        with self.assertRaises(ValueError):
+            first.replace(attempts=None)
+
+    def test_non_idempotent_requests_retried_before_sending(self):
+        import requests
+
+        policy = retry.RetryPolicy("test-http", attempts=5, base_delay=0)
+        error = mock.Mock(status_code=500)
+        with mock.patch.object(
+            requests, "request", side_effect=[requests.ConnectionError, error]
+        ) as request:
+            response = retry.http_request(policy, "post", "url", idempotent=False)
+        self.assertIs(response, error)
+        self.assertEqual(request.call_count, 2)
+
+        with mock.patch.object(
+            requests, "request", side_effect=requests.ReadTimeout
+        ) as request:
+            with self.assertRaises(requests.ReadTimeout):
+                retry.http_request(policy, "post", "url", idempotent=False)
+        request.assert_called_once()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from submitter.state_store import StateStore
+
+
+class TestStateStore(unittest.TestCase):
+    """UnitTests for the SQLite application state store"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "state.db")
+        self.store = StateStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_app_and_adaptor_state_survive_restart(self):
+        self.store.save_app("app", ["KubernetesAdaptor"], True)
+        self.store.save_adaptor("app", "KubernetesAdaptor", "Executed", {"ip": "1"})
+        self.store.save_adaptor("app", "KubernetesAdaptor", "Updated")
+        self.store.close()
+
+        self.store = StateStore(self.path)
+        app_list = self.store.load()
+        self.assertDictEqual(
+            app_list["app"],
+            {
+                "components": ["KubernetesAdaptor"],
+                "dry_run": True,
+                "output": {"KubernetesAdaptor": {"ip": "1"}},
+            },
+        )
+        self.assertDictEqual(
+            self.store.get_status("app"), {"KubernetesAdaptor": "Updated"}
+        )
+
+    def test_remove_app(self):
+        self.store.save_app("app", ["KubernetesAdaptor"], False)
+        self.store.save_adaptor("app", "KubernetesAdaptor", "Executed")
+        self.store.remove_app("app")
+        self.assertTrue(self.store.is_empty())
+        self.assertDictEqual(self.store.get_status("app"), {})
+
+    def test_failed_transaction_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.transaction() as conn:
+                conn.execute("INSERT INTO apps VALUES ('app', '[]', 0, 0)")
+                raise RuntimeError
+        self.assertTrue(self.store.is_empty())
+
+    def test_import_apps(self):
+        self.store.import_apps(
+            {"old_app": {"components": ["PkAdaptor"], "dry_run": False}}
+        )
+        self.assertListEqual(self.store.load()["old_app"]["components"], ["PkAdaptor"])
+
+    def test_checkpoints(self):
+        self.store.save_app("app", ["TerraformAdaptor", "KubernetesAdaptor"], False)
+        steps = ["TerraformAdaptor", "KubernetesAdaptor"]
+        self.store.start_checkpoint("app", "execute", steps, "adt.yaml", {"a": 1})
+        self.store.complete_step("app", "TerraformAdaptor")
+        self.store.fail_step("app", "KubernetesAdaptor", "timed out")
+        self.assertDictEqual(
+            self.store.get_checkpoint("app"),
+            {
+                "phase": "execute",
+                "steps": steps,
+                "completed": ["TerraformAdaptor"],
+                "source": "adt.yaml",
+                "params": {"a": 1},
+                "failed": "KubernetesAdaptor",
+                "error": "timed out",
+            },
+        )
+        self.store.clear_checkpoint("app")
+        self.assertIsNone(self.store.get_checkpoint("app"))
+
+        self.store.start_checkpoint("app", "update", steps)
+        self.store.remove_app("app")
+        self.assertIsNone(self.store.get_checkpoint("app"))
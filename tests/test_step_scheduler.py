@@ -0,0 +1,115 @@
+import threading
+import unittest
+
+from submitter.adaptors.k8s_adaptor.k8s_adaptor import KubernetesAdaptor
+from submitter.step_scheduler import StepScheduler, reverse_dependencies
+
+DEPENDENCIES = {
+    "KubernetesAdaptor": {"TerraformAdaptor", "OccopusAdaptor"},
+    "PkAdaptor": {"KubernetesAdaptor"},
+}
+STEPS = [
+    "SecurityPolicyManagerAdaptor",
+    "TerraformAdaptor",
+    "KubernetesAdaptor",
+    "PkAdaptor",
+]
+
+
+class TestStepScheduler(unittest.TestCase):
+    """UnitTests for the dependency graph scheduler"""
+
+    def test_single_worker_keeps_configured_order(self):
+        order = []
+        StepScheduler(STEPS, DEPENDENCIES).run(order.append)
+        self.assertListEqual(order, STEPS)
+
+    def test_dependencies_respected_with_workers(self):
+        order = []
+        lock = threading.Lock()
+
+        def step_fn(step):
+            with lock:
+                order.append(step)
+
+        StepScheduler(STEPS, DEPENDENCIES, max_workers=4).run(step_fn)
+        self.assertLess(
+            order.index("TerraformAdaptor"), order.index("KubernetesAdaptor")
+        )
+        self.assertLess(order.index("KubernetesAdaptor"), order.index("PkAdaptor"))
+
+    def test_independent_steps_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def step_fn(step):
+            if step in ("SecurityPolicyManagerAdaptor", "TerraformAdaptor"):
+                barrier.wait()
+
+        errors = StepScheduler(STEPS, DEPENDENCIES, max_workers=2).run(step_fn)
+        self.assertDictEqual(errors, {})
+
+    def test_failure_stops_dependents(self):
+        ran = []
+
+        def step_fn(step):
+            if step == "TerraformAdaptor":
+                raise RuntimeError("apply failed")
+            ran.append(step)
+
+        errors = StepScheduler(STEPS, DEPENDENCIES).run(step_fn)
+        self.assertListEqual(list(errors), ["TerraformAdaptor"])
+        self.assertNotIn("KubernetesAdaptor", ran)
+        self.assertNotIn("PkAdaptor", ran)
+
+    def test_keep_going_runs_independent_steps(self):
+        ran = []
+        steps = ["TerraformAdaptor", "KubernetesAdaptor", "SecurityPolicyManagerAdaptor"]
+
+        def step_fn(step):
+            if step == "TerraformAdaptor":
+                raise RuntimeError("apply failed")
+            ran.append(step)
+
+        errors = StepScheduler(steps, DEPENDENCIES).run(step_fn, keep_going=True)
+        self.assertListEqual(list(errors), ["TerraformAdaptor"])
+        self.assertListEqual(ran, ["SecurityPolicyManagerAdaptor"])
+
+    def test_transitive_dependency_through_absent_step(self):
+        steps = ["PkAdaptor", "TerraformAdaptor"]
+        scheduler = StepScheduler(steps, DEPENDENCIES)
+        self.assertSetEqual(scheduler.dependencies["PkAdaptor"], {"TerraformAdaptor"})
+
+    def test_reverse_dependencies(self):
+        order = []
+        StepScheduler(STEPS, reverse_dependencies(DEPENDENCIES)).run(order.append)
+        self.assertLess(order.index("PkAdaptor"), order.index("KubernetesAdaptor"))
+        self.assertLess(
+            order.index("KubernetesAdaptor"), order.index("TerraformAdaptor")
+        )
+
+    def test_circular_dependencies(self):
+        with self.assertRaises(ValueError):
+            StepScheduler(["A", "B"], {"A": {"B"}, "B": {"A"}})
+
+    def test_security_policies_before_kubernetes(self):
+        dependencies = {"KubernetesAdaptor": set(KubernetesAdaptor.depends_on)}
+        order = []
+        lock = threading.Lock()
+
+        def step_fn(step):
+            with lock:
+                order.append(step)
+
+        StepScheduler(STEPS, dependencies, max_workers=4).run(step_fn)
+        self.assertLess(
+            order.index("SecurityPolicyManagerAdaptor"),
+            order.index("KubernetesAdaptor"),
+        )
+
+        order.clear()
+        reverse = reverse_dependencies(dependencies)
+        StepScheduler(STEPS, reverse, max_workers=4).run(step_fn)
+        self.assertLess(
+            order.index("KubernetesAdaptor"),
+            order.index("SecurityPolicyManagerAdaptor"),
+        )
@@ -1,7 +1,12 @@
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
+from submitter import utils
 from submitter.submitter_config import SubmitterConfig as SubConfig
-from submitter.submitter_config import _reading_config
+from submitter.submitter_config import _reading_config, load_config
 
 
 class TestSubmitterConfig(unittest.TestCase):
@@ -65,3 +70,56 @@ class TestSubmitterConfig(unittest.TestCase):
             ],
         }
         self.assertDictEqual(dic, self.config.step_config)
+
+
+class TestConfigReload(unittest.TestCase):
+    """UnitTests for the shared, reloading config"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.tmp_dir, "key_config.yml")
+        shutil.copy("tests/configs/key_config.yaml", self.config_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _rewrite(self, old, new):
+        with open(self.config_path) as file:
+            text = file.read()
+        with open(self.config_path, "w") as file:
+            file.write(text.replace(old, new))
+        stat = os.stat(self.config_path)
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_parsed_once(self):
+        with mock.patch.object(
+            utils, "get_yaml_data", wraps=utils.get_yaml_data
+        ) as parse:
+            first, second = SubConfig(self.config_path), SubConfig(self.config_path)
+            self.assertEqual(first.adaptor_config, second.adaptor_config)
+        parse.assert_called_once()
+
+    def test_instances_do_not_share_changes(self):
+        first, second = SubConfig(self.config_path), SubConfig(self.config_path)
+        first.main_config["changed"] = True
+        first.adaptor_config["NewAdaptor"] = {}
+        self.assertNotIn("changed", second.main_config)
+        self.assertNotIn("NewAdaptor", second.adaptor_config)
+
+    def test_adaptor_config_reloads(self):
+        config = SubConfig(self.config_path)
+        self.assertNotIn("ReloadedAdaptor", config.adaptor_config)
+        self._rewrite("adaptor_config:", "adaptor_config:\n ReloadedAdaptor: {}")
+        self.assertIn("ReloadedAdaptor", config.adaptor_config)
+
+    def test_unchanged_content_is_not_parsed(self):
+        version, _ = load_config(self.config_path)
+        with mock.patch.object(utils, "get_yaml_data") as parse:
+            self._rewrite("", "")
+            self.assertEqual(load_config(self.config_path)[0], version)
+        parse.assert_not_called()
+
+    def test_broken_config_keeps_last(self):
+        version, config = load_config(self.config_path)
+        self._rewrite("adaptor_config:", "adaptor_config: [")
+        self.assertEqual(load_config(self.config_path), (version, config))
@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from micadoparser.parser import set_template
+from submitter.update_planner import UpdatePlanner
+
+TEMPLATES = Path("tests/templates")
+OWNERS = {
+    "SecurityPolicyManagerAdaptor": (
+        None,
+        ["tosca.policies.Security.MiCADO.Secret.KubernetesSecretDistribution"],
+    ),
+    "OccopusAdaptor": ("Occopus", []),
+    "TerraformAdaptor": ("Terraform", ["tosca.nodes.MiCADO.Terraform.*"]),
+    "KubernetesAdaptor": ("Kubernetes", ["tosca.policies.Monitoring.MiCADO"]),
+    "PkAdaptor": (None, ["tosca.policies.Scaling.MiCADO"]),
+}
+
+
+class TestUpdatePlanner(unittest.TestCase):
+    """UnitTests for the change-aware update planner"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        shutil.copytree(TEMPLATES, cls.tmp.name, dirs_exist_ok=True)
+        cls.adt = (TEMPLATES / "tosca.yaml").read_text()
+        cls.old = set_template(str(TEMPLATES / "tosca.yaml"), {})
+        cls.planner = UpdatePlanner(OWNERS)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def _plan(self, old, new):
+        path = Path(self.tmp.name) / "updated.yaml"
+        path.write_text(self.adt.replace(old, new, 1))
+        return self.planner.plan(self.old, set_template(str(path), {}))
+
+    def test_unchanged_template_updates_nothing(self):
+        plan = self._plan("", "")
+        self.assertListEqual(plan.adaptors, [])
+
+    def test_scaling_rule_change_only_updates_pk(self):
+        plan = self._plan("reqnodes=0", "reqnodes=1")
+        self.assertListEqual(plan.adaptors, ["PkAdaptor"])
+        self.assertListEqual(plan.policies, ["scalability"])
+
+    def test_instance_limits_update_target_adaptor(self):
+        plan = self._plan("min_instances: '1'", "min_instances: '2'")
+        self.assertListEqual(plan.adaptors, ["OccopusAdaptor", "PkAdaptor"])
+
+    def test_volume_change_updates_its_containers(self):
+        plan = self._plan("type: tosca.nodes.MiCADO.Container.Volume.Local\n", (
+            "type: tosca.nodes.MiCADO.Container.Volume.Local\n"
+            "      description: changed\n"
+        ))
+        self.assertListEqual(plan.nodes, ["local-vol"])
+        self.assertIn("KubernetesAdaptor", plan.adaptors)
+        self.assertNotIn("OccopusAdaptor", plan.adaptors)
+        self.assertNotIn("TerraformAdaptor", plan.adaptors)
+
+    def test_unknown_previous_template_updates_all(self):
+        plan = self.planner.plan(None, self.old)
+        self.assertListEqual(plan.adaptors, list(OWNERS))
+        self.assertIsNotNone(plan.full)
@@ -1,6 +1,9 @@
 import unittest
+from unittest import mock
 
 from micadoparser.parser import set_template
+from submitter import utils
+from submitter.adaptors.k8s_adaptor.k8s_adaptor import KubernetesAdaptor
 from submitter.adaptors.occopus_adaptor import OccopusAdaptor
 from submitter.adaptors.terraform_adaptor import TerraformAdaptor
 
@@ -43,3 +46,63 @@ class TestTerraUtils(unittest.TestCase):
         json_dict = self.adaptor.translate(to_dict=True)
         endpoint = json_dict["provider"]["aws"]["endpoints"]["ec2"]
         self.assertEqual(endpoint, "https://mycloud.net/api/terra/v2")
+
+
+class TestTranslateLeavesTemplate(unittest.TestCase):
+    """Tests that adaptors translate without changing the template"""
+
+    def _snapshot(self, tpl):
+        return repr(
+            [
+                (
+                    {k: v.value for k, v in node.get_properties().items()},
+                    [(i.name, i.inputs) for i in node.interfaces],
+                    node.type_definition.interfaces,
+                )
+                for node in tpl.nodetemplates
+            ]
+        )
+
+    def test_translate_twice(self):
+        tpl = set_template("tests/templates/tosca.yaml", {})
+        before = self._snapshot(tpl)
+        config = {"volume": "tests/output/"}
+        adaptors = [
+            OccopusAdaptor("occo", config, dryrun=True, template=tpl),
+            TerraformAdaptor("terra", config, dryrun=True, template=tpl),
+        ]
+        for adaptor in adaptors:
+            self.assertEqual(
+                adaptor.translate(to_dict=True), adaptor.translate(to_dict=True)
+            )
+
+        k8s = KubernetesAdaptor("k8s", config, False, validate=False, template=tpl)
+        k8s.translate(write_files=False)
+        first = k8s.manifests
+        k8s.manifests = []
+        k8s.translate(write_files=False)
+        self.assertEqual(first, k8s.manifests)
+        self.assertEqual(before, self._snapshot(tpl))
+
+    def test_copy_data(self):
+        data = {"spec": {"ports": [{"port": 80}]}, "name": "web"}
+        copied = utils.copy_data(data)
+        copied["spec"]["ports"][0]["port"] = 8080
+        self.assertEqual(data["spec"]["ports"][0]["port"], 80)
+        self.assertEqual(utils.copy_data(data), data)
+
+
+class TestKubernetesInit(unittest.TestCase):
+    """Tests for the shared Kubernetes client"""
+
+    def tearDown(self):
+        utils.api = None
+
+    def test_init_kubernetes_once(self):
+        utils.api = None
+        with mock.patch("kubernetes.config.load_kube_config") as load:
+            utils.init_kubernetes()
+            first = utils.api
+            utils.init_kubernetes()
+        load.assert_called_once()
+        self.assertIs(utils.api, first)
@@ -0,0 +1,51 @@
+import threading
+import time
+import unittest
+
+from submitter import submitter_engine
+from submitter.validation_pool import PoolBusy, ValidationPool, ValidationTimeout
+
+
+def slow_echo(seconds, value):
+    """Target for the workers, which must be importable by them"""
+    time.sleep(seconds)
+    return value
+
+
+class TestValidationPool(unittest.TestCase):
+    """UnitTests for the pool of validation workers"""
+
+    def test_invalid_adt_in_worker(self):
+        pool = ValidationPool(workers=1, queue_size=0, timeout=60)
+        self.addCleanup(pool.close)
+
+        result = pool.validate("tests/templates/micado_types.yaml", {})
+        self.assertFalse(result["valid"])
+        self.assertIn("node_templates", result["error"])
+
+    def test_timeout_restarts_pool(self):
+        pool = ValidationPool(workers=1, queue_size=0, timeout=1, target=slow_echo)
+        self.addCleanup(pool.close)
+
+        with self.assertRaises(ValidationTimeout):
+            pool.validate(30, "slow")
+        self.assertIsNone(pool._pool)
+        self.assertEqual(pool.validate(0, "fast"), "fast")
+
+    def test_full_queue_turns_away(self):
+        pool = ValidationPool(workers=1, queue_size=0, timeout=30, target=slow_echo)
+        self.addCleanup(pool.close)
+        pool.validate(0, "warm")
+
+        thread = threading.Thread(target=pool.validate, args=(2, "busy"))
+        thread.start()
+        time.sleep(0.5)
+        with self.assertRaises(PoolBusy):
+            pool.validate(0, "turned away")
+        thread.join()
+        self.assertEqual(pool.validate(0, "free"), "free")
+
+    def test_engine_without_state(self):
+        engine = submitter_engine.SubmitterEngine(load_state=False)
+        self.assertIsNone(engine.state)
+        self.assertDictEqual(engine.app_list, {})